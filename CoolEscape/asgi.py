@@ -14,3 +14,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CoolEscape.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.DISTRICT_SNAPSHOT_SCHEDULER:
+    from common_services.district_snapshot import start_snapshot_scheduler  # noqa: E402
+
+    start_snapshot_scheduler()
+
+if settings.FORECAST_ARCHIVE_WARM_ON_BOOT:
+    from common_services.forecast_archive import warm_forecast_store  # noqa: E402
+
+    warm_forecast_store()
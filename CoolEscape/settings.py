@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from datetime import timedelta
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common_services.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,6 +86,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'CoolEscape.wsgi.application'
+ASGI_APPLICATION = 'CoolEscape.asgi.application'
 
 
 # Database
@@ -135,19 +137,113 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'static_root'
 
+# Prebuilt OpenAPI schema (schema.yaml/schema.json) served at /api/schema/, written at image
+# build time by `manage.py spectacular`. Without it the schema is generated per request.
+OPENAPI_SCHEMA_DIR = config('OPENAPI_SCHEMA_DIR', default=str(BASE_DIR / 'openapi'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Cache Config
+# "shared" is read by every gunicorn worker. The file-based default needs no extra service;
+# point SHARED_CACHE_BACKEND/SHARED_CACHE_LOCATION at Redis or Memcached in production.
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "weather_cache",
-    }
+    },
+    "shared": {
+        "BACKEND": config('SHARED_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        "LOCATION": config('SHARED_CACHE_LOCATION', default=str(BASE_DIR / '.cache' / 'weather')),
+        "OPTIONS": {
+            "MAX_ENTRIES": 5000,
+        },
+    },
 }
-
+# Swaps both cache aliases for in-memory ones during test runs.
+TEST_RUNNER = 'common_services.testing.TestRunner'
+
+# Weather Service Config
+# Open-Meteo forecast endpoint; the benchmark suite points this at a local stand-in.
+FORECAST_URL = config('FORECAST_URL', default='https://api.open-meteo.com/v1/forecast')
+# Optional comma separated list of equivalent endpoints (mirrors, self-hosted instances), primary
+# first; when set it replaces FORECAST_URL and hedged requests are sent to the next endpoint.
+FORECAST_URLS = config('FORECAST_URLS', default='', cast=Csv())
+# District list loaded once per process into the district registry.
+DISTRICTS_FILE = config('DISTRICTS_FILE', default=str(BASE_DIR / 'bd-districts.json'))
+# Two-tier weather cache: an in-process LRU in front of the shared cache alias.
+WEATHER_SHARED_CACHE_ALIAS = config('WEATHER_SHARED_CACHE_ALIAS', default='shared')
+WEATHER_LOCAL_CACHE_MAX_ENTRIES = config('WEATHER_LOCAL_CACHE_MAX_ENTRIES', default=1024, cast=int)
+WEATHER_LOCAL_CACHE_TTL = config('WEATHER_LOCAL_CACHE_TTL', default=5, cast=float)
+# Seconds a weather entry (and the coolest-districts snapshot) is still served after its soft
+# TTL while one background task refreshes it; past that hard TTL requests fetch inline.
+WEATHER_CACHE_STALE_TTL = config('WEATHER_CACHE_STALE_TTL', default=3000, cast=int)
+# Days of hourly forecast fetched per location and kept in the forecast store.
+FORECAST_DAYS = config('FORECAST_DAYS', default=7, cast=int)
+# Number of districts requested per multi-location Open-Meteo call (1 disables batching).
+WEATHER_BATCH_SIZE = config('WEATHER_BATCH_SIZE', default=16, cast=int)
+# Precomputed coolest-districts ranking: refresh cadence, lifetime of a published snapshot,
+# and whether the application server runs the refresher in-process.
+DISTRICT_SNAPSHOT_REFRESH_INTERVAL = config('DISTRICT_SNAPSHOT_REFRESH_INTERVAL', default=300, cast=int)
+DISTRICT_SNAPSHOT_TTL = config('DISTRICT_SNAPSHOT_TTL', default=600, cast=int)
+DISTRICT_SNAPSHOT_SCHEDULER = config('DISTRICT_SNAPSHOT_SCHEDULER', default=False, cast=bool)
+# Snapping of raw friend_lat/dest_lat style coordinates: "off", "district" (nearest district
+# centroid) or "grid" (centre of a COORDINATE_SNAP_GRID_SIZE degree cell).
+COORDINATE_SNAPPING = config('COORDINATE_SNAPPING', default='off')
+COORDINATE_SNAP_GRID_SIZE = config('COORDINATE_SNAP_GRID_SIZE', default=0.1, cast=float)
+# Maximum number of routes accepted by one bulk travel-recommendation request.
+TRAVEL_BULK_MAX_ITEMS = config('TRAVEL_BULK_MAX_ITEMS', default=100, cast=int)
+# Longest start_date/end_date window, in days, one travel-recommendation request may rank.
+TRAVEL_WINDOW_MAX_DAYS = config('TRAVEL_WINDOW_MAX_DAYS', default=16, cast=int)
+# Process-wide aiohttp connection pool used for every Open-Meteo call.
+UPSTREAM_POOL_LIMIT = config('UPSTREAM_POOL_LIMIT', default=100, cast=int)
+UPSTREAM_POOL_LIMIT_PER_HOST = config('UPSTREAM_POOL_LIMIT_PER_HOST', default=32, cast=int)
+UPSTREAM_KEEPALIVE_TIMEOUT = config('UPSTREAM_KEEPALIVE_TIMEOUT', default=30, cast=float)
+UPSTREAM_DNS_CACHE_TTL = config('UPSTREAM_DNS_CACHE_TTL', default=300, cast=int)
+UPSTREAM_REQUEST_TIMEOUT = config('UPSTREAM_REQUEST_TIMEOUT', default=10, cast=float)
+# Upstream call policy: an adaptive cap on concurrent calls (raised while calls answer within
+# UPSTREAM_LATENCY_TARGET seconds, halved on 429s, failures and slow answers), retries with
+# jittered exponential backoff for 429/5xx and connection errors, and a circuit breaker that
+# fails fast for UPSTREAM_BREAKER_RESET_TIMEOUT seconds after that many consecutive failed calls.
+UPSTREAM_CONCURRENCY_INITIAL = config('UPSTREAM_CONCURRENCY_INITIAL', default=8, cast=int)
+UPSTREAM_CONCURRENCY_MIN = config('UPSTREAM_CONCURRENCY_MIN', default=1, cast=int)
+UPSTREAM_CONCURRENCY_MAX = config('UPSTREAM_CONCURRENCY_MAX', default=32, cast=int)
+UPSTREAM_LATENCY_TARGET = config('UPSTREAM_LATENCY_TARGET', default=2.0, cast=float)
+UPSTREAM_RETRY_ATTEMPTS = config('UPSTREAM_RETRY_ATTEMPTS', default=3, cast=int)
+UPSTREAM_RETRY_BASE_DELAY = config('UPSTREAM_RETRY_BASE_DELAY', default=0.2, cast=float)
+UPSTREAM_RETRY_MAX_DELAY = config('UPSTREAM_RETRY_MAX_DELAY', default=2.0, cast=float)
+UPSTREAM_BREAKER_FAILURE_THRESHOLD = config('UPSTREAM_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+UPSTREAM_BREAKER_RESET_TIMEOUT = config('UPSTREAM_BREAKER_RESET_TIMEOUT', default=30, cast=float)
+# Hedging: a call still pending after the UPSTREAM_HEDGE_PERCENTILE latency of recent calls
+# (clamped to UPSTREAM_HEDGE_MIN_DELAY..UPSTREAM_HEDGE_MAX_DELAY; UPSTREAM_HEDGE_INITIAL_DELAY until
+# enough calls were seen) gets a duplicate on the second FORECAST_URLS entry, and the first good
+# answer wins. At most UPSTREAM_HEDGE_BUDGET of all calls are hedged; with a single forecast URL
+# nothing is.
+UPSTREAM_HEDGE_ENABLED = config('UPSTREAM_HEDGE_ENABLED', default=True, cast=bool)
+UPSTREAM_HEDGE_PERCENTILE = config('UPSTREAM_HEDGE_PERCENTILE', default=95, cast=float)
+UPSTREAM_HEDGE_MIN_DELAY = config('UPSTREAM_HEDGE_MIN_DELAY', default=0.05, cast=float)
+UPSTREAM_HEDGE_MAX_DELAY = config('UPSTREAM_HEDGE_MAX_DELAY', default=1.0, cast=float)
+UPSTREAM_HEDGE_INITIAL_DELAY = config('UPSTREAM_HEDGE_INITIAL_DELAY', default=0.5, cast=float)
+UPSTREAM_HEDGE_BUDGET = config('UPSTREAM_HEDGE_BUDGET', default=0.1, cast=float)
+# How long a location's last successfully fetched forecast is kept to answer from while the
+# provider is failing. Forecasts count as fresh for the first 600 seconds only.
+FORECAST_LAST_GOOD_TTL = config('FORECAST_LAST_GOOD_TTL', default=86400, cast=int)
+# Durable copy of fetched forecasts in the database (StoredForecast), read on cache misses.
+# With FORECAST_ARCHIVE_WARM_ON_BOOT each worker loads it into the weather cache at startup.
+FORECAST_ARCHIVE_ENABLED = config('FORECAST_ARCHIVE_ENABLED', default=True, cast=bool)
+FORECAST_ARCHIVE_WARM_ON_BOOT = config('FORECAST_ARCHIVE_WARM_ON_BOOT', default=True, cast=bool)
+# Cross-worker single-flight: a lock held in the cache lets one worker fetch an expired key
+# while the others poll the cache for its result. Only useful with a cache shared by workers.
+SINGLE_FLIGHT_CACHE_LOCK = config('SINGLE_FLIGHT_CACHE_LOCK', default=False, cast=bool)
+SINGLE_FLIGHT_LOCK_TIMEOUT = config('SINGLE_FLIGHT_LOCK_TIMEOUT', default=15, cast=float)
+SINGLE_FLIGHT_POLL_INTERVAL = config('SINGLE_FLIGHT_POLL_INTERVAL', default=0.1, cast=float)
+# Prometheus metrics served on /metrics. With several worker processes, point METRICS_DIR at a
+# directory that is empty when the server starts; each worker writes its values there every
+# METRICS_FLUSH_INTERVAL seconds and a scrape sums them. Empty keeps per-process metrics only.
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=1.0, cast=float)
 
 
 # Rest Framework Config
@@ -223,6 +319,8 @@ SPECTACULAR_SETTINGS = {
     'USE_SESSION_AUTH': False,
     'REDUCER': 'drf_spectacular.reducing.RouterDepthReducer',
     'COMPONENT_SPLIT_REQUEST': True,
+    # View documentation lives in each app's schema module and is only imported for generation.
+    'PREPROCESSING_HOOKS': ['common_services.openapi_schema.load_view_schemas'],
     "SWAGGER_UI_DIST": "https://cdn.jsdelivr.net/npm/swagger-ui-dist@latest",
     'DEFAULT_FIELD_INSPECTORS': [
         'drf_spectacular.inspectors.CamelCaseJSONFilter',
@@ -242,33 +340,79 @@ SPECTACULAR_SETTINGS = {
 }
 
 # Logger Config
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
+# LOG_MODE=production sends every record through a queue to a background writer as one JSON
+# object per line, samples chatty hot-path events (LOG_SAMPLE_RATES, "event=share" pairs) and
+# cuts logged payloads to LOG_PAYLOAD_MAX_CHARS. The default mode keeps the plain text setup.
+LOG_MODE = config('LOG_MODE', default='development')
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_FILE = config('LOG_FILE', default='')
+LOG_QUEUE_SIZE = config('LOG_QUEUE_SIZE', default=10000, cast=int)
+LOG_PAYLOAD_MAX_CHARS = config('LOG_PAYLOAD_MAX_CHARS', default=512, cast=int)
+LOG_SAMPLE_RATES = {
+    event.strip(): float(rate)
+    for event, _, rate in (
+        item.partition('=') for item in config(
+            'LOG_SAMPLE_RATES', default='district_cache_hit=0.01,upstream_request=0.1,upstream_payload=0.01', cast=Csv()
+        )
+    )
+}
+
+if LOG_MODE == 'production':
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'structured': {
+                '()': 'common_services.structured_logging.StructuredFormatter',
+            },
         },
-    },
-    'handlers': {
-        'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+        'filters': {
+            'sampling': {
+                '()': 'common_services.structured_logging.EventSampler',
+            },
         },
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(os.getcwd(), 'logs/debug.log'),
-            'formatter': 'simple',
+        'handlers': {
+            'queue': {
+                'class': 'common_services.structured_logging.NonBlockingHandler',
+                'filename': LOG_FILE or None,
+                'queue_size': LOG_QUEUE_SIZE,
+                'formatter': 'structured',
+                'filters': ['sampling'],
+            },
         },
-    },
-    'loggers': {
-        'weather_service': {
-            'handlers': ['console', 'file'],
-            'level': 'DEBUG',
-            'propagate': False,
+        'root': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
         },
-    },
-}
+    }
+else:
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'simple': {
+                'format': '{levelname} {message}',
+                'style': '{',
+            },
+        },
+        'handlers': {
+            'console': {
+                'level': 'INFO',
+                'class': 'logging.StreamHandler',
+                'formatter': 'simple',
+            },
+            'file': {
+                'level': 'DEBUG',
+                'class': 'logging.FileHandler',
+                'filename': os.path.join(os.getcwd(), 'logs/debug.log'),
+                'formatter': 'simple',
+            },
+        },
+        'loggers': {
+            'weather_service': {
+                'handlers': ['console', 'file'],
+                'level': 'DEBUG',
+                'propagate': False,
+            },
+        },
+    }
@@ -17,13 +17,14 @@ Including another URLconf
 from django.contrib import admin
 # from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from common_services.index_render import landing
+from common_services.metrics import metrics_view
+from common_services.openapi_schema import redoc_view, schema_view, swagger_ui_view
 swagger_urlpatterns = [
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
-    path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    path("api/schema/", schema_view, name="schema"),
+    path("api/docs/", swagger_ui_view, name="swagger-ui"),
+    path("api/redoc/", redoc_view, name="redoc"),
 ]
 
 
@@ -35,6 +36,7 @@ authentication_urlspatterns = [
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', landing, name='landing'),
+    path('metrics', metrics_view, name='metrics'),
     path('v1/', include([
         path('', include('coolest_districts.urls.urls_v1')),
         path('', include('travel_advice.urls.urls_v1')),
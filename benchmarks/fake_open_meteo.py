@@ -0,0 +1,164 @@
+"""Local stand-in for the Open-Meteo forecast API used by the benchmark suite.
+
+Serves ``/v1/forecast`` in the same shape as Open-Meteo (one object for a single location,
+a list for comma-separated batches), with configurable latency, slow-call tail, error rate
+and payload size, and counts every call so a benchmark can report upstream traffic.
+
+Run standalone with ``python -m benchmarks.fake_open_meteo --port 8765``.
+"""
+import argparse
+import asyncio
+import math
+import random
+import threading
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+
+TIMEZONE = ZoneInfo("Asia/Dhaka")
+
+
+class FakeOpenMeteo:
+    """Forecast server with deterministic temperatures and injected latency and errors."""
+
+    def __init__(self, latency_ms=50.0, jitter_ms=0.0, error_rate=0.0, forecast_days=7, padding_variables=0, seed=0,
+                 slow_rate=0.0, slow_ms=1000.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.forecast_days = forecast_days
+        self.padding_variables = padding_variables
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.locations = 0
+        self.errors = 0
+
+    def stats(self):
+        with self.lock:
+            return {"calls": self.calls, "locations": self.locations, "errors": self.errors}
+
+    @staticmethod
+    def temperature(latitude, longitude, hour):
+        """Smooth, location-dependent diurnal curve, so rankings are stable across runs."""
+        base = 24.0 + (latitude - 22.0) * -0.8 + (longitude - 90.0) * 0.3
+        return round(base + 5.0 * math.sin((hour % 24 - 8) / 24 * 2 * math.pi), 2)
+
+    def hourly(self, latitude, longitude, first_day, days):
+        times, temperatures = [], []
+        for hour in range(days * 24):
+            timestamp = datetime.combine(first_day, datetime.min.time()) + timedelta(hours=hour)
+            times.append(timestamp.strftime("%Y-%m-%dT%H:%M"))
+            temperatures.append(self.temperature(latitude, longitude, hour))
+        hourly = {"time": times, "temperature_2m": temperatures}
+        for index in range(self.padding_variables):
+            hourly[f"padding_{index}"] = temperatures
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "timezone": "Asia/Dhaka",
+            "hourly_units": {"time": "iso8601", "temperature_2m": "°C"},
+            "hourly": hourly,
+        }
+
+    async def forecast(self, request):
+        latitudes = [float(value) for value in request.query["latitude"].split(",")]
+        longitudes = [float(value) for value in request.query["longitude"].split(",")]
+        with self.lock:
+            self.calls += 1
+            self.locations += len(latitudes)
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            if self.random.random() < self.slow_rate:
+                delay += self.slow_ms / 1000
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        await asyncio.sleep(delay)
+
+        if failed:
+            return web.json_response({"error": True, "reason": "Injected failure"}, status=503)
+
+        if "start_date" in request.query:
+            first_day = date.fromisoformat(request.query["start_date"])
+            days = (date.fromisoformat(request.query["end_date"]) - first_day).days + 1
+        else:
+            first_day = datetime.now(TIMEZONE).date()
+            days = int(request.query.get("forecast_days", self.forecast_days))
+
+        payloads = [
+            self.hourly(latitude, longitude, first_day, days)
+            for latitude, longitude in zip(latitudes, longitudes)
+        ]
+        return web.json_response(payloads[0] if len(payloads) == 1 else payloads)
+
+    async def stats_view(self, request):
+        return web.json_response(self.stats())
+
+    def application(self):
+        app = web.Application()
+        app.router.add_get("/v1/forecast", self.forecast)
+        app.router.add_get("/stats", self.stats_view)
+        return app
+
+    def start_in_thread(self, host="127.0.0.1", port=0):
+        """Serve from a daemon thread; returns the forecast URL once the server is listening."""
+        started = threading.Event()
+        address = {}
+
+        def serve():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            runner = web.AppRunner(self.application(), access_log=None)
+            loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, host, port)
+            loop.run_until_complete(site.start())
+            address["port"] = site._server.sockets[0].getsockname()[1]
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, name="fake-open-meteo", daemon=True).start()
+        started.wait()
+        return f"http://{host}:{address['port']}/v1/forecast"
+
+
+def add_server_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean upstream response latency.")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Standard deviation of the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 503.")
+    parser.add_argument("--slow-rate", type=float, default=0.0,
+                        help="Fraction of calls delayed by another --slow-ms, to give the latency a long tail.")
+    parser.add_argument("--slow-ms", type=float, default=1000.0, help="Extra latency of the slow calls.")
+    parser.add_argument("--forecast-days", type=int, default=7,
+                        help="Days of hourly data per location when the caller does not ask for a number.")
+    parser.add_argument("--padding-variables", type=int, default=0,
+                        help="Extra hourly series per location, to grow the payload size.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and error injection.")
+
+
+def server_from_arguments(options, seed_offset=0):
+    return FakeOpenMeteo(
+        latency_ms=options.latency_ms,
+        jitter_ms=options.jitter_ms,
+        error_rate=options.error_rate,
+        forecast_days=options.forecast_days,
+        padding_variables=options.padding_variables,
+        seed=options.seed + seed_offset,
+        slow_rate=options.slow_rate,
+        slow_ms=options.slow_ms,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    options = parser.parse_args()
+    web.run_app(server_from_arguments(options).application(), host=options.host, port=options.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Measure what logging costs the weather hot path per request, before and after LOG_MODE=production.
+
+Replays the log calls ``WeatherService`` makes for one coolest-districts request against
+two setups and reports the time spent in the request thread per request, plus the time
+the background writer needed to drain the queue:
+
+* ``legacy``: the previous calls (eager f-strings with whole parameter dicts, name lists
+  and upstream payloads) through a synchronous stream handler and a DEBUG file handler.
+* ``production``: the current calls (lazy ``%s`` arguments, :class:`LogPayload`
+  truncation, sampled events) through :class:`NonBlockingHandler` with JSON output.
+
+``cold`` requests fetch all 64 districts in batches of 16; ``warm`` requests find every
+district in the cache. Example::
+
+    python -m benchmarks.logging_overhead --requests 500 --output logging.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import django
+
+DISTRICTS = 64
+BATCH_SIZE = 16
+FORECAST_HOURS = 168
+
+
+def forecast_payload(index):
+    return {
+        "latitude": 22.0 + index / 10,
+        "longitude": 89.0 + index / 10,
+        "timezone": "Asia/Dhaka",
+        "hourly": {
+            "time": [f"2025-02-{10 + hour // 24:02d}T{hour % 24:02d}:00" for hour in range(FORECAST_HOURS)],
+            "temperature_2m": [round(20 + (hour % 24) / 2 + index / 100, 1) for hour in range(FORECAST_HOURS)],
+        },
+    }
+
+
+def district_names():
+    return [f"District {index}" for index in range(DISTRICTS)]
+
+
+def legacy_request(logger, names, payloads, cold):
+    if not cold:
+        for name in names:
+            logger.info(f"Using cached data for {name}")
+        return
+    for start in range(0, DISTRICTS, BATCH_SIZE):
+        batch = names[start:start + BATCH_SIZE]
+        request_params = {"latitude": ",".join(batch), "hourly": "temperature_2m", "timezone": "Asia/Dhaka"}
+        logger.info(f"Fetching weather data for batch of {len(batch)} districts: {batch}")
+        for name, weather_data in zip(batch, payloads[start:start + BATCH_SIZE]):
+            logger.info(f"Fetching weather data for {name} with params: {request_params}")
+            logger.debug(f"Response received for {name}: {weather_data}")
+
+
+def production_request(logger, names, payloads, cold):
+    from common_services.structured_logging import payload
+
+    if not cold:
+        for name in names:
+            logger.info("Using cached data for %s", name, extra={"event": "district_cache_hit"})
+        return
+    for start in range(0, DISTRICTS, BATCH_SIZE):
+        batch = names[start:start + BATCH_SIZE]
+        request_params = {"latitude": ",".join(batch), "hourly": "temperature_2m", "timezone": "Asia/Dhaka"}
+        logger.info("Fetching weather data for batch of %s districts: %s", len(batch), payload(batch),
+                    extra={"event": "upstream_request"})
+        for name, weather_data in zip(batch, payloads[start:start + BATCH_SIZE]):
+            logger.info("Fetching weather data for %s with params: %s", name, payload(request_params),
+                        extra={"event": "upstream_request"})
+            logger.debug("Response received for %s: %s", name, payload(weather_data),
+                         extra={"event": "upstream_payload"})
+
+
+def legacy_logger(log_dir):
+    logger = logging.getLogger("benchmark.legacy")
+    logger.setLevel(logging.DEBUG)
+    formatter = logging.Formatter("{levelname} {message}", style="{")
+    console = logging.StreamHandler(open(log_dir / "legacy-console.log", "w"))
+    console.setLevel(logging.INFO)
+    file_handler = logging.FileHandler(log_dir / "legacy-debug.log")
+    file_handler.setLevel(logging.DEBUG)
+    for handler in (console, file_handler):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    logger.propagate = False
+    return logger, (console, file_handler)
+
+
+def production_logger(log_dir, queue_size):
+    from common_services.structured_logging import EventSampler, NonBlockingHandler, StructuredFormatter
+
+    logger = logging.getLogger("benchmark.production")
+    logger.setLevel(logging.INFO)
+    handler = NonBlockingHandler(filename=log_dir / "production.log", queue_size=queue_size)
+    handler.setFormatter(StructuredFormatter())
+    handler.addFilter(EventSampler())
+    logger.addHandler(handler)
+    logger.propagate = False
+    return logger, (handler,)
+
+
+def measure(setup, request, requests, cold, log_dir, **setup_options):
+    logger, handlers = setup(log_dir, **setup_options)
+    names, payloads = district_names(), [forecast_payload(index) for index in range(DISTRICTS)]
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        request(logger, names, payloads, cold)
+    request_time = time.perf_counter() - started_at
+    for handler in handlers:
+        handler.close()
+        logger.removeHandler(handler)
+    drained_time = time.perf_counter() - started_at
+    return {
+        "per_request_us": round(request_time / requests * 1e6, 1),
+        "drained_per_request_us": round(drained_time / requests * 1e6, 1),
+        "dropped": sum(getattr(handler, "dropped", 0) for handler in handlers),
+        "bytes_written": sum(path.stat().st_size for path in log_dir.iterdir()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Requests replayed per setup and scenario.")
+    parser.add_argument("--queue-size", type=int, default=100000, help="Queue size of the production handler.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    options = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "CoolEscape.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    django.setup()
+
+    report = {"requests": options.requests, "districts": DISTRICTS, "scenarios": {}}
+    for scenario in ("cold", "warm"):
+        results = report["scenarios"][scenario] = {}
+        for name, setup, request, setup_options in (
+            ("legacy", legacy_logger, legacy_request, {}),
+            ("production", production_logger, production_request, {"queue_size": options.queue_size}),
+        ):
+            with tempfile.TemporaryDirectory() as log_dir:
+                results[name] = measure(setup, request, options.requests, scenario == "cold", Path(log_dir), **setup_options)
+            print(f"{scenario} {name}: {json.dumps(results[name])}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if options.output:
+        Path(options.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Load-test the API against a local Open-Meteo stand-in and report latency as JSON.
+
+Starts :class:`~benchmarks.fake_open_meteo.FakeOpenMeteo`, launches the application
+server with ``FORECAST_URL`` pointing at it and a private shared cache directory, then
+drives ``/v1/coolest-districts/`` and ``/v1/travel-recommendation/`` at a fixed
+concurrency. Scenarios:
+
+* ``cold``: one burst of ``--concurrency`` requests against empty caches.
+* ``warm``: ``--requests`` requests once the caches are populated.
+* ``expiry-storm``: the shared cache is wiped (every entry expiring at once), then one
+  burst of ``--concurrency`` requests.
+
+Each scenario reports p50/p95/p99 latency and throughput per endpoint and the upstream
+calls it caused. ``--secondary`` starts a second stand-in as the next forecast endpoint and
+``--hedging compare`` runs the scenarios with hedged upstream requests off and then on,
+for comparing tail latency. Examples::
+
+    python -m benchmarks.run --concurrency 32 --requests 2000 --output results.json
+    python -m benchmarks.run --secondary --hedging compare --slow-rate 0.05 --slow-ms 1500
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+
+from benchmarks.fake_open_meteo import TIMEZONE, add_server_arguments, server_from_arguments
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SCENARIOS = ("cold", "warm", "expiry-storm")
+DEFAULT_SERVER_COMMAND = f"{shlex.quote(sys.executable)} manage.py runserver 127.0.0.1:{{port}} --noreload"
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Application server exited with status {process.returncode}.")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Application server did not listen on port {port} within {timeout} seconds.")
+
+
+def start_application(options, forecast_urls, cache_dir, hedging):
+    port = free_port()
+    environment = {
+        **os.environ,
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark"),
+        "FORECAST_URL": forecast_urls[0],
+        "FORECAST_URLS": ",".join(forecast_urls),
+        "UPSTREAM_HEDGE_ENABLED": str(hedging),
+        "SHARED_CACHE_LOCATION": str(cache_dir),
+        "WEATHER_LOCAL_CACHE_TTL": str(options.local_cache_ttl),
+    }
+    (BASE_DIR / "logs").mkdir(exist_ok=True)
+    process = subprocess.Popen(
+        shlex.split(options.server_command.format(port=port)),
+        cwd=BASE_DIR,
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    wait_for_port(port, process)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def request_plan(options, count, rng):
+    """``count`` ``(endpoint, path, params)`` requests mixed per ``--travel-share``."""
+    with open(BASE_DIR / "bd-districts.json") as f:
+        names = [district["name"] for district in json.load(f)["districts"]]
+    today = datetime.now(TIMEZONE).date()
+
+    plan = []
+    for _ in range(count):
+        if rng.random() < options.travel_share:
+            friend, destination = rng.sample(names, 2)
+            plan.append(("travel_recommendation", "/v1/travel-recommendation/", {
+                "friend_district": friend,
+                "destination_district": destination,
+                "date": str(today + timedelta(days=rng.randrange(options.travel_days))),
+            }))
+        else:
+            plan.append(("coolest_districts", "/v1/coolest-districts/", {
+                "limit": rng.choice((5, 10, 64)),
+                "sort": rng.choice(("asc", "desc")),
+            }))
+    return plan
+
+
+async def drive(base_url, plan, concurrency):
+    """Send ``plan`` with ``concurrency`` workers; returns the wall time and per-request samples."""
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+    samples = []
+
+    async def worker(session):
+        while not queue.empty():
+            endpoint, path, params = queue.get_nowait()
+            started_at = time.perf_counter()
+            try:
+                async with session.get(base_url + path, params=params) as response:
+                    await response.read()
+                    status = response.status
+            except aiohttp.ClientError:
+                status = 0
+            samples.append((endpoint, status, time.perf_counter() - started_at))
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        return time.perf_counter() - started_at, samples
+
+
+def summarize(samples, wall_time):
+    latencies = np.array([latency for _, _, latency in samples]) * 1000
+    failures = sum(1 for _, status, _ in samples if not 200 <= status < 400)
+    return {
+        "requests": len(samples),
+        "errors": failures,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "max_ms": round(float(latencies.max()), 2),
+        "throughput_rps": round(len(samples) / wall_time, 2),
+    }
+
+
+def upstream_stats(fake_servers):
+    totals = {}
+    for fake_server in fake_servers:
+        for key, value in fake_server.stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def run_scenario(fake_servers, base_url, plan, concurrency):
+    upstream_before = upstream_stats(fake_servers)
+    wall_time, samples = asyncio.run(drive(base_url, plan, concurrency))
+    upstream_after = upstream_stats(fake_servers)
+
+    result = {
+        "wall_time_s": round(wall_time, 3),
+        "overall": summarize(samples, wall_time),
+        "endpoints": {},
+        "upstream": {key: upstream_after[key] - upstream_before[key] for key in upstream_after},
+    }
+    for endpoint in sorted({endpoint for endpoint, _, _ in samples}):
+        result["endpoints"][endpoint] = summarize(
+            [sample for sample in samples if sample[0] == endpoint], wall_time
+        )
+    return result
+
+
+def wipe_shared_cache(cache_dir, options):
+    """Expire every shared entry at once, then wait out the per-process local tier."""
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    cache_dir.mkdir(parents=True)
+    time.sleep(options.local_cache_ttl + 0.5)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(options, scenarios, fake_servers, forecast_urls, hedging, label=None):
+    """Run ``scenarios`` against a freshly started application with empty caches."""
+    rng = random.Random(options.seed)
+    cache_dir = Path(tempfile.mkdtemp(prefix="coolescape-benchmark-"))
+    process, base_url = start_application(options, forecast_urls, cache_dir, hedging)
+
+    results = {}
+    try:
+        for scenario in scenarios:
+            if scenario == "expiry-storm":
+                wipe_shared_cache(cache_dir, options)
+            count = options.requests if scenario == "warm" else options.concurrency
+            if scenario == "warm" and "cold" not in results:
+                # Populate the caches first so the measurement only sees warm requests.
+                run_scenario(fake_servers, base_url, request_plan(options, options.concurrency, rng), options.concurrency)
+            results[scenario] = run_scenario(
+                fake_servers, base_url, request_plan(options, count, rng), options.concurrency
+            )
+            prefix = f"{label} " if label else ""
+            print(f"{prefix}{scenario}: {json.dumps(results[scenario]['overall'])}", file=sys.stderr)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of {', '.join(SCENARIOS)}.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent client connections.")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests in the warm scenario.")
+    parser.add_argument("--travel-share", type=float, default=0.5,
+                        help="Fraction of requests sent to the travel-recommendation endpoint.")
+    parser.add_argument("--travel-days", type=int, default=7, help="Travel dates are drawn from the next N days.")
+    parser.add_argument("--local-cache-ttl", type=float, default=1.0,
+                        help="WEATHER_LOCAL_CACHE_TTL of the application under test.")
+    parser.add_argument("--server-command", default=DEFAULT_SERVER_COMMAND,
+                        help="Command starting the application; {port} is replaced with the port to bind.")
+    parser.add_argument("--secondary", action="store_true",
+                        help="Start a second stand-in and configure it as the next forecast endpoint.")
+    parser.add_argument("--hedging", choices=("off", "on", "compare"), default="off",
+                        help="Run with hedged upstream requests off, on, or once each to compare tail latency.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    add_server_arguments(parser)
+    options = parser.parse_args()
+
+    scenarios = [scenario.strip() for scenario in options.scenarios.split(",") if scenario.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    fake_servers = [server_from_arguments(options, seed_offset) for seed_offset in range(2 if options.secondary else 1)]
+    forecast_urls = [fake_server.start_in_thread() for fake_server in fake_servers]
+
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "options": {key: value for key, value in vars(options).items() if key != "output"},
+        },
+    }
+    if options.hedging == "compare":
+        report["hedging"] = {
+            mode: run_suite(options, scenarios, fake_servers, forecast_urls, mode == "on", label=f"hedging {mode}")
+            for mode in ("off", "on")
+        }
+    else:
+        report["scenarios"] = run_suite(options, scenarios, fake_servers, forecast_urls, options.hedging == "on")
+
+    output = json.dumps(report, indent=2)
+    if options.output:
+        Path(options.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
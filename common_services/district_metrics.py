@@ -0,0 +1,113 @@
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+
+from common_services.district_registry import get_district_registry
+from common_services.forecast_aggregation import ForecastMatrix, rank_order
+from common_services.forecast_store import forecast_store
+from common_services.http_session import on_upstream_loop
+from common_services.single_flight import SingleFlight
+from common_services.stale_cache import hard_timeout, revalidator
+from common_services.tiered_cache import weather_cache
+from common_services.weather_helper import WeatherService
+
+logger = logging.getLogger(__name__)
+
+metric_flights = SingleFlight()
+
+
+def metric_ranking_key(spec):
+    return f"district_metric_{spec.key}"
+
+
+def metric_entries(districts, values, spec):
+    entries = []
+    for district, value in zip(districts, values):
+        if np.isnan(value):
+            entries.append({
+                "district": district.name,
+                "message": "No temperature data available for the requested time"
+            })
+            continue
+        entries.append({
+            "id": district.id,
+            "division_id": district.division_id,
+            "name": district.name,
+            "bn_name": district.bn_name,
+            "temperature": value,
+            "statistic": spec.statistic,
+            "hours": spec.hours,
+            "temperature_unit": "Celsius",
+            "latitude": district.lat,
+            "longitude": district.long,
+        })
+    return entries
+
+
+async def build_metric_ranking(spec):
+    """Rank every district by ``spec`` over its stored forecast, fetching the districts
+    the forecast store has no fresh forecast for.
+
+    ``generated_at`` is the fetch time of the oldest forecast used. Like the snapshot, a
+    ranking that used a forecast past the forecast store's freshness window, such as a
+    last good forecast after a provider failure, expires at once.
+    """
+    districts = get_district_registry()
+    coordinates = [(district.lat, district.long) for district in districts]
+    forecasts = await forecast_store.aget_many(coordinates)
+    missing_districts = [district for district, coordinate in zip(districts, coordinates) if coordinate not in forecasts]
+    if missing_districts:
+        logger.info("Fetching %s district forecasts for the %s ranking.", len(missing_districts), spec.key)
+        await WeatherService.fetch_coalesced_districts(missing_districts)
+        # Districts the provider failed on fall back to their last good forecast
+        forecasts.update(await forecast_store.aget_last_good_many(
+            (district.lat, district.long) for district in missing_districts
+        ))
+
+    ranked_rows = [row for row, coordinate in enumerate(coordinates) if coordinate in forecasts]
+    values = np.full(len(districts), np.nan)
+    if ranked_rows:
+        forecast_matrix = ForecastMatrix.from_forecasts([forecasts[coordinates[row]] for row in ranked_rows])
+        values[ranked_rows] = np.round(forecast_matrix.metric(spec), 2)
+    entries = metric_entries(districts, values.tolist(), spec)
+    used_forecasts = [forecasts[coordinates[row]] for row in ranked_rows]
+    stale = not all(forecast_store.is_fresh(forecast) for forecast in used_forecasts)
+    return {
+        "districts": [entries[index] for index in rank_order(values)],
+        "metric": {"hours": spec.hours, "statistic": spec.statistic},
+        "generated_at": min((forecast.fetched_at for forecast in used_forecasts), default=time.time()),
+        "expires_at": time.time() + (0 if stale else settings.DISTRICT_SNAPSHOT_TTL),
+    }
+
+
+async def refresh_metric_ranking(spec):
+    ranking = await build_metric_ranking(spec)
+    weather_cache.set(metric_ranking_key(spec), ranking, hard_timeout(ranking["expires_at"]))
+    return ranking
+
+
+@on_upstream_loop
+async def aget_metric_ranking(spec):
+    """The district ranking for ``spec``, built once per spec and cached like the snapshot.
+
+    A ranking past its ``expires_at`` is returned as is while one background task
+    rebuilds it.
+    """
+    cache_key = metric_ranking_key(spec)
+    ranking = weather_cache.get(cache_key)
+    if ranking is None:
+        ranking = await metric_flights.do(cache_key, refresh_metric_ranking, spec)
+    elif time.time() >= ranking["expires_at"]:
+        revalidator.schedule(cache_key, refresh_metric_ranking, spec)
+    return ranking
+
+
+def ranked_metric_districts(ranking, sort_order, limit, division_id=None):
+    districts = ranking["districts"]
+    if division_id is not None:
+        districts = [district for district in districts if district.get("division_id") == division_id]
+    if sort_order == "desc":
+        districts = sorted(districts, key=lambda x: x.get("temperature", float("inf")), reverse=True)
+    return districts[:limit]
@@ -0,0 +1,88 @@
+import functools
+import json
+import logging
+from types import MappingProxyType
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class District:
+    """One immutable district record from ``bd-districts.json``.
+
+    Fields keep their JSON names and string values, and can also be read with
+    ``district["name"]`` so code written against the raw JSON records keeps working.
+    ``latitude``/``longitude`` are the coordinates already parsed to floats.
+    """
+
+    __slots__ = ("id", "division_id", "name", "bn_name", "lat", "long", "latitude", "longitude")
+
+    FIELDS = ("id", "division_id", "name", "bn_name", "lat", "long")
+
+    def __init__(self, id, division_id, name, bn_name, lat, long):
+        for field, value in zip(self.FIELDS, (id, division_id, name, bn_name, lat, long)):
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, "latitude", float(lat))
+        object.__setattr__(self, "longitude", float(long))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("District records are immutable.")
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __reduce__(self):
+        return District, tuple(getattr(self, field) for field in self.FIELDS)
+
+    def __repr__(self):
+        return f"District(id={self.id!r}, name={self.name!r})"
+
+
+class DistrictRegistry:
+    """All districts in file order with O(1) lookups by name, Bangla name, id and division."""
+
+    def __init__(self, districts):
+        self.districts = tuple(districts)
+        self.names = tuple(district.name for district in self.districts)
+        self.by_name = MappingProxyType({district.name: district for district in self.districts})
+        self.by_bn_name = MappingProxyType({district.bn_name: district for district in self.districts})
+        self.by_id = MappingProxyType({district.id: district for district in self.districts})
+        by_division = {}
+        for district in self.districts:
+            by_division.setdefault(district.division_id, []).append(district)
+        self.by_division = MappingProxyType({
+            division_id: tuple(members) for division_id, members in by_division.items()
+        })
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, "r") as f:
+            records = json.load(f)["districts"]
+        return cls(District(**{field: record[field] for field in District.FIELDS}) for record in records)
+
+    def __iter__(self):
+        return iter(self.districts)
+
+    def __len__(self):
+        return len(self.districts)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def get(self, name):
+        """District called ``name``, or ``None``."""
+        return self.by_name.get(name)
+
+    def in_division(self, division_id):
+        return self.by_division.get(str(division_id), ())
+
+
+@functools.lru_cache(maxsize=None)
+def get_district_registry():
+    """The process-wide registry, loaded from ``DISTRICTS_FILE`` on first use."""
+    registry = DistrictRegistry.from_json(settings.DISTRICTS_FILE)
+    logger.info("Loaded %s districts from %s.", len(registry), settings.DISTRICTS_FILE)
+    return registry
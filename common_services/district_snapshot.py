@@ -0,0 +1,252 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from common_services.forecast_store import forecast_store
+from common_services.http_session import run_upstream_sync
+from common_services.response_bodies import encode_body
+from common_services.stale_cache import hard_timeout, revalidator
+from common_services.tiered_cache import weather_cache
+from common_services.weather_helper import WeatherService
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CACHE_KEY = "coolest_districts_snapshot"
+# Default page size of the coolest-districts endpoint; its bodies are rendered at publish time.
+DEFAULT_RANKING_LIMIT = 10
+
+_scheduler_lock = threading.Lock()
+_scheduler = None
+
+
+async def build_snapshot():
+    """Fetch every district and return the sorted ranking, dated by the data behind it.
+
+    ``generated_at`` is the fetch time of the oldest forecast the ranking was built from.
+    A ranking that used a forecast past the forecast store's freshness window, such as a
+    district's last good forecast after a provider failure, is marked ``stale``.
+    """
+    districts = await WeatherService.retrieve_district_weather_data()
+    forecasts = (await forecast_store.aget_last_good_many(
+        (district["latitude"], district["longitude"]) for district in districts if "latitude" in district
+    )).values()
+    return {
+        "districts": districts,
+        "generated_at": min((forecast.fetched_at for forecast in forecasts), default=time.time()),
+        "stale": not all(forecast_store.is_fresh(forecast) for forecast in forecasts),
+    }
+
+
+def snapshot_version(districts):
+    """Content hash of a ranking; equal rankings get equal versions whenever they were built."""
+    canonical = json.dumps(districts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+def publish_snapshot(snapshot):
+    """Replace the published ranking with ``snapshot`` in a single cache write.
+
+    The snapshot is stamped with its content ``version``, the time that content first
+    appeared (``modified_at``, kept across refreshes that change nothing) and the time it
+    turns stale (``expires_at``), which is now for a snapshot built ``stale``. A stale
+    snapshot keeps being served while a new one is built, for up to
+    ``WEATHER_CACHE_STALE_TTL`` seconds.
+    """
+    version = snapshot_version(snapshot["districts"])
+    published = get_published_snapshot()
+    if published is not None and published.get("version") == version and "divisions" in published:
+        # Same ranking as before: its division index and rollup still hold.
+        modified_at, divisions, division_rollup = published["modified_at"], published["divisions"], published["division_rollup"]
+    else:
+        modified_at = snapshot.get("generated_at") or time.time()
+        divisions = build_division_index(snapshot["districts"])
+        division_rollup = build_division_rollup(snapshot["districts"], divisions)
+    snapshot = {
+        **snapshot,
+        "version": version,
+        "modified_at": modified_at,
+        "expires_at": time.time() + (0 if snapshot.get("stale") else settings.DISTRICT_SNAPSHOT_TTL),
+        "divisions": divisions,
+        "division_rollup": division_rollup,
+    }
+    timeout = hard_timeout(snapshot["expires_at"])
+    bodies = {
+        ranking_body_key(version, sort_order, limit): encode_body(ranked_districts(snapshot, sort_order, limit))
+        for sort_order in ("asc", "desc")
+        for limit in {normalized_limit(snapshot, DEFAULT_RANKING_LIMIT), len(snapshot["districts"])}
+    }
+    bodies.update({
+        rollup_body_key(version, sort_order): encode_body(ranked_divisions(snapshot, sort_order))
+        for sort_order in ("asc", "desc")
+    })
+    weather_cache.set_many(bodies, timeout)
+    weather_cache.set(SNAPSHOT_CACHE_KEY, snapshot, timeout)
+    logger.info("Published coolest-districts snapshot %s with %s districts.", version, len(snapshot["districts"]))
+    return snapshot
+
+
+def build_division_index(districts):
+    """Positions of each division's districts in the ascending ranking, keyed by ``division_id``.
+
+    Districts without a temperature carry no ``division_id`` and are left out.
+    """
+    divisions = {}
+    for position, district in enumerate(districts):
+        if "division_id" in district and "average_temperature" in district:
+            divisions.setdefault(district["division_id"], []).append(position)
+    return divisions
+
+
+def build_division_rollup(districts, divisions):
+    """Min, mean and max 2 PM average of every division, coolest mean first."""
+    rollup = []
+    for division_id, positions in divisions.items():
+        temperatures = [districts[position]["average_temperature"] for position in positions]
+        rollup.append({
+            "division_id": division_id,
+            "district_count": len(temperatures),
+            # Positions follow the ascending ranking, so the extremes are at both ends.
+            "min_temperature": temperatures[0],
+            "mean_temperature": round(sum(temperatures) / len(temperatures), 2),
+            "max_temperature": temperatures[-1],
+            "temperature_unit": "Celsius",
+        })
+    rollup.sort(key=lambda division: (division["mean_temperature"], division["division_id"]))
+    return rollup
+
+
+def ranking_rows(snapshot, division_id=None):
+    """The ascending ranking, or the part of it in ``division_id`` looked up in the division index."""
+    if division_id is None:
+        return snapshot["districts"]
+    return [snapshot["districts"][position] for position in snapshot["divisions"].get(division_id, ())]
+
+
+def normalized_limit(snapshot, limit, division_id=None):
+    """Clamp ``limit`` to ``0..len(ranking)``: limits past either end select the same page,
+    so they share one body and one ETag."""
+    if division_id is None:
+        return max(0, min(limit, len(snapshot["districts"])))
+    return max(0, min(limit, len(snapshot["divisions"].get(division_id, ()))))
+
+
+def ranked_districts(snapshot, sort_order, limit, division_id=None):
+    districts = ranking_rows(snapshot, division_id)
+    if sort_order == "desc":
+        districts = sorted(districts, key=lambda x: x.get("average_temperature", float("inf")), reverse=True)
+    return districts[:limit]
+
+
+def ranked_divisions(snapshot, sort_order):
+    rollup = snapshot["division_rollup"]
+    return rollup[::-1] if sort_order == "desc" else rollup
+
+
+def ranking_body_key(version, sort_order, limit, division_id=None):
+    if division_id is None:
+        return f"coolest_districts_body_{version}_{sort_order}_{limit}"
+    return f"coolest_districts_body_{version}_division_{division_id}_{sort_order}_{limit}"
+
+
+def rollup_body_key(version, sort_order):
+    return f"coolest_districts_rollup_body_{version}_{sort_order}"
+
+
+def get_ranking_bodies(snapshot, sort_order, limit, division_id=None):
+    """Pre-rendered JSON bodies (per content encoding) of one page of ``snapshot``.
+
+    Bodies are keyed by the snapshot version, so a new ranking never serves old bytes.
+    Combinations not rendered at publish time are rendered once and cached for as long
+    as the snapshot may be served.
+    """
+    limit = normalized_limit(snapshot, limit, division_id)
+    cache_key = ranking_body_key(snapshot["version"], sort_order, limit, division_id)
+    bodies = weather_cache.get(cache_key)
+    if bodies is None:
+        bodies = encode_body(ranked_districts(snapshot, sort_order, limit, division_id))
+        weather_cache.set(cache_key, bodies, hard_timeout(snapshot["expires_at"]))
+    return bodies
+
+
+def get_rollup_bodies(snapshot, sort_order):
+    """Pre-rendered JSON bodies of the division rollup, rendered at publish time."""
+    cache_key = rollup_body_key(snapshot["version"], sort_order)
+    bodies = weather_cache.get(cache_key)
+    if bodies is None:
+        bodies = encode_body(ranked_divisions(snapshot, sort_order))
+        weather_cache.set(cache_key, bodies, hard_timeout(snapshot["expires_at"]))
+    return bodies
+
+
+def get_published_snapshot():
+    return weather_cache.get(SNAPSHOT_CACHE_KEY)
+
+
+async def arefresh_snapshot():
+    """Rebuild and publish the ranking.
+
+    A build where no district could be fetched is not published, so an upstream outage
+    keeps the previous ranking in place until it expires.
+    """
+    snapshot = await build_snapshot()
+    if not any("average_temperature" in district for district in snapshot["districts"]):
+        logger.error("Snapshot refresh returned no usable district data; keeping the published snapshot.")
+        return get_published_snapshot() or snapshot
+
+    return publish_snapshot(snapshot)
+
+
+def refresh_snapshot():
+    """Blocking variant of :func:`arefresh_snapshot` for threads and management commands."""
+    return run_upstream_sync(arefresh_snapshot())
+
+
+async def aget_or_build_snapshot():
+    """Return the published ranking, building it inline only when nothing is published yet.
+
+    A snapshot past its ``expires_at`` is returned as is while one background task
+    rebuilds it.
+    """
+    snapshot = get_published_snapshot()
+    if snapshot is None or "divisions" not in snapshot:
+        logger.info("No published snapshot found, building one inline.")
+        snapshot = await arefresh_snapshot()
+    elif time.time() >= snapshot["expires_at"]:
+        revalidator.schedule(SNAPSHOT_CACHE_KEY, arefresh_snapshot)
+    return snapshot
+
+
+class SnapshotRefresher(threading.Thread):
+    """Daemon thread that republishes the coolest-districts snapshot on a fixed cadence."""
+
+    def __init__(self, interval):
+        super().__init__(name="district-snapshot-refresher", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        logger.info("Snapshot refresher started with a %s second interval.", self.interval)
+        while not self._stop_event.is_set():
+            started_at = time.monotonic()
+            try:
+                refresh_snapshot()
+            except Exception:
+                logger.exception("Snapshot refresh failed.")
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started_at)))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_snapshot_scheduler(interval=None):
+    """Start the in-process refresher once per process and return it."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = SnapshotRefresher(interval or settings.DISTRICT_SNAPSHOT_REFRESH_INTERVAL)
+            _scheduler.start()
+        return _scheduler
@@ -0,0 +1,54 @@
+import json
+import logging
+import time
+
+from common_services.forecast_aggregation import rank_order
+from common_services.http_session import UpstreamStream
+from common_services.weather_helper import WeatherService
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+SSE_CONTENT_TYPE = "text/event-stream"
+
+
+def encode_ndjson(event, data):
+    return (json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n").encode()
+
+
+def encode_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+def district_name(result):
+    """Ranking entries carry ``name``; error entries only ``district``."""
+    return result.get("name") or result.get("district")
+
+
+async def district_events():
+    """``(event, data)`` pairs of a streamed ranking: one ``district`` event per district as
+    its entry arrives, then a ``ranking`` event with every district name, coolest first."""
+    started_at = time.monotonic()
+    results = []
+    async for source, result in WeatherService.stream_district_weather_data():
+        results.append(result)
+        yield "district", {"source": source, **result}
+
+    order = rank_order([result.get("average_temperature", float("inf")) for result in results])
+    logger.info("Streamed %s districts in %.1f ms.", len(results), (time.monotonic() - started_at) * 1000)
+    yield "ranking", {"order": [district_name(results[index]) for index in order]}
+
+
+def stream_district_events(encode, asynchronous):
+    """Encoded district events, consumable with ``async for`` when ``asynchronous`` (ASGI)
+    and with a plain ``for`` otherwise (WSGI), so neither server buffers the stream."""
+    stream = UpstreamStream(district_events())
+    if asynchronous:
+        async def encoded():
+            async for event, data in stream:
+                yield encode(event, data)
+    else:
+        def encoded():
+            for event, data in stream:
+                yield encode(event, data)
+    return encoded()
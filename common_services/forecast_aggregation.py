@@ -0,0 +1,199 @@
+import functools
+import re
+import warnings
+
+import numpy as np
+
+HOUR = np.timedelta64(1, "h")
+
+STATISTICS = {
+    "mean": np.nanmean,
+    "min": np.nanmin,
+    "max": np.nanmax,
+    "median": np.nanmedian,
+}
+
+# Whole percentiles only, so the number of distinct metric rankings (one cache entry each) stays bounded.
+PERCENTILE = re.compile(r"^p(\d{1,2}|100)$")
+
+
+class MetricSpec:
+    """Which hours of each day to look at and how to reduce them to one value per location.
+
+    ``start_hour``-``end_hour`` is an inclusive window of local hours, applied to every day
+    of the forecast; ``statistic`` is a key of ``STATISTICS`` or a percentile such as
+    ``p90``. The default spec is the 2 PM mean the rankings have always used.
+    """
+
+    __slots__ = ("start_hour", "end_hour", "statistic")
+
+    def __init__(self, start_hour=14, end_hour=None, statistic="mean"):
+        end_hour = start_hour if end_hour is None else end_hour
+        if not 0 <= start_hour <= end_hour <= 23:
+            raise ValueError("Hours must lie between 0 and 23, the window start first.")
+        percentile = PERCENTILE.match(statistic)
+        if statistic not in STATISTICS and not percentile:
+            raise ValueError(f"Unknown statistic '{statistic}'. Use {', '.join(STATISTICS)} or a percentile like p90.")
+        if percentile:
+            # p05 and p5 rank alike, so they share one key.
+            statistic = f"p{int(percentile.group(1))}"
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.statistic = statistic
+
+    @classmethod
+    def parse(cls, hours=None, statistic=None):
+        """Spec from query parameters: ``hours`` is ``"15"`` or ``"15-17"``; both default to the 2 PM mean."""
+        if hours is None:
+            start_hour, end_hour = 14, 14
+        else:
+            start, _, end = hours.partition("-")
+            try:
+                start_hour = int(start)
+                end_hour = int(end) if end else start_hour
+            except ValueError:
+                raise ValueError(f"Invalid hours '{hours}'. Use an hour like 14 or a window like 15-17.") from None
+        return cls(start_hour, end_hour, (statistic or "mean").lower())
+
+    @property
+    def hours(self):
+        return str(self.start_hour) if self.start_hour == self.end_hour else f"{self.start_hour}-{self.end_hour}"
+
+    @property
+    def key(self):
+        return f"h{self.hours}_{self.statistic}"
+
+    def __eq__(self, other):
+        return isinstance(other, MetricSpec) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"MetricSpec(hours={self.hours!r}, statistic={self.statistic!r})"
+
+
+DEFAULT_METRIC = MetricSpec()
+
+
+@functools.lru_cache(maxsize=256)
+def hour_offsets(first_hour_of_day, width, start_hour, end_hour):
+    """Column indexes of the hours ``start_hour``-``end_hour`` of every day in a ``width``
+    column axis whose first column is at ``first_hour_of_day`` o'clock.
+
+    Computed from offsets rather than by looking at the timestamps, and cached, since
+    every matrix built from one provider response shares its axis.
+    """
+    first_column = (start_hour - first_hour_of_day) % 24
+    day_starts = np.arange(first_column, width, 24)
+    offsets = (day_starts[:, None] + np.arange(end_hour - start_hour + 1)).ravel()
+    offsets = offsets[offsets < width]
+    offsets.setflags(write=False)
+    return offsets
+
+
+class HourlySeriesParser:
+    """Parses Open-Meteo ``(time_entries, value_entries)`` pairs into ``(hours, values)`` arrays.
+
+    Locations share one time axis in practice, so it is parsed once and reused. A series
+    that is empty, has an unparseable timestamp or value, or whose arrays differ in length
+    raises ValueError, so a caller can reject that location alone.
+    """
+
+    def __init__(self):
+        self.reference_times = None
+        self.reference_hours = None
+
+    def parse(self, time_entries, value_entries):
+        try:
+            if time_entries != self.reference_times:
+                hours = np.array(time_entries, dtype="datetime64[m]").astype("datetime64[h]")
+                if hours.ndim != 1 or np.isnat(hours).any():
+                    raise ValueError("Hourly times must be a list of timestamps.")
+                self.reference_times, self.reference_hours = time_entries, hours
+            values = np.array(value_entries, dtype=float)
+        except TypeError as error:
+            raise ValueError(str(error)) from None
+        if not self.reference_hours.size:
+            raise ValueError("Hourly series is empty.")
+        if values.shape != self.reference_hours.shape:
+            raise ValueError(f"{values.size} hourly values for {self.reference_hours.size} times.")
+        return self.reference_hours, values
+
+
+class ForecastMatrix:
+    """Hourly values of many locations held as one ``locations x hours`` float array.
+
+    Column ``j`` is the hour ``start + j``. Hours a location has no value for are NaN, so
+    every statistic is computed for all locations at once with NaN-aware reductions.
+    """
+
+    def __init__(self, start, values):
+        self.start = start
+        self.values = values
+
+    @classmethod
+    def from_hourly(cls, hourly_series):
+        """Build the matrix from ``(time_entries, value_entries)`` pairs in Open-Meteo format.
+
+        Raises ValueError if any series is malformed; see :class:`HourlySeriesParser`.
+        """
+        parser = HourlySeriesParser()
+        return cls.from_parsed([parser.parse(time_entries, value_entries) for time_entries, value_entries in hourly_series])
+
+    @classmethod
+    def from_parsed(cls, parsed_series):
+        """Build the matrix from non-empty ``(hours, values)`` pairs of equal-length arrays."""
+        if not parsed_series:
+            return cls(np.datetime64("1970-01-01T00", "h"), np.empty((0, 0)))
+
+        start = min(hours.min() for hours, _ in parsed_series)
+        end = max(hours.max() for hours, _ in parsed_series)
+        values = np.full((len(parsed_series), int((end - start) // HOUR) + 1), np.nan)
+        for row, (hours, row_values) in enumerate(parsed_series):
+            values[row, ((hours - start) // HOUR).astype(int)] = row_values
+        return cls(start, values)
+
+    @classmethod
+    def from_forecasts(cls, forecasts):
+        """Build the matrix from stored forecasts, aligning rows on their start hours."""
+        if not forecasts:
+            return cls(np.datetime64("1970-01-01T00", "h"), np.empty((0, 0)))
+
+        start = min(forecast.start for forecast in forecasts)
+        offsets = [int((forecast.start - start) // HOUR) for forecast in forecasts]
+        width = max(offset + len(forecast.temperatures) for offset, forecast in zip(offsets, forecasts))
+        values = np.full((len(forecasts), width), np.nan)
+        for row, (offset, forecast) in enumerate(zip(offsets, forecasts)):
+            values[row, offset:offset + len(forecast.temperatures)] = forecast.temperatures
+        return cls(start, values)
+
+    @property
+    def hours(self):
+        return self.start + np.arange(self.values.shape[1]) * HOUR
+
+    def hour_columns(self, start_hour, end_hour):
+        """Indexes of the columns at ``start_hour``-``end_hour`` o'clock on every day."""
+        first_hour_of_day = int((self.start - self.start.astype("datetime64[D]")) // HOUR)
+        return hour_offsets(first_hour_of_day, self.values.shape[1], start_hour, end_hour)
+
+    def metric(self, spec=DEFAULT_METRIC):
+        """Value of ``spec`` for every row; NaN where a row has no data in the window."""
+        return self.reduce(self.hour_columns(spec.start_hour, spec.end_hour), spec.statistic)
+
+    def reduce(self, columns, statistic="mean"):
+        """Apply ``statistic`` over the selected columns (a mask or indexes) of every row; NaN
+        where a row has no data."""
+        selected = self.values[:, columns]
+        if selected.shape[1] == 0:
+            return np.full(self.values.shape[0], np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if statistic.startswith("p"):
+                return np.nanpercentile(selected, float(statistic[1:]), axis=1)
+            return STATISTICS[statistic](selected, axis=1)
+
+
+def rank_order(values):
+    """Indices that sort ``values`` ascending, NaN last, ties kept in input order."""
+    return np.argsort(np.asarray(values, dtype=float), kind="stable")
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from common_services.tiered_cache import weather_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastArchive:
+    """Durable copy of the forecast store in the ``StoredForecast`` table.
+
+    Upstream I/O runs on an event loop where the ORM may not be used, so every query runs
+    on one dedicated thread: writes are queued behind the request that fetched the
+    forecasts, and reads are ordered after pending writes. Coroutines read through
+    :meth:`aload_many`, which waits for the thread without blocking the loop.
+    Database errors (for example an unmigrated database) are logged and treated as an
+    empty archive.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast-archive")
+
+    @staticmethod
+    def to_record(forecast):
+        from coolest_districts.models import StoredForecast
+
+        return StoredForecast(
+            location_key=forecast.key,
+            latitude=forecast.latitude,
+            longitude=forecast.longitude,
+            start_hour=int(forecast.start.astype("int64")),
+            temperatures=forecast.temperatures.astype("<f4").tobytes(),
+            fetched_at=forecast.fetched_at,
+        )
+
+    @staticmethod
+    def from_record(record):
+        from common_services.forecast_store import LocationForecast
+
+        return LocationForecast(
+            record.latitude,
+            record.longitude,
+            np.datetime64(record.start_hour, "h"),
+            np.frombuffer(bytes(record.temperatures), dtype="<f4"),
+            fetched_at=record.fetched_at,
+        )
+
+    def save_many(self, forecasts):
+        """Queue ``forecasts`` to be written, replacing the rows of the same locations."""
+        if settings.FORECAST_ARCHIVE_ENABLED and forecasts:
+            self._executor.submit(self._save, [self.to_record(forecast) for forecast in forecasts])
+
+    def load_many(self, keys):
+        """Stored forecasts under the location ``keys`` as ``{key: LocationForecast}``."""
+        if not settings.FORECAST_ARCHIVE_ENABLED or not keys:
+            return {}
+        return self._executor.submit(self._load, list(keys)).result()
+
+    async def aload_many(self, keys):
+        """:meth:`load_many` for coroutines."""
+        if not settings.FORECAST_ARCHIVE_ENABLED or not keys:
+            return {}
+        return await asyncio.wrap_future(self._executor.submit(self._load, list(keys)))
+
+    def load_recent(self, max_age):
+        """Every stored forecast fetched within the last ``max_age`` seconds."""
+        if not settings.FORECAST_ARCHIVE_ENABLED:
+            return []
+        return self._executor.submit(self._load_recent, max_age).result()
+
+    def flush(self):
+        """Wait until every queued write has been made."""
+        self._executor.submit(lambda: None).result()
+
+    def clear(self):
+        """Delete every stored forecast (tests)."""
+        self._executor.submit(self._clear).result()
+
+    @staticmethod
+    def _save(records):
+        from coolest_districts.models import StoredForecast
+
+        close_old_connections()
+        try:
+            StoredForecast.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=["location_key"],
+                update_fields=["latitude", "longitude", "start_hour", "temperatures", "fetched_at"],
+            )
+        except DatabaseError:
+            logger.exception("Could not archive %s forecasts.", len(records))
+
+    @staticmethod
+    def _clear():
+        from coolest_districts.models import StoredForecast
+
+        close_old_connections()
+        StoredForecast.objects.all().delete()
+
+    def _load(self, keys):
+        from coolest_districts.models import StoredForecast
+
+        close_old_connections()
+        try:
+            return {
+                record.location_key: self.from_record(record)
+                for record in StoredForecast.objects.filter(location_key__in=keys)
+            }
+        except DatabaseError:
+            logger.exception("Could not read archived forecasts.")
+            return {}
+
+    def _load_recent(self, max_age):
+        from coolest_districts.models import StoredForecast
+
+        close_old_connections()
+        try:
+            return [
+                self.from_record(record)
+                for record in StoredForecast.objects.filter(fetched_at__gte=time.time() - max_age)
+            ]
+        except DatabaseError:
+            logger.exception("Could not read archived forecasts.")
+            return []
+
+
+forecast_archive = ForecastArchive()
+
+
+def warm_forecast_store():
+    """Load the archived forecasts still worth serving into the weather cache; run once per worker at boot."""
+    started_at = time.monotonic()
+    forecasts = forecast_archive.load_recent(settings.FORECAST_LAST_GOOD_TTL)
+    for forecast in forecasts:
+        remaining = int(forecast.fetched_at + settings.FORECAST_LAST_GOOD_TTL - time.time())
+        if remaining > 0:
+            weather_cache.set(forecast.key, forecast, remaining)
+    logger.info("Warmed the forecast store with %s archived forecasts in %.1f ms.",
+                len(forecasts), (time.monotonic() - started_at) * 1000)
+    return len(forecasts)
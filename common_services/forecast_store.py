@@ -0,0 +1,145 @@
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+
+from common_services.forecast_aggregation import HOUR
+from common_services.forecast_archive import forecast_archive
+from common_services.hash_key_generate import coordinate_key
+from common_services.tiered_cache import weather_cache
+
+logger = logging.getLogger(__name__)
+
+FORECAST_STORE_EXPIRATION = 600
+
+
+def location_key(latitude, longitude):
+    """Cache key of a location's full forecast."""
+    return f"forecast_{coordinate_key(latitude, longitude)}"
+
+
+class LocationForecast:
+    """Full hourly temperature series of one location, stored as a float32 array.
+
+    ``start`` is the local hour of the first value; value ``i`` is the hour ``start + i``.
+    """
+
+    __slots__ = ("latitude", "longitude", "start", "temperatures", "fetched_at")
+
+    def __init__(self, latitude, longitude, start, temperatures, fetched_at=None):
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+        self.start = np.datetime64(start, "h")
+        self.temperatures = np.asarray(temperatures, dtype=np.float32)
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    @property
+    def key(self):
+        return location_key(self.latitude, self.longitude)
+
+    @property
+    def first_date(self):
+        return self.start.astype("datetime64[D]")
+
+    @property
+    def last_date(self):
+        return (self.start + (len(self.temperatures) - 1) * HOUR).astype("datetime64[D]")
+
+    def covers(self, date):
+        """Whether ``date`` (``YYYY-MM-DD``) lies inside the stored horizon."""
+        return self.first_date <= np.datetime64(date, "D") <= self.last_date
+
+    def temperature_at(self, date, hour):
+        """Temperature at ``hour`` o'clock on ``date``, or ``None`` if it is not stored."""
+        index = int((np.datetime64(f"{date}T{hour:02d}", "h") - self.start) // HOUR)
+        if not 0 <= index < len(self.temperatures):
+            return None
+        temperature = self.temperatures[index]
+        return None if np.isnan(temperature) else round(float(temperature), 2)
+
+    def temperatures_at(self, dates, hour):
+        """Temperatures at ``hour`` o'clock on each of ``dates`` (a ``datetime64[D]`` array), NaN where not stored."""
+        indexes = ((dates + hour * HOUR) - self.start) // HOUR
+        temperatures = np.full(len(indexes), np.nan)
+        stored = (indexes >= 0) & (indexes < len(self.temperatures))
+        temperatures[stored] = self.temperatures[indexes[stored]]
+        return np.round(temperatures, 2)
+
+
+class ForecastStore:
+    """Location-keyed store of full forecasts shared by every endpoint.
+
+    Forecasts are served for ``FORECAST_STORE_EXPIRATION`` seconds after they were fetched
+    but kept for ``FORECAST_LAST_GOOD_TTL``, so the last good forecast of a location is
+    still at hand when the provider fails. Every forecast is also written to the
+    database archive, which answers cache misses and survives restarts.
+    """
+
+    @staticmethod
+    def is_fresh(forecast):
+        return time.time() - forecast.fetched_at < FORECAST_STORE_EXPIRATION
+
+    def get(self, latitude, longitude):
+        return self.fresh_only(self.get_last_good(latitude, longitude))
+
+    async def aget(self, latitude, longitude):
+        return self.fresh_only(await self.aget_last_good(latitude, longitude))
+
+    def get_many(self, coordinates):
+        """Map each ``(latitude, longitude)`` pair that has a fresh stored forecast to it."""
+        return self.fresh_many(self.get_last_good_many(coordinates))
+
+    async def aget_many(self, coordinates):
+        return self.fresh_many(await self.aget_last_good_many(coordinates))
+
+    def get_last_good(self, latitude, longitude):
+        """Most recent forecast of the location, however old, or ``None``."""
+        return self.get_last_good_many([(latitude, longitude)]).get((latitude, longitude))
+
+    async def aget_last_good(self, latitude, longitude):
+        return (await self.aget_last_good_many([(latitude, longitude)])).get((latitude, longitude))
+
+    def get_last_good_many(self, coordinates):
+        keys, stored, missing_keys = self.lookup_cached(coordinates)
+        if missing_keys:
+            self.add_archived(stored, forecast_archive.load_many(missing_keys))
+        return {keys[key]: forecast for key, forecast in stored.items()}
+
+    async def aget_last_good_many(self, coordinates):
+        """:meth:`get_last_good_many` for coroutines on the upstream loop; archive reads
+        wait without blocking it."""
+        keys, stored, missing_keys = self.lookup_cached(coordinates)
+        if missing_keys:
+            self.add_archived(stored, await forecast_archive.aload_many(missing_keys))
+        return {keys[key]: forecast for key, forecast in stored.items()}
+
+    def fresh_only(self, forecast):
+        return forecast if forecast is not None and self.is_fresh(forecast) else None
+
+    def fresh_many(self, forecasts):
+        return {coordinate: forecast for coordinate, forecast in forecasts.items() if self.is_fresh(forecast)}
+
+    @staticmethod
+    def lookup_cached(coordinates):
+        keys = {location_key(latitude, longitude): (latitude, longitude) for latitude, longitude in coordinates}
+        stored = weather_cache.get_many(list(keys))
+        return keys, stored, [key for key in keys if key not in stored]
+
+    def add_archived(self, stored, archived):
+        if archived:
+            self.cache_many(archived.values())
+            stored.update(archived)
+
+    @staticmethod
+    def cache_many(forecasts):
+        retention = max(FORECAST_STORE_EXPIRATION, settings.FORECAST_LAST_GOOD_TTL)
+        weather_cache.set_many({forecast.key: forecast for forecast in forecasts}, retention)
+
+    def put_many(self, forecasts):
+        self.cache_many(forecasts)
+        forecast_archive.save_many(forecasts)
+        logger.debug("Stored %s location forecasts.", len(forecasts))
+
+
+forecast_store = ForecastStore()
@@ -1,4 +1,9 @@
 import hashlib
 
 def sanitize_cache_key(name):
-    return hashlib.md5(name.encode()).hexdigest()
\ No newline at end of file
+    return hashlib.md5(name.encode()).hexdigest()
+
+
+def coordinate_key(latitude, longitude):
+    """Canonical text form of a coordinate pair; ~10 m precision so equal places share keys."""
+    return f"{float(latitude):.4f}_{float(longitude):.4f}"
@@ -0,0 +1,168 @@
+import asyncio
+import atexit
+import functools
+import logging
+import os
+import queue
+import threading
+
+import aiohttp
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_loop_lock = threading.Lock()
+_upstream_loop = None
+_upstream_loop_pid = None
+_client_session = None
+
+
+def _run_loop(loop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_upstream_loop():
+    """Return the process-wide event loop that owns all upstream I/O.
+
+    The loop runs in a daemon thread so synchronous callers (WSGI workers, management
+    commands, the snapshot refresher) and async views share one loop and therefore one
+    pooled client session. A forked worker gets its own loop on first use.
+    """
+    global _upstream_loop, _upstream_loop_pid, _client_session
+    if _upstream_loop is not None and _upstream_loop_pid == os.getpid():
+        return _upstream_loop
+
+    with _loop_lock:
+        if _upstream_loop is None or _upstream_loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=_run_loop, args=(loop,), name="upstream-event-loop", daemon=True).start()
+            _upstream_loop, _upstream_loop_pid, _client_session = loop, os.getpid(), None
+            logger.info("Started upstream event loop for process %s.", _upstream_loop_pid)
+        return _upstream_loop
+
+
+def run_upstream_sync(coroutine):
+    """Run ``coroutine`` on the upstream loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_upstream_loop()).result()
+
+
+def on_upstream_loop(coroutine_function):
+    """Make an async function always execute on the upstream loop.
+
+    Awaiting the decorated function from any other loop (an ASGI server loop, or the
+    short-lived loop Django creates for async views under WSGI) hands the work over to
+    the upstream loop without blocking the caller's loop.
+    """
+
+    @functools.wraps(coroutine_function)
+    async def wrapper(*args, **kwargs):
+        loop = get_upstream_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coroutine_function(*args, **kwargs)
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coroutine_function(*args, **kwargs), loop)
+        )
+
+    return wrapper
+
+
+class UpstreamStream:
+    """Consume an async generator that runs on the upstream loop, item by item.
+
+    Iterate it synchronously from a WSGI thread (each item blocks until produced) or
+    asynchronously from any other loop; either way items are handed over as soon as the
+    generator yields them. An exception in the generator is raised in the consumer, and a
+    consumer that stops early (a disconnected client) cancels the generator.
+    """
+
+    _END = object()
+
+    def __init__(self, async_generator):
+        self._async_generator = async_generator
+        self._future = None
+
+    def _start(self, put):
+        async def pump():
+            try:
+                async for item in self._async_generator:
+                    put(item)
+            except Exception as error:
+                put((self._END, error))
+            else:
+                put((self._END, None))
+
+        self._future = asyncio.run_coroutine_threadsafe(pump(), get_upstream_loop())
+
+    def _unwrap(self, item):
+        if isinstance(item, tuple) and len(item) == 2 and item[0] is self._END:
+            if item[1] is not None:
+                raise item[1]
+            return self._END
+        return item
+
+    def __iter__(self):
+        items = queue.SimpleQueue()
+        self._start(items.put)
+        try:
+            while (item := self._unwrap(items.get())) is not self._END:
+                yield item
+        finally:
+            self._future.cancel()
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        items = asyncio.Queue()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, item)
+            except RuntimeError:
+                pass  # The consumer's loop is already closed; nobody is listening.
+
+        self._start(put)
+        try:
+            while (item := self._unwrap(await items.get())) is not self._END:
+                yield item
+        finally:
+            self._future.cancel()
+
+
+async def get_client_session():
+    """Return the pooled ``aiohttp.ClientSession``; must be awaited on the upstream loop."""
+    global _client_session
+    if _client_session is None or _client_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=settings.UPSTREAM_POOL_LIMIT,
+            limit_per_host=settings.UPSTREAM_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=settings.UPSTREAM_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=settings.UPSTREAM_DNS_CACHE_TTL,
+        )
+        _client_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=settings.UPSTREAM_REQUEST_TIMEOUT),
+        )
+        logger.info("Opened pooled upstream client session.")
+    return _client_session
+
+
+async def _close_client_session():
+    global _client_session
+    if _client_session is not None and not _client_session.closed:
+        await _client_session.close()
+    _client_session = None
+
+
+@atexit.register
+def close_upstream_loop():
+    """Close the pooled session and stop the upstream loop at interpreter shutdown."""
+    global _upstream_loop
+    loop = _upstream_loop
+    if loop is None or _upstream_loop_pid != os.getpid() or not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_close_client_session(), loop).result(timeout=5)
+    except Exception:
+        logger.exception("Failed to close the upstream client session cleanly.")
+    loop.call_soon_threadsafe(loop.stop)
+    _upstream_loop = None
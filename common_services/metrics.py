@@ -0,0 +1,311 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """One metric family; values live in the :class:`MetricsRegistry` that created it."""
+
+    __slots__ = ("registry", "name", "documentation", "kind", "labelnames", "buckets")
+
+    def __init__(self, registry, name, documentation, kind, labelnames, buckets=None):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if buckets is not None else None
+
+    def inc(self, *labelvalues, amount=1):
+        self.registry.add(self, labelvalues, amount)
+
+    def dec(self, *labelvalues, amount=1):
+        self.registry.add(self, labelvalues, -amount)
+
+    def set(self, value, *labelvalues):
+        self.registry.set(self, labelvalues, value)
+
+    def observe(self, value, *labelvalues):
+        self.registry.observe(self, labelvalues, value)
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms rendered in the Prometheus text format.
+
+    Updates are a dictionary change under a lock, cheap enough to leave on for every
+    request. With ``METRICS_DIR`` set, each process writes its values to
+    ``METRICS_DIR/metrics_<pid>.json`` every ``METRICS_FLUSH_INTERVAL`` seconds and a scrape
+    sums the files of all processes, so whichever gunicorn worker answers ``/metrics``
+    reports the whole server. Counters and histograms of workers that have exited are
+    kept, so totals never go backwards; their gauges are dropped.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._values = {}
+        self._pid = os.getpid()
+        self._flusher = None
+
+    def _register(self, name, documentation, kind, labelnames, buckets=None):
+        metric = Metric(self, name, documentation, kind, labelnames, buckets)
+        self.metrics[name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(name, documentation, "counter", labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(name, documentation, "gauge", labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(name, documentation, "histogram", labelnames, buckets)
+
+    def _series(self, metric):
+        """This process's series of ``metric``; resets the values inherited across a fork."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._values = {}
+            self._flusher = None
+        if self._flusher is None and settings.METRICS_DIR:
+            self._start_flusher()
+        return self._values.setdefault(metric.name, {})
+
+    def add(self, metric, labelvalues, amount):
+        labelvalues = tuple(str(label) for label in labelvalues)
+        with self._lock:
+            series = self._series(metric)
+            series[labelvalues] = series.get(labelvalues, 0) + amount
+
+    def set(self, metric, labelvalues, value):
+        labelvalues = tuple(str(label) for label in labelvalues)
+        with self._lock:
+            self._series(metric)[labelvalues] = value
+
+    def observe(self, metric, labelvalues, value):
+        labelvalues = tuple(str(label) for label in labelvalues)
+        bucket = bisect.bisect_left(metric.buckets, value)
+        with self._lock:
+            series = self._series(metric)
+            state = series.get(labelvalues)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then the +Inf bucket, sum and count.
+                state = series[labelvalues] = [0] * (len(metric.buckets) + 1) + [0.0, 0]
+            state[bucket] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def local_values(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return {}
+            return {
+                name: {labelvalues: (list(state) if isinstance(state, list) else state)
+                       for labelvalues, state in series.items()}
+                for name, series in self._values.items()
+            }
+
+    # Multi-process aggregation
+
+    def _path(self, pid):
+        return Path(settings.METRICS_DIR) / f"metrics_{pid}.json"
+
+    def _start_flusher(self):
+        self._flusher = threading.Thread(target=self._flush_forever, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_forever(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        """Write this process's values to its file in ``METRICS_DIR``."""
+        if not settings.METRICS_DIR:
+            return
+        pid = os.getpid()
+        values = self.local_values()
+        document = {
+            name: [[list(labelvalues), state] for labelvalues, state in series.items()]
+            for name, series in values.items()
+        }
+        path = self._path(pid)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix(".tmp")
+            temporary.write_text(json.dumps(document))
+            os.replace(temporary, path)
+        except OSError:
+            logger.exception("Could not write metrics to %s", path)
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def collect(self):
+        """Values of every process: ``{name: {labelvalues: value or histogram state}}``."""
+        if not settings.METRICS_DIR:
+            return self.local_values()
+
+        self.flush()
+        merged = {}
+        for path in Path(settings.METRICS_DIR).glob("metrics_*.json"):
+            try:
+                pid = int(path.stem.split("_", 1)[1])
+                document = json.loads(path.read_text())
+            except (ValueError, OSError):
+                continue
+            alive = self._alive(pid)
+            for name, series in document.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                target = merged.setdefault(name, {})
+                for labelvalues, state in series:
+                    labelvalues = tuple(labelvalues)
+                    current = target.get(labelvalues)
+                    if current is None:
+                        target[labelvalues] = state
+                    elif isinstance(state, list):
+                        target[labelvalues] = [a + b for a, b in zip(current, state)]
+                    else:
+                        target[labelvalues] = current + state
+        return merged
+
+    def render(self):
+        values = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labelvalues, state in sorted(values.get(name, {}).items()):
+                labels = dict(zip(metric.labelnames, labelvalues))
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{format_labels(labels)} {format_value(state)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), state[:-2]):
+                    cumulative += count
+                    bucket_labels = {**labels, "le": format_value(bound)}
+                    lines.append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(state[-2])}")
+                lines.append(f"{name}_count{format_labels(labels)} {state[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Forget this process's values (tests)."""
+        with self._lock:
+            self._values = {}
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+http_request_duration = registry.histogram(
+    "coolescape_http_request_duration_seconds",
+    "Time spent answering HTTP requests, by endpoint.",
+    ("endpoint", "method", "status"),
+)
+upstream_request_duration = registry.histogram(
+    "coolescape_upstream_request_duration_seconds",
+    "Time spent on Open-Meteo calls, by kind of call and response status.",
+    ("call", "status"),
+)
+upstream_in_flight = registry.gauge(
+    "coolescape_upstream_in_flight",
+    "Open-Meteo calls currently in flight.",
+)
+cache_requests = registry.counter(
+    "coolescape_cache_requests_total",
+    "Weather cache lookups, by key namespace, tier and result.",
+    ("namespace", "tier", "result"),
+)
+
+# Longest prefixes first, so "forecast_window_" wins over "forecast_".
+CACHE_NAMESPACES = (
+    "coolest_districts_snapshot",
+    "coolest_districts_rollup_body_",
+    "coolest_districts_body_",
+    "district_metric_",
+    "forecast_window_",
+    "compare_weather_",
+    "travel_matrix_",
+    "forecast_",
+    "weather_",
+)
+DIGEST_KEY = re.compile(r"^[0-9a-f]{32}$")
+
+
+def cache_namespace(key):
+    """Low-cardinality label for a weather cache key."""
+    for prefix in CACHE_NAMESPACES:
+        if key.startswith(prefix):
+            return prefix.rstrip("_")
+    if DIGEST_KEY.match(key):
+        return "district_weather"
+    return "other"
+
+
+class UpstreamCall:
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status = "error"
+
+
+@contextmanager
+def track_upstream(call):
+    """Time one Open-Meteo call; set ``.status`` on the yielded object to the HTTP status."""
+    tracked = UpstreamCall()
+    upstream_in_flight.inc()
+    started_at = time.perf_counter()
+    try:
+        yield tracked
+    finally:
+        upstream_in_flight.dec()
+        upstream_request_duration.observe(time.perf_counter() - started_at, call, tracked.status)
+
+
+def metrics_view(request):
+    """Prometheus text exposition of every worker's metrics."""
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,55 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from common_services.metrics import http_request_duration
+
+
+def endpoint_label(request):
+    """URL name of the matched route, so the label stays bounded whatever paths are requested.
+
+    Unnamed routes are labelled by their route pattern: ``view_name`` would fall back to
+    the view's dotted path, which every route of one ViewSet shares.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    if match.url_name:
+        return match.view_name
+    return match.route or "unnamed"
+
+
+class RequestMetricsMiddleware:
+    """Record the latency of every request per endpoint, method and status.
+
+    Runs natively under both WSGI and ASGI so it adds no sync/async thread hop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started_at = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, started_at)
+        return response
+
+    async def __acall__(self, request):
+        started_at = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, started_at)
+        return response
+
+    @staticmethod
+    def record(request, response, started_at):
+        http_request_duration.observe(
+            time.perf_counter() - started_at, endpoint_label(request), request.method, response.status_code
+        )
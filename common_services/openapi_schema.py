@@ -0,0 +1,78 @@
+import functools
+import hashlib
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.module_loading import autodiscover_modules
+
+logger = logging.getLogger(__name__)
+
+# Artifact file and content type per schema format, matching drf-spectacular's own renderers.
+SCHEMA_ARTIFACTS = {
+    "yaml": ("schema.yaml", "application/vnd.oai.openapi; charset=utf-8"),
+    "json": ("schema.json", "application/vnd.oai.openapi+json"),
+}
+
+
+def load_view_schemas(endpoints, **kwargs):
+    """drf-spectacular preprocessing hook that imports every app's ``schema`` module.
+
+    The modules hold the OpenAPI documentation of the views as view extensions, so it is
+    only evaluated when a schema is actually generated, not when the views are imported.
+    """
+    autodiscover_modules("schema")
+    return endpoints
+
+
+@functools.lru_cache(maxsize=None)
+def load_schema_artifact(schema_format):
+    """Bytes and ETag of the prebuilt schema in ``OPENAPI_SCHEMA_DIR``, or ``None`` if it was not built."""
+    path = Path(settings.OPENAPI_SCHEMA_DIR) / SCHEMA_ARTIFACTS[schema_format][0]
+    try:
+        body = path.read_bytes()
+    except FileNotFoundError:
+        logger.warning("No prebuilt OpenAPI schema at %s; generating it per request.", path)
+        return None
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def requested_format(request):
+    requested = request.GET.get("format", "")
+    if requested in ("json", "openapi-json"):
+        return "json"
+    if requested in ("yaml", "openapi"):
+        return "yaml"
+    return "json" if "json" in request.headers.get("Accept", "") else "yaml"
+
+
+def schema_view(request):
+    """Serve the OpenAPI schema from the build-time artifact, generating it only as a fallback."""
+    schema_format = requested_format(request)
+    artifact = load_schema_artifact(schema_format)
+    if artifact is None:
+        from drf_spectacular.views import SpectacularAPIView
+
+        return SpectacularAPIView.as_view()(request)
+
+    body, etag = artifact
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type=SCHEMA_ARTIFACTS[schema_format][1])
+    response["ETag"] = etag
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+def swagger_ui_view(request):
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    return SpectacularSwaggerView.as_view(url_name="schema")(request)
+
+
+def redoc_view(request):
+    from drf_spectacular.views import SpectacularRedocView
+
+    return SpectacularRedocView.as_view(url_name="schema")(request)
@@ -0,0 +1,63 @@
+import gzip
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip and identity bodies are always available
+    brotli = None
+
+# Preferred first when a client accepts several with the same quality.
+ENCODINGS = ("br", "gzip", "identity") if brotli is not None else ("gzip", "identity")
+
+
+def encode_body(data):
+    """Render ``data`` exactly as DRF's JSONRenderer would and return it in every supported encoding."""
+    body = JSONRenderer().render(data)
+    bodies = {"identity": body, "gzip": gzip.compress(body, mtime=0)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body)
+    return bodies
+
+
+def accepted_encodings(accept_encoding):
+    """Map each coding named in an ``Accept-Encoding`` header to its quality value."""
+    qualities = {}
+    for coding in (accept_encoding or "").split(","):
+        name, _, parameters = coding.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        parameter_name, _, value = parameters.strip().partition("=")
+        if parameter_name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding, available):
+    """Pick the compressed coding in ``available`` the client rates highest, else ``identity``."""
+    qualities = accepted_encodings(accept_encoding)
+    best_encoding, best_quality = "identity", 0.0
+    for encoding in ENCODINGS:
+        if encoding == "identity" or encoding not in available:
+            continue
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+def encoded_response(bodies, accept_encoding, encoding=None):
+    """Send pre-rendered JSON ``bodies`` in ``encoding``, by default the one the client prefers."""
+    encoding = encoding or choose_encoding(accept_encoding, bodies)
+    response = HttpResponse(bodies[encoding], content_type="application/json")
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import uuid
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+
+from common_services.tiered_cache import weather_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesce concurrent loads of the same key onto one in-flight future.
+
+    All upstream work runs on the single upstream loop, so a plain dict of futures is
+    enough to make followers wait for the leader within a process.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def join(self, key):
+        """Return ``(future, is_leader)``; the leader must :meth:`settle` the key."""
+        future = self._calls.get(key)
+        if future is not None:
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        return future, True
+
+    def settle(self, key, result=None, error=None):
+        future = self._calls.pop(key, None)
+        if future is None or future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+            future.exception()  # followers are optional, do not warn about an unretrieved error
+        else:
+            future.set_result(result)
+
+    async def wait(self, future):
+        """Await a leader's future without letting a follower's cancellation cancel it."""
+        return await asyncio.shield(future)
+
+    async def do(self, key, coroutine_function, *args, **kwargs):
+        """Run ``coroutine_function`` once per key, sharing its result with concurrent callers."""
+        while True:
+            future, is_leader = self.join(key)
+            if is_leader:
+                break
+            try:
+                return await self.wait(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled; retry and possibly take over the load.
+
+        try:
+            result = await coroutine_function(*args, **kwargs)
+        except BaseException as error:
+            self.settle(key, error=error)
+            raise
+        self.settle(key, result)
+        return result
+
+
+def peer_lock_key(cache_key):
+    return f"single_flight_lock_{cache_key}"
+
+
+@asynccontextmanager
+async def peer_lock(cache_key):
+    """Try to become the cross-worker leader for ``cache_key``.
+
+    Yields ``True`` when this worker holds the lock (or locking is disabled) and should
+    fetch. The lock lives in the shared cache tier, so its atomicity is that of the shared
+    backend's ``add`` (atomic on Redis and Memcached, best effort on the file cache). It
+    expires after ``SINGLE_FLIGHT_LOCK_TIMEOUT`` if its holder dies.
+    """
+    if not settings.SINGLE_FLIGHT_CACHE_LOCK:
+        yield True
+        return
+
+    lock_key = peer_lock_key(cache_key)
+    token = uuid.uuid4().hex
+    acquired = weather_cache.shared.add(lock_key, token, settings.SINGLE_FLIGHT_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired and weather_cache.shared.get(lock_key) == token:
+            weather_cache.shared.delete(lock_key)
+
+
+async def wait_for_peer(cache_key, accept=None):
+    """Poll the cache until the worker holding the lock publishes ``cache_key``.
+
+    ``accept`` can reject values already in the cache that are too old to count as the
+    peer's result. Returns ``None`` when the holder gives up or the wait times out, in which
+    case the caller fetches the value itself.
+    """
+    def published():
+        cached_value = weather_cache.get(cache_key)
+        return cached_value if cached_value and (accept is None or accept(cached_value)) else None
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+    while loop.time() < deadline:
+        cached_value = published()
+        if cached_value:
+            return cached_value
+        if weather_cache.shared.get(peer_lock_key(cache_key)) is None:
+            return published()
+        await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+
+    logger.warning("Timed out waiting for another worker to fetch %s.", cache_key)
+    return None
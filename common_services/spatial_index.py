@@ -0,0 +1,101 @@
+import functools
+import math
+from collections import defaultdict
+
+from django.conf import settings
+
+from common_services.district_registry import get_district_registry
+
+SNAP_MODES = ("off", "district", "grid")
+
+
+class DistrictSpatialIndex:
+    """Uniform lat/lon grid over district centroids for nearest-district lookups.
+
+    A query scans its own cell and then rings of neighbouring cells, stopping once the
+    closest district found is nearer than anything the next ring could hold.
+    """
+
+    def __init__(self, districts, cell_size=1.0):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        for district in districts:
+            self.cells[self.cell_of(district.latitude, district.longitude)].append(
+                (district.latitude, district.longitude, district)
+            )
+        rows = [cell[0] for cell in self.cells]
+        columns = [cell[1] for cell in self.cells]
+        self.row_range = (min(rows), max(rows))
+        self.column_range = (min(columns), max(columns))
+        self.max_abs_latitude = max(abs(latitude) for entries in self.cells.values() for latitude, _, _ in entries)
+
+    def cell_of(self, latitude, longitude):
+        return math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size)
+
+    @staticmethod
+    def distance_squared(latitude, longitude, other_latitude, other_longitude):
+        """Equirectangular distance in squared degrees; exact enough to rank nearby centroids."""
+        longitude_scale = math.cos(math.radians((latitude + other_latitude) / 2))
+        return (latitude - other_latitude) ** 2 + ((longitude - other_longitude) * longitude_scale) ** 2
+
+    def ring_cells(self, row, column, ring):
+        """Occupied-area cells whose Chebyshev distance from ``(row, column)`` is ``ring``."""
+        first_row, last_row = max(row - ring, self.row_range[0]), min(row + ring, self.row_range[1])
+        first_column, last_column = max(column - ring, self.column_range[0]), min(column + ring, self.column_range[1])
+        for cell_row in range(first_row, last_row + 1):
+            if abs(cell_row - row) == ring:
+                for cell_column in range(first_column, last_column + 1):
+                    yield cell_row, cell_column
+            else:
+                for cell_column in {column - ring, column + ring}:
+                    if first_column <= cell_column <= last_column:
+                        yield cell_row, cell_column
+
+    def nearest(self, latitude, longitude):
+        """Return the district whose centroid is closest to the given point."""
+        row, column = self.cell_of(latitude, longitude)
+        last_ring = max(
+            abs(row - self.row_range[0]), abs(row - self.row_range[1]),
+            abs(column - self.column_range[0]), abs(column - self.column_range[1]),
+        )
+        # Lower bound of the longitude scale between the query and any indexed centroid.
+        longitude_scale = math.cos(math.radians(min(max(abs(latitude), self.max_abs_latitude), 89.0)))
+
+        best_distance, best_district = math.inf, None
+        for ring in range(last_ring + 1):
+            for cell in self.ring_cells(row, column, ring):
+                for district_latitude, district_longitude, district in self.cells.get(cell, ()):
+                    distance = self.distance_squared(latitude, longitude, district_latitude, district_longitude)
+                    if distance < best_distance:
+                        best_distance, best_district = distance, district
+            # Centroids in later rings are at least `ring` whole cells away on one axis.
+            if best_district is not None and best_distance <= (ring * self.cell_size * longitude_scale) ** 2:
+                break
+        return best_district
+
+
+@functools.lru_cache(maxsize=None)
+def get_district_index():
+    """Spatial index over the district registry, built on first use."""
+    return DistrictSpatialIndex(get_district_registry())
+
+
+def snap_coordinates(latitude, longitude, mode):
+    """Map a coordinate to its canonical point for ``mode``.
+
+    ``district`` snaps to the nearest district centroid, so lat/lon queries share the cache
+    and forecast-store entries of district queries. ``grid`` snaps to the centre of a
+    ``COORDINATE_SNAP_GRID_SIZE`` degree cell. Returns ``(latitude, longitude, district)``,
+    where ``district`` is only set in ``district`` mode.
+    """
+    if mode == "district":
+        district = get_district_index().nearest(latitude, longitude)
+        return district.latitude, district.longitude, district
+    if mode == "grid":
+        cell_size = settings.COORDINATE_SNAP_GRID_SIZE
+        return (
+            round((math.floor(latitude / cell_size) + 0.5) * cell_size, 4),
+            round((math.floor(longitude / cell_size) + 0.5) * cell_size, 4),
+            None,
+        )
+    return latitude, longitude, None
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from common_services.http_session import get_upstream_loop
+from common_services.single_flight import peer_lock
+from common_services.tiered_cache import weather_cache
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEntry:
+    """A cached value with the time its data was fetched and the time it turns stale.
+
+    An entry is served as is until ``fresh_until`` (its soft TTL), then served stale while
+    it is refreshed in the background, and it drops out of the cache
+    ``WEATHER_CACHE_STALE_TTL`` seconds later (its hard TTL).
+    """
+
+    __slots__ = ("value", "stored_at", "fresh_until")
+
+    def __init__(self, value, stored_at, fresh_until):
+        self.value = value
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+
+    @classmethod
+    def fresh(cls, value, soft_ttl, stored_at=None):
+        stored_at = time.time() if stored_at is None else stored_at
+        return cls(value, stored_at, stored_at + soft_ttl)
+
+    @property
+    def is_stale(self):
+        return time.time() >= self.fresh_until
+
+
+def hard_timeout(fresh_until):
+    """Cache timeout that keeps an entry until ``WEATHER_CACHE_STALE_TTL`` past its soft expiry."""
+    return max(1, int(fresh_until + settings.WEATHER_CACHE_STALE_TTL - time.time()))
+
+
+def load_entry(key):
+    """The :class:`CachedEntry` under ``key``, or ``None`` (also for values stored without one)."""
+    entry = weather_cache.get(key)
+    return entry if isinstance(entry, CachedEntry) else None
+
+
+def store_entry(key, entry):
+    weather_cache.set(key, entry, hard_timeout(entry.fresh_until))
+
+
+def entry_value(cached_value):
+    """Unwrap a value read straight from the cache, e.g. one published by another worker."""
+    return cached_value.value if isinstance(cached_value, CachedEntry) else cached_value
+
+
+class Freshness:
+    """Collects the age of the data behind one response.
+
+    Every entry a response is built from is :meth:`observe`\\ d; the response is as old as
+    its oldest entry and stale as soon as any entry is.
+    """
+
+    def __init__(self):
+        self.stored_at = None
+        self.fresh_until = None
+
+    def observe(self, entry):
+        if self.stored_at is None or entry.stored_at < self.stored_at:
+            self.stored_at = entry.stored_at
+        if self.fresh_until is None or entry.fresh_until < self.fresh_until:
+            self.fresh_until = entry.fresh_until
+
+    @property
+    def is_stale(self):
+        return self.fresh_until is not None and time.time() >= self.fresh_until
+
+    def entry(self, value, soft_ttl):
+        """``value`` dated like the observed data; fresh for ``soft_ttl`` if nothing was observed."""
+        if self.stored_at is None:
+            return CachedEntry.fresh(value, soft_ttl)
+        return CachedEntry(value, self.stored_at, self.fresh_until)
+
+    def apply(self, response):
+        if self.stored_at is not None:
+            set_staleness_headers(response, self.stored_at, self.fresh_until)
+        return response
+
+
+def set_staleness_headers(response, stored_at, fresh_until):
+    """``Age``: seconds since the data was fetched; ``X-Data-Freshness``: ``fresh`` or ``stale``."""
+    now = time.time()
+    response["Age"] = str(int(max(0.0, now - stored_at)))
+    response["X-Data-Freshness"] = "stale" if now >= fresh_until else "fresh"
+    return response
+
+
+class Revalidator:
+    """Refresh stale entries in the background on the upstream loop.
+
+    A key already being refreshed by this process is not scheduled again, and the refresh
+    runs under a cross-worker peer lock so only one worker pays for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = {}
+
+    def schedule(self, key, coroutine_function, *args):
+        """Start refreshing ``key`` unless that is already under way; returns whether it started."""
+        with self._lock:
+            if key in self._running:
+                return False
+            future = asyncio.run_coroutine_threadsafe(self._refresh(key, coroutine_function, args), get_upstream_loop())
+            self._running[key] = future
+        future.add_done_callback(lambda _: self._finish(key, future))
+        logger.info("Serving stale %s while refreshing it in the background.", key)
+        return True
+
+    def _finish(self, key, future):
+        with self._lock:
+            if self._running.get(key) is future:
+                del self._running[key]
+
+    @staticmethod
+    async def _refresh(key, coroutine_function, args):
+        try:
+            async with peer_lock(f"revalidate_{key}") as holds_lock:
+                if holds_lock:
+                    await coroutine_function(*args)
+        except Exception:
+            logger.exception("Background refresh of %s failed.", key)
+
+    async def wait(self):
+        """Wait for the refreshes under way (tests, shutdown)."""
+        with self._lock:
+            futures = list(self._running.values())
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+
+
+revalidator = Revalidator()
@@ -0,0 +1,129 @@
+import atexit
+import json
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+from common_services.metrics import registry
+
+# Attributes every LogRecord has; anything else on a record came in through ``extra``.
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None))) | {"message", "asctime"}
+
+log_records_dropped = registry.counter(
+    "coolescape_log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
+
+
+def truncate(text, limit):
+    if limit is None or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+class LogPayload:
+    """A log argument rendered only when a handler formats the record, and cut to
+    ``LOG_PAYLOAD_MAX_CHARS`` characters.
+
+    Wrap upstream payloads, parameter dicts and name lists in it so records that are
+    filtered out, sampled away or formatted on the queue thread cost nothing up front.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return truncate(str(self.value), settings.LOG_PAYLOAD_MAX_CHARS)
+
+    __repr__ = __str__
+
+
+def payload(value):
+    return LogPayload(value)
+
+
+class EventSampler(logging.Filter):
+    """Keep a fraction of the records of each sampled ``event``.
+
+    ``LOG_SAMPLE_RATES`` maps an event name (passed as ``extra={"event": ...}``) to the
+    share of its records to keep. Warnings and errors, and records without an event, are
+    always kept. Kept records of a sampled event carry their ``sample_rate``.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = settings.LOG_SAMPLE_RATES if rates is None else rates
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(event, 1.0)
+        if rate >= 1.0:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, ``event`` and the other
+    ``extra`` fields, plus the formatted exception if any."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class NonBlockingHandler(QueueHandler):
+    """Hand records to a background thread that formats and writes them.
+
+    Logging from a request or the upstream loop only puts the record on a bounded queue;
+    formatting (including rendering :class:`LogPayload` arguments) and file or console I/O
+    happen on the listener thread. When the queue is full the record is dropped and
+    counted rather than blocking the caller. Records are passed as is, so the arguments of
+    a record must not be mutated after it is logged.
+    """
+
+    def __init__(self, filename=None, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.FileHandler(filename) if filename else logging.StreamHandler()
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self.dropped = 0
+        self._stopped = False
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            log_records_dropped.inc()
+
+    def close(self):
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+            self.target.close()
+        super().close()
+
@@ -0,0 +1,68 @@
+"""Test runner and upstream stand-ins shared by the apps' test suites."""
+import asyncio
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def test_caches():
+    """In-memory backends for the default and the shared weather cache alias, so a test run
+    never reads or clears the file-based or Redis cache of a deployed checkout."""
+    return {
+        alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"test-{alias}"}
+        for alias in ("default", settings.WEATHER_SHARED_CACHE_ALIAS)
+    }
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the suite against :func:`test_caches`."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_override = override_settings(CACHES=test_caches())
+        self.cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+class FakeResponse:
+    """Stand-in for an aiohttp response that answers after ``delay`` seconds."""
+
+    def __init__(self, status, payload, delay=0):
+        self.status = status
+        self.payload = payload
+        self.delay = delay
+        self.headers = {}
+
+    async def __aenter__(self):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Stand-in for the upstream aiohttp session.
+
+    ``status`` is one status or a sequence answered in turn, the last one repeating; only
+    200 responses carry ``payload``. The params of every call are kept in ``calls``.
+    """
+
+    def __init__(self, status, payload, delay=0):
+        self.statuses = list(status) if isinstance(status, (list, tuple)) else [status]
+        self.payload = payload
+        self.delay = delay
+        self.calls = []
+
+    def get(self, url, params=None):
+        self.calls.append(params)
+        status = self.statuses[min(len(self.calls), len(self.statuses)) - 1]
+        return FakeResponse(status, self.payload if status == 200 else None, self.delay)
@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from common_services.metrics import cache_namespace, cache_requests
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRU:
+    """Small thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries, max_ttl):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        ttl = self.max_ttl if timeout is None else min(timeout, self.max_ttl)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TieredCache:
+    """In-process LRU in front of a cache backend shared by every worker.
+
+    Reads try the local tier first and fall through to the shared backend, filling the
+    local tier on the way back. Writes go to both. The local tier keeps entries for at
+    most ``WEATHER_LOCAL_CACHE_TTL`` seconds, which bounds how long a worker can serve a
+    value another worker has already replaced.
+    """
+
+    def __init__(self, shared_alias, local_max_entries, local_ttl):
+        self.shared_alias = shared_alias
+        self.local = LocalLRU(local_max_entries, local_ttl)
+        self._counter_lock = threading.Lock()
+        self._counters = {
+            "local": {"hits": 0, "misses": 0},
+            "shared": {"hits": 0, "misses": 0},
+        }
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _count(self, tier, hits, misses):
+        with self._counter_lock:
+            self._counters[tier]["hits"] += hits
+            self._counters[tier]["misses"] += misses
+
+    @staticmethod
+    def _record(tier, keys, result):
+        for key in keys:
+            cache_requests.inc(cache_namespace(key), tier, result)
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            self._count("local", 1, 0)
+            self._record("local", (key,), "hit")
+            return value
+        self._count("local", 0, 1)
+        self._record("local", (key,), "miss")
+
+        value = self.shared.get(key)
+        if value is None:
+            self._count("shared", 0, 1)
+            self._record("shared", (key,), "miss")
+            return default
+        self._count("shared", 1, 0)
+        self._record("shared", (key,), "hit")
+        self.local.set(key, value)
+        return value
+
+    def get_many(self, keys):
+        found = {}
+        missing_keys = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is None:
+                missing_keys.append(key)
+            else:
+                found[key] = value
+        self._count("local", len(found), len(missing_keys))
+        self._record("local", found, "hit")
+        self._record("local", missing_keys, "miss")
+
+        if missing_keys:
+            shared_values = self.shared.get_many(missing_keys)
+            self._count("shared", len(shared_values), len(missing_keys) - len(shared_values))
+            self._record("shared", shared_values, "hit")
+            self._record("shared", (key for key in missing_keys if key not in shared_values), "miss")
+            for key, value in shared_values.items():
+                self.local.set(key, value)
+            found.update(shared_values)
+        return found
+
+    def set(self, key, value, timeout):
+        self.shared.set(key, value, timeout)
+        self.local.set(key, value, timeout)
+
+    def set_many(self, mapping, timeout):
+        if not mapping:
+            return
+        self.shared.set_many(mapping, timeout)
+        for key, value in mapping.items():
+            self.local.set(key, value, timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def stats(self):
+        """Return hit/miss counters per tier for this process."""
+        with self._counter_lock:
+            return {tier: dict(counters) for tier, counters in self._counters.items()}
+
+
+weather_cache = TieredCache(
+    shared_alias=settings.WEATHER_SHARED_CACHE_ALIAS,
+    local_max_entries=settings.WEATHER_LOCAL_CACHE_MAX_ENTRIES,
+    local_ttl=settings.WEATHER_LOCAL_CACHE_TTL,
+)
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+
+TRAVEL_MATRIX_EXPIRATION = 600
+
+
+def travel_matrix_key(travel_date):
+    return f"travel_matrix_{travel_date}"
+
+
+class TravelMatrix:
+    """All-pairs 2 PM temperature differences and travel decisions of the districts for one date.
+
+    Row ``i`` is the origin ``names[i]`` and column ``j`` the destination ``names[j]``. The
+    arrays are what gets cached, so one entry costs a few kilobytes for 64 districts.
+    Districts without a temperature are NaN in ``differences`` and never a good trip.
+    """
+
+    __slots__ = ("travel_date", "names", "temperatures", "differences", "decisions", "computed_at")
+
+    def __init__(self, travel_date, names, temperatures, differences, decisions, computed_at=None):
+        self.travel_date = travel_date
+        self.names = tuple(names)
+        self.temperatures = temperatures
+        self.differences = differences
+        self.decisions = decisions
+        self.computed_at = time.time() if computed_at is None else computed_at
+
+    @classmethod
+    def from_temperatures(cls, travel_date, names, temperatures, threshold):
+        """Compute every pair at once; temperatures are rounded like the pairwise endpoint's."""
+        temperatures = np.round(np.asarray(temperatures, dtype=float), 2)
+        differences = np.abs(temperatures[np.newaxis, :] - temperatures[:, np.newaxis])
+        with np.errstate(invalid="ignore"):
+            decisions = differences <= threshold
+        return cls(travel_date, names, temperatures.astype(np.float32), np.round(differences, 2).astype(np.float32), decisions)
+
+    @property
+    def complete(self):
+        return not np.isnan(self.temperatures).any()
+
+    def rows(self, origins=None):
+        """JSON-ready rows of ``origins`` (every district when ``None``), in district order."""
+        indexes = range(len(self.names)) if origins is None else [
+            index for index, name in enumerate(self.names) if name in origins
+        ]
+        return [
+            {
+                "origin": self.names[index],
+                "temperature": self.json_values(self.temperatures[index:index + 1])[0],
+                "temperature_differences": self.json_values(self.differences[index]),
+                "good_to_travel": self.decisions[index].tolist(),
+            }
+            for index in indexes
+        ]
+
+    @staticmethod
+    def json_values(values):
+        """Rounded floats with NaN as ``None``."""
+        return [None if np.isnan(value) else round(value, 2) for value in values.astype(float).tolist()]
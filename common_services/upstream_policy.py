@@ -0,0 +1,349 @@
+import asyncio
+import collections
+import logging
+import os
+import random
+import time
+
+import aiohttp
+import numpy as np
+from django.conf import settings
+
+from common_services.metrics import registry, track_upstream
+from utils.base_urls import get_forecast_urls
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt; anything else is the provider's final answer.
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+upstream_concurrency_limit = registry.gauge(
+    "coolescape_upstream_concurrency_limit",
+    "Current adaptive cap on concurrent Open-Meteo calls.",
+)
+upstream_circuit_open = registry.gauge(
+    "coolescape_upstream_circuit_open",
+    "1 while the Open-Meteo circuit breaker is open or half-open.",
+)
+upstream_retries = registry.counter(
+    "coolescape_upstream_retries_total",
+    "Open-Meteo calls retried after a transient failure, by kind of call.",
+    ("call",),
+)
+
+upstream_hedges = registry.counter(
+    "coolescape_upstream_hedged_requests_total",
+    "Open-Meteo calls that got a hedged duplicate, by kind of call and which request answered.",
+    ("call", "winner"),
+)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without contacting Open-Meteo while the circuit breaker is open."""
+
+
+class AdaptiveConcurrencyLimiter:
+    """Cap on concurrent upstream calls, tuned by additive increase / multiplicative decrease.
+
+    Every call that answers within ``latency_target`` raises the limit by ``1 / limit``
+    (about one more slot per window of calls); a 429, a failure or a slower answer halves
+    it, at most once per ``latency_target`` so one burst of bad answers counts once.
+    Only used from the upstream loop, so it needs no locking.
+    """
+
+    def __init__(self, initial, minimum, maximum, latency_target):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._waiters = collections.deque()
+        self._last_decrease = 0.0
+        upstream_concurrency_limit.set(self.max_in_flight)
+
+    @property
+    def max_in_flight(self):
+        return max(self.minimum, int(self.limit))
+
+    async def acquire(self):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation; pass it on.
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency, overloaded):
+        self.in_flight -= 1
+        if overloaded or latency > self.latency_target:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(float(self.minimum), self.limit / 2)
+                self._last_decrease = now
+                logger.warning("Upstream overloaded; concurrency limit lowered to %s.", self.max_in_flight)
+        else:
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+        upstream_concurrency_limit.set(self.max_in_flight)
+        self._wake()
+
+    def abandon(self):
+        """Free a slot without judging the call, e.g. a hedged request that lost the race."""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.max_in_flight:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+class CircuitBreaker:
+    """Stop calling an unhealthy provider and probe it again after ``reset_timeout`` seconds.
+
+    ``failure_threshold`` consecutive failed calls open the circuit. Once the timeout has
+    passed a single probe call is let through (half-open); its success closes the circuit,
+    its failure opens it for another ``reset_timeout``.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self):
+        """Whether a call may go out now; a ``True`` in half-open state claims the probe."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Upstream recovered; closing the circuit.")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+        upstream_circuit_open.set(0)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.error("Upstream unhealthy after %s failed calls; opening the circuit for %ss.",
+                             self.failures, self.reset_timeout)
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            upstream_circuit_open.set(1)
+
+    def abandon(self):
+        """Give the probe back when a call ended without a verdict (cancelled, bad payload)."""
+        self._probing = False
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls, for the hedging threshold."""
+
+    MIN_SAMPLES = 20
+
+    def __init__(self, size=512):
+        self.samples = collections.deque(maxlen=size)
+
+    def record(self, latency):
+        self.samples.append(latency)
+
+    def percentile(self, percentile):
+        """The ``percentile`` of the recorded latencies, or ``None`` until there are enough."""
+        if len(self.samples) < self.MIN_SAMPLES:
+            return None
+        return float(np.percentile(self.samples, percentile))
+
+
+class UpstreamPolicy:
+    """Concurrency limit, hedging, retries with jittered exponential backoff and a circuit
+    breaker around every Open-Meteo call of this process."""
+
+    def __init__(self):
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=settings.UPSTREAM_CONCURRENCY_INITIAL,
+            minimum=settings.UPSTREAM_CONCURRENCY_MIN,
+            maximum=settings.UPSTREAM_CONCURRENCY_MAX,
+            latency_target=settings.UPSTREAM_LATENCY_TARGET,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.UPSTREAM_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.UPSTREAM_BREAKER_RESET_TIMEOUT,
+        )
+        self.latencies = LatencyTracker()
+        self.calls = 0
+        self.hedges = 0
+
+    @staticmethod
+    def backoff(attempt, retry_after=None):
+        """Full-jitter exponential delay before retry ``attempt + 1``, honouring ``Retry-After``."""
+        delay = random.uniform(0, min(settings.UPSTREAM_RETRY_MAX_DELAY, settings.UPSTREAM_RETRY_BASE_DELAY * 2 ** attempt))
+        try:
+            requested = float(retry_after)
+        except (TypeError, ValueError):
+            return delay
+        return max(delay, min(requested, settings.UPSTREAM_RETRY_MAX_DELAY))
+
+    def hedge_delay(self):
+        """Seconds to wait for a call before hedging it: the recent latency percentile,
+        clamped to the configured bounds, or the initial delay until enough calls were seen."""
+        threshold = self.latencies.percentile(settings.UPSTREAM_HEDGE_PERCENTILE)
+        if threshold is None:
+            return settings.UPSTREAM_HEDGE_INITIAL_DELAY
+        return min(max(threshold, settings.UPSTREAM_HEDGE_MIN_DELAY), settings.UPSTREAM_HEDGE_MAX_DELAY)
+
+    async def _request(self, session, url, params, call):
+        """One limited, timed GET of ``url``; returns ``(status, payload, retry_after)``."""
+        await self.limiter.acquire()
+        started_at = time.monotonic()
+        overloaded = True
+        cancelled = False
+        try:
+            with track_upstream(call) as upstream_call:
+                try:
+                    async with session.get(url, params=params) as response:
+                        upstream_call.status = response.status
+                        overloaded = response.status in RETRYABLE_STATUSES
+                        payload = await response.json() if response.status == 200 else None
+                        if response.status == 200:
+                            self.latencies.record(time.monotonic() - started_at)
+                        return response.status, payload, response.headers.get("Retry-After")
+                except asyncio.CancelledError:
+                    upstream_call.status = "cancelled"
+                    cancelled = True
+                    raise
+        finally:
+            if cancelled:
+                self.limiter.abandon()
+            else:
+                self.limiter.release(time.monotonic() - started_at, overloaded)
+
+    async def _attempt(self, session, params, call):
+        """One call to the primary endpoint, hedged on the second endpoint when it is still
+        pending after :meth:`hedge_delay`; returns ``(status, payload, retry_after)``.
+
+        Only calls with a second endpoint configured are hedged: a duplicate sent to the
+        same host adds load to the provider without avoiding its slow responses.
+        """
+        urls = get_forecast_urls()
+        self.calls += 1
+        primary = asyncio.ensure_future(self._request(session, urls[0], params, call))
+        try:
+            if settings.UPSTREAM_HEDGE_ENABLED and len(urls) > 1:
+                done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+                if not done and self.hedges < self.calls * settings.UPSTREAM_HEDGE_BUDGET:
+                    self.hedges += 1
+                    hedge = asyncio.ensure_future(self._request(session, urls[1], params, call))
+                    return await self._race(call, primary, hedge)
+            return await primary
+        finally:
+            primary.cancel()
+
+    @staticmethod
+    async def _race(call, primary, hedge):
+        """The first good answer of ``primary`` and ``hedge``; the other request is cancelled.
+
+        An answer is good unless it failed or has a retryable status; when both are bad
+        the last one is returned (or its error raised) for the retry loop to judge.
+        """
+        pending = {primary, hedge}
+        last = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    last = task
+                    if task.exception() is None and task.result()[0] not in RETRYABLE_STATUSES:
+                        upstream_hedges.inc(call, "primary" if task is primary else "hedge")
+                        return task.result()
+            upstream_hedges.inc(call, "none")
+            return last.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_json(self, session, params, call):
+        """GET the forecast API with ``params``; returns ``(status, payload)``.
+
+        ``payload`` is the decoded JSON of a 200 and ``None`` otherwise. Transient statuses
+        and connection errors are retried up to ``UPSTREAM_RETRY_ATTEMPTS`` times in total;
+        the last status is returned, or the last connection error raised. Raises
+        :class:`UpstreamUnavailable` straight away while the circuit is open.
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("Upstream weather provider is unavailable (circuit open).")
+
+        verdict = False
+        try:
+            attempts = max(1, settings.UPSTREAM_RETRY_ATTEMPTS)
+            for attempt in range(attempts):
+                error = retry_after = None
+                try:
+                    status, payload, retry_after = await self._attempt(session, params, call)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as client_error:
+                    status, payload, error = None, None, client_error
+
+                if error is None and status not in RETRYABLE_STATUSES:
+                    self.breaker.record_success()
+                    verdict = True
+                    return status, payload
+
+                if attempt + 1 < attempts:
+                    upstream_retries.inc(call)
+                    delay = self.backoff(attempt, retry_after)
+                    logger.warning("Upstream %s call failed (%s); retrying in %.2fs.", call, error or status, delay)
+                    await asyncio.sleep(delay)
+
+            self.breaker.record_failure()
+            verdict = True
+            if error is not None:
+                raise error
+            return status, None
+        finally:
+            if not verdict:
+                self.breaker.abandon()
+
+
+_policy = None
+_policy_pid = None
+
+
+def get_upstream_policy():
+    """The process-wide policy; a forked worker starts with a fresh one."""
+    global _policy, _policy_pid
+    if _policy is None or _policy_pid != os.getpid():
+        _policy, _policy_pid = UpstreamPolicy(), os.getpid()
+    return _policy
+
+
+def reset_upstream_policy():
+    """Drop the learned limit and breaker state (tests)."""
+    global _policy
+    _policy = None
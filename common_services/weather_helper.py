@@ -1,85 +1,153 @@
 import asyncio
-import aiohttp
 import json
-import re
-from utils.base_urls import get_forecast_url
-from common_services.districts_names import processed_json_data
+from contextlib import AsyncExitStack
+from datetime import date, timedelta
+import numpy as np
+from common_services.district_registry import get_district_registry
+from common_services.forecast_aggregation import DEFAULT_METRIC, ForecastMatrix, HourlySeriesParser, rank_order
+from common_services.forecast_store import LocationForecast, forecast_store, location_key
 import logging
-from django.core.cache import cache
-from common_services.hash_key_generate import sanitize_cache_key
+from django.conf import settings
+from django.utils import timezone
+from common_services.hash_key_generate import coordinate_key, sanitize_cache_key
+from common_services.http_session import get_client_session, on_upstream_loop, run_upstream_sync
+from common_services.single_flight import SingleFlight, peer_lock, wait_for_peer
+from common_services.structured_logging import payload
+from common_services.stale_cache import CachedEntry, Freshness, entry_value, load_entry, revalidator, store_entry
+from common_services.tiered_cache import weather_cache
+from common_services.travel_matrix import TRAVEL_MATRIX_EXPIRATION, TravelMatrix, travel_matrix_key
+from common_services.upstream_policy import RETRYABLE_STATUSES, UpstreamUnavailable, get_upstream_policy
 
 CACHE_EXPIRATION = 600
+TRAVEL_TEMPERATURE_THRESHOLD = 2
 
 logger = logging.getLogger(__name__)
 
-time_pattern = re.compile(r"T14:00$")
-district_list = processed_json_data()
+
+def forecast_window_key(latitude, longitude, start_date, end_date):
+    """Cache key of a location's forecast fetched for a date range outside the horizon."""
+    return f"forecast_window_{coordinate_key(latitude, longitude)}_{start_date}_{end_date}"
+
+def travel_comparison_key(friend_point, destination_point, travel_date):
+    """Cache key of a route's pair of 2 PM temperatures; the same for both directions."""
+    return f"compare_weather_{'_'.join(sorted((friend_point, destination_point)))}_{travel_date}"
+
+
+# In-flight upstream loads, keyed by the same cache keys the results are stored under.
+district_flights = SingleFlight()
+coordinate_flights = SingleFlight()
 
 
 class WeatherService:
     """Service to fetch district-wise weather data asynchronously."""
 
+    @staticmethod
+    def parse_district_payloads(districts, weather_payloads):
+        """Load the usable Open-Meteo payloads of ``districts`` into one ForecastMatrix.
+
+        ``weather_payloads`` is aligned with ``districts``. Returns the matrix, the input rows
+        it holds (in matrix row order) and error entries keyed by the remaining rows; entries
+        that are already errors from the fetch step are passed through unchanged. Each
+        series is parsed on its own, so one malformed payload only fails its district.
+        """
+        error_entries = {}
+        series_rows = []
+        parsed_series = []
+        parser = HourlySeriesParser()
+        for row, (district_info, weather_data) in enumerate(zip(districts, weather_payloads)):
+            if "error" in weather_data and "district" in weather_data:
+                error_entries[row] = weather_data
+            elif "hourly" not in weather_data or "time" not in weather_data["hourly"] or "temperature_2m" not in weather_data["hourly"]:
+                logger.warning("No hourly data available for %s", district_info['name'])
+                error_entries[row] = {
+                    "district": district_info["name"],
+                    "error": "No hourly data available"
+                }
+            else:
+                try:
+                    parsed_series.append(parser.parse(weather_data['hourly']['time'], weather_data['hourly']['temperature_2m']))
+                except ValueError as error:
+                    logger.warning("Invalid hourly data for %s: %s", district_info['name'], error)
+                    error_entries[row] = {
+                        "district": district_info["name"],
+                        "error": "Invalid hourly data"
+                    }
+                    continue
+                series_rows.append(row)
+
+        return ForecastMatrix.from_parsed(parsed_series), series_rows, error_entries
+
+    @staticmethod
+    def summarize_districts(districts, forecast_matrix):
+        """2 PM average entries for ``districts``, one per matrix row, in one vectorized pass."""
+        average_temperatures = np.round(forecast_matrix.metric(DEFAULT_METRIC), 2)
+
+        results = []
+        for district_info, average_temperature in zip(districts, average_temperatures.tolist()):
+            if np.isnan(average_temperature):
+                logger.warning("No matching time slots found for %s", district_info['name'])
+                results.append({
+                    "district": district_info["name"],
+                    "message": "No temperature data available for the requested time"
+                })
+                continue
+
+            results.append({
+                "id": district_info["id"],
+                "division_id": district_info["division_id"],
+                "name": district_info["name"],
+                "bn_name": district_info["bn_name"],
+                "average_temperature": average_temperature,
+                "temperature_unit": "Celsius",
+                "latitude": district_info["lat"],
+                "longitude": district_info["long"]
+            })
+        return results
+
+    @classmethod
+    def build_district_results(cls, districts, weather_payloads):
+        """Turn the districts' Open-Meteo payloads into 2 PM average entries, in input order.
+
+        The full hourly series behind each entry is kept in the forecast store so other
+        endpoints and dates can be answered without another upstream call.
+        """
+        forecast_matrix, series_rows, error_entries = cls.parse_district_payloads(districts, weather_payloads)
+        forecast_store.put_many([
+            LocationForecast(districts[row]["lat"], districts[row]["long"], forecast_matrix.start, forecast_matrix.values[index])
+            for index, row in enumerate(series_rows)
+        ])
+        results = dict(error_entries)
+        results.update(zip(series_rows, cls.summarize_districts([districts[row] for row in series_rows], forecast_matrix)))
+        return [results[row] for row in range(len(districts))]
+
     @staticmethod
     async def fetch_weather_data(session, district_info):
-        """Fetch weather data for a single district."""
+        """Fetch the raw forecast payload for a single district, or its error entry."""
         request_params = {
             "latitude": float(district_info["lat"]),
             "longitude": float(district_info["long"]),
             "hourly": "temperature_2m",
-            "timezone": "Asia/Dhaka"
+            "timezone": "Asia/Dhaka",
+            "forecast_days": settings.FORECAST_DAYS
         }
 
         try:
-            logger.info(f"Fetching weather data for {district_info['name']} with params: {request_params}")
-            async with session.get(get_forecast_url(), params=request_params) as api_response:
-                if api_response.status != 200:
-                    logger.error(f"API Error {api_response.status} for district: {district_info['name']}")
-                    return {
-                        "district": district_info["name"],
-                        "error": f"API Error {api_response.status}"
-                    }
-
-                weather_data = await api_response.json()
-                logger.debug(f"Response received for {district_info['name']}: {weather_data}")
-
-                if "hourly" not in weather_data or "time" not in weather_data["hourly"] or "temperature_2m" not in weather_data["hourly"]:
-                    logger.warning(f"No hourly data available for {district_info['name']}")
-                    return {
-                        "district": district_info["name"],
-                        "error": "No hourly data available"
-                    }
-
-                time_entries = weather_data['hourly']['time']
-                temperature_entries = weather_data['hourly']['temperature_2m']
-
-                matching_indices = [i for i, time_entry in enumerate(time_entries) if time_pattern.search(time_entry)]
-
-                if not matching_indices:
-                    logger.warning(f"No matching time slots found for {district_info['name']}")
-                    return {
-                        "district": district_info["name"],
-                        "message": "No temperature data available for the requested time"
-                    }
-
-                average_temperature = sum(temperature_entries[i] for i in matching_indices) / len(matching_indices) if matching_indices else None
-                logger.info(f"Average temperature for {district_info['name']}: {average_temperature}")
-                result = {
-                    "id": district_info["id"],
-                    "division_id": district_info["division_id"],
-                    "name": district_info["name"],
-                    "bn_name": district_info["bn_name"],
-                    "average_temperature": round(average_temperature, 2),
-                    "temperature_unit": "Celsius",
-                    "latitude": district_info["lat"],
-                    "longitude": district_info["long"]
+            logger.info("Fetching weather data for %s with params: %s", district_info['name'], payload(request_params),
+                        extra={"event": "upstream_request"})
+            status, weather_data = await get_upstream_policy().get_json(session, request_params, "district")
+            if status != 200:
+                logger.error("API Error %s for district: %s", status, district_info['name'])
+                return {
+                    "district": district_info["name"],
+                    "error": f"API Error {status}"
                 }
-                # Store result in Django cache
-                cache_key = sanitize_cache_key(district_info['name'])
-                cache.set(cache_key, result, CACHE_EXPIRATION)
-                return result
+
+            logger.debug("Response received for %s: %s", district_info['name'], payload(weather_data),
+                         extra={"event": "upstream_payload"})
+            return weather_data
 
         except Exception as error:
-            logger.exception(f"Error fetching weather data for {district_info['name']}: {error}")
+            logger.exception("Error fetching weather data for %s: %s", district_info['name'], error)
             return {
                 "district": district_info["name"],
                 "error": str(error),
@@ -87,111 +155,429 @@ class WeatherService:
             }
 
     @classmethod
-    async def retrieve_district_weather_data(cls):
-        weather_results = []
-        async with aiohttp.ClientSession() as http_session:
-            async_tasks = []
-            for district in district_list:
-                cache_key = sanitize_cache_key(district['name'])
-                cached_entry = cache.get(cache_key)
-                if cached_entry:
-                    logger.info(f"Using cached data for {district['name']}")
-                    weather_results.append(cached_entry)
+    async def fetch_weather_batch(cls, session, district_batch):
+        """Fetch raw forecast payloads for several districts with one multi-location request.
+
+        Open-Meteo accepts comma separated coordinates and answers with one payload per
+        location, in request order. A failure that concerns the whole batch (throttling,
+        server errors) is reported on every district of the batch; any other failure falls
+        back to per-district requests so a single bad location cannot sink its neighbours.
+        """
+        if len(district_batch) == 1:
+            return [await cls.fetch_weather_data(session, district_batch[0])]
+
+        district_names = [district["name"] for district in district_batch]
+        request_params = {
+            "latitude": ",".join(str(float(district["lat"])) for district in district_batch),
+            "longitude": ",".join(str(float(district["long"])) for district in district_batch),
+            "hourly": "temperature_2m",
+            "timezone": "Asia/Dhaka",
+            "forecast_days": settings.FORECAST_DAYS
+        }
+
+        try:
+            logger.info("Fetching weather data for batch of %s districts: %s", len(district_batch), payload(district_names),
+                        extra={"event": "upstream_request"})
+            status, weather_payloads = await get_upstream_policy().get_json(session, request_params, "district_batch")
+            if status in RETRYABLE_STATUSES:
+                logger.error("API Error %s for batch: %s", status, payload(district_names))
+                return [
+                    {"district": district["name"], "error": f"API Error {status}"}
+                    for district in district_batch
+                ]
+
+            if status != 200:
+                logger.warning("API Error %s for batch, retrying districts individually", status)
+
+        except UpstreamUnavailable as error:
+            logger.error("Skipping batch %s: %s", payload(district_names), error)
+            return [{"district": district["name"], "error": str(error)} for district in district_batch]
+
+        except Exception as error:
+            logger.exception("Error fetching weather data for batch %s: %s", payload(district_names), error)
+            weather_payloads = None
+
+        if not isinstance(weather_payloads, list) or len(weather_payloads) != len(district_batch):
+            return list(await asyncio.gather(
+                *(cls.fetch_weather_data(session, district) for district in district_batch)
+            ))
+
+        return weather_payloads
+
+    @classmethod
+    async def fetch_district_batches(cls, districts):
+        """Fetch ``districts`` in batches of ``WEATHER_BATCH_SIZE``; results keep the input order."""
+        if not districts:
+            return []
+        http_session = await get_client_session()
+        batch_size = max(1, settings.WEATHER_BATCH_SIZE)
+        batch_responses = await asyncio.gather(*(
+            cls.fetch_weather_batch(http_session, districts[start:start + batch_size])
+            for start in range(0, len(districts), batch_size)
+        ))
+        weather_payloads = [payload for batch_payloads in batch_responses for payload in batch_payloads]
+        results = cls.build_district_results(districts, weather_payloads)
+
+        # Store successful results in the weather cache with one bulk write
+        weather_cache.set_many({
+            sanitize_cache_key(district['name']): result
+            for district, result in zip(districts, results)
+            if "average_temperature" in result
+        }, CACHE_EXPIRATION)
+        return await cls.fill_from_last_good(districts, results)
+
+    @classmethod
+    async def fill_from_last_good(cls, districts, results):
+        """Replace the error entries of ``results`` with entries built from the districts'
+        last good forecasts, so an upstream outage does not empty the ranking.
+
+        These entries are not cached, so the districts are fetched again once the
+        provider recovers.
+        """
+        failed_rows = [row for row, result in enumerate(results) if "error" in result]
+        if not failed_rows:
+            return results
+        last_good = await forecast_store.aget_last_good_many(
+            (districts[row]["lat"], districts[row]["long"]) for row in failed_rows
+        )
+        filled_rows = [row for row in failed_rows if (districts[row]["lat"], districts[row]["long"]) in last_good]
+        if not filled_rows:
+            return results
+
+        logger.warning("Serving the last good forecast for %s districts the provider failed on.", len(filled_rows))
+        forecast_matrix = ForecastMatrix.from_forecasts(
+            [last_good[(districts[row]["lat"], districts[row]["long"])] for row in filled_rows]
+        )
+        results = list(results)
+        for row, result in zip(filled_rows, cls.summarize_districts([districts[row] for row in filled_rows], forecast_matrix)):
+            results[row] = result
+        return results
+
+    @classmethod
+    async def fetch_pending_districts(cls, pending_districts):
+        """Fetch districts this process leads, deferring to other workers that hold their lock."""
+        async with AsyncExitStack() as lock_stack:
+            fetch_districts, peer_districts = [], []
+            for district in pending_districts:
+                holds_lock = await lock_stack.enter_async_context(peer_lock(sanitize_cache_key(district['name'])))
+                (fetch_districts if holds_lock else peer_districts).append(district)
+
+            fetched_results, peer_results = await asyncio.gather(
+                cls.fetch_district_batches(fetch_districts),
+                asyncio.gather(*(wait_for_peer(sanitize_cache_key(district['name'])) for district in peer_districts)),
+            )
+
+            results = dict(zip((district['name'] for district in fetch_districts), fetched_results))
+            unresolved_districts = []
+            for district, peer_result in zip(peer_districts, peer_results):
+                if peer_result:
+                    results[district['name']] = peer_result
                 else:
-                    async_tasks.append(cls.fetch_weather_data(http_session, district))
+                    unresolved_districts.append(district)
+
+            retried_results = await cls.fetch_district_batches(unresolved_districts)
+            results.update(zip((district['name'] for district in unresolved_districts), retried_results))
+
+        return [results[district['name']] for district in pending_districts]
+
+    @classmethod
+    async def summarize_stored_districts(cls, districts):
+        """Answer districts whose full forecast is already in the forecast store.
+
+        Returns the entries built from the store and the districts that still need a fetch.
+        """
+        stored_forecasts = await forecast_store.aget_many(
+            (district["lat"], district["long"]) for district in districts
+        )
+        stored_districts = [district for district in districts if (district["lat"], district["long"]) in stored_forecasts]
+        if not stored_districts:
+            return [], districts
+
+        forecast_matrix = ForecastMatrix.from_forecasts(
+            [stored_forecasts[(district["lat"], district["long"])] for district in stored_districts]
+        )
+        results = cls.summarize_districts(stored_districts, forecast_matrix)
+        weather_cache.set_many({
+            sanitize_cache_key(district['name']): result
+            for district, result in zip(stored_districts, results)
+            if "average_temperature" in result
+        }, CACHE_EXPIRATION)
+        logger.info("Answered %s districts from the forecast store.", len(stored_districts))
+        return results, [district for district in districts if (district["lat"], district["long"]) not in stored_forecasts]
+
+    @classmethod
+    async def await_district_leader(cls, district, future):
+        """Wait for the request already fetching ``district``; take over if it was cancelled."""
+        try:
+            return await district_flights.wait(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            return (await cls.fetch_district_batches([district]))[0]
+
+    @classmethod
+    async def fetch_coalesced_districts(cls, districts):
+        """Fetch ``districts``, joining loads other requests already have in flight.
 
-            if async_tasks:
-                weather_responses = await asyncio.gather(*async_tasks)
-                weather_results.extend(weather_responses)
+        Returns the districts' result entries; their full forecasts land in the forecast store.
+        """
+        weather_results = []
+        pending_districts = []
+        followed_districts = []
+        for district in districts:
+            cache_key = sanitize_cache_key(district['name'])
+            future, is_leader = district_flights.join(cache_key)
+            if is_leader:
+                pending_districts.append(district)
+            else:
+                followed_districts.append((district, future))
+
+        if pending_districts:
+            try:
+                pending_results = await cls.fetch_pending_districts(pending_districts)
+            except BaseException as error:
+                for district in pending_districts:
+                    district_flights.settle(sanitize_cache_key(district['name']), error=error)
+                raise
+            for district, result in zip(pending_districts, pending_results):
+                district_flights.settle(sanitize_cache_key(district['name']), result)
+            weather_results.extend(pending_results)
+
+        if followed_districts:
+            logger.info("Waiting on %s districts already being fetched.", len(followed_districts))
+            weather_results.extend(await asyncio.gather(
+                *(cls.await_district_leader(district, future) for district, future in followed_districts)
+            ))
+        return weather_results
+
+    @classmethod
+    @on_upstream_loop
+    async def retrieve_district_weather_data(cls):
+        weather_results = []
+        uncached_districts = []
+        cached_entries = weather_cache.get_many([sanitize_cache_key(district['name']) for district in get_district_registry()])
+        for district in get_district_registry():
+            cached_entry = cached_entries.get(sanitize_cache_key(district['name']))
+            if cached_entry:
+                logger.info("Using cached data for %s", district['name'], extra={"event": "district_cache_hit"})
+                weather_results.append(cached_entry)
+            else:
+                uncached_districts.append(district)
+
+        stored_results, uncached_districts = await cls.summarize_stored_districts(uncached_districts)
+        weather_results.extend(stored_results)
+        weather_results.extend(await cls.fetch_coalesced_districts(uncached_districts))
+
+        logger.info("Weather data fetching complete. Cache tiers: %s", weather_cache.stats())
+        ranking = rank_order([result.get("average_temperature", np.inf) for result in weather_results])
+        return [weather_results[index] for index in ranking]
 
-        logger.info("Weather data fetching complete.")
-        return sorted(weather_results, key=lambda x: x.get("average_temperature", float("inf")))
+    @classmethod
+    async def stream_district_weather_data(cls):
+        """Yield ``(source, result)`` for every district as soon as its entry is known.
+
+        Cached entries come first (``"cache"``), then districts answered from the forecast
+        store (``"store"``), then each fetch batch as it completes (``"upstream"``). Must run
+        on the upstream loop; consume it through :class:`UpstreamStream`.
+        """
+        uncached_districts = []
+        cached_entries = weather_cache.get_many([sanitize_cache_key(district['name']) for district in get_district_registry()])
+        for district in get_district_registry():
+            cached_entry = cached_entries.get(sanitize_cache_key(district['name']))
+            if cached_entry:
+                yield "cache", cached_entry
+            else:
+                uncached_districts.append(district)
+
+        stored_results, uncached_districts = await cls.summarize_stored_districts(uncached_districts)
+        for result in stored_results:
+            yield "store", result
+
+        batch_size = max(1, settings.WEATHER_BATCH_SIZE)
+        # Batches are not cancelled when the consumer goes away: other requests may be
+        # following them, and their results still land in the caches.
+        batch_fetches = [
+            asyncio.ensure_future(cls.fetch_coalesced_districts(uncached_districts[start:start + batch_size]))
+            for start in range(0, len(uncached_districts), batch_size)
+        ]
+        for batch_fetch in asyncio.as_completed(batch_fetches):
+            for result in await batch_fetch:
+                yield "upstream", result
 
     @classmethod
     def fetch_weather_data_sync(cls):
         logger.info("Starting synchronous weather fetching...")
-        return asyncio.run(cls.retrieve_district_weather_data())
+        return run_upstream_sync(cls.retrieve_district_weather_data())
 
     @staticmethod
-    async def fetch_weather_by_coordinates(session, latitude, longitude, travel_date):
-        """Fetch temperature at 2 PM for a specific location and date."""
+    def within_forecast_horizon(travel_date):
+        """Whether ``travel_date`` is covered by a default ``FORECAST_DAYS`` forecast fetched today."""
+        try:
+            requested_date = date.fromisoformat(travel_date)
+        except (TypeError, ValueError):
+            return False
+        today = timezone.localdate()
+        return today <= requested_date < today + timedelta(days=settings.FORECAST_DAYS)
 
-        cache_key = f"weather_{latitude}_{longitude}_{travel_date}"
-        cached_data = cache.get(cache_key)
+    @staticmethod
+    def temperature_result(location_forecast, travel_date, cache_key):
+        """Build the 2 PM temperature entry for ``travel_date`` from a stored forecast.
+
+        Returns it as a CachedEntry dated by the forecast's fetch time, cached under
+        ``cache_key`` unless that is ``None``.
+        """
+        temperature_at_2pm = location_forecast.temperature_at(travel_date, 14)
+        if temperature_at_2pm is None:
+            logger.warning("No 2 PM temperature data found.")
+            return CachedEntry.fresh({"error": "No 2 PM temperature data found"}, CACHE_EXPIRATION)
+
+        logger.info("Fetched temperature: %s°C at 2 PM", temperature_at_2pm)
+        entry = CachedEntry.fresh({"temperature": temperature_at_2pm}, CACHE_EXPIRATION, location_forecast.fetched_at)
+        if cache_key is not None:
+            store_entry(cache_key, entry)
+        return entry
 
-        if cached_data:
-            logger.info("Cache hit for weather data: %s", cache_key)
-            return cached_data
+    @classmethod
+    async def fetch_weather_by_coordinates(cls, session, latitude, longitude, travel_date, freshness=None, refresh=False):
+        """Fetch temperature at 2 PM for a specific location and date.
+
+        A cached temperature past its soft TTL is returned right away and refreshed in the
+        background; ``refresh`` skips the cached temperature altogether. The age of the data
+        used is reported to ``freshness``.
+        """
+        cache_key = f"weather_{coordinate_key(latitude, longitude)}_{travel_date}"
+        entry = None if refresh else load_entry(cache_key)
+
+        if entry is None:
+            entry = await cls.load_weather_by_coordinates(session, latitude, longitude, travel_date)
+        elif entry.is_stale:
+            revalidator.schedule(cache_key, cls.load_weather_by_coordinates, session, latitude, longitude, travel_date)
+        else:
+            logger.info("Cache hit for weather data: %s", cache_key, extra={"event": "cache_hit"})
+
+        if freshness is not None:
+            freshness.observe(entry)
+        return entry.value
 
-        logger.info("Cache miss. Fetching weather data for lat=%s, lon=%s, date=%s", latitude, longitude, travel_date)
+    @classmethod
+    async def load_weather_by_coordinates(cls, session, latitude, longitude, travel_date):
+        """Look up the 2 PM temperature of a location and date past the per-date cache.
+
+        Dates inside the forecast horizon are answered from the location's full forecast in
+        the forecast store, so every date of a location costs at most one upstream call.
+        Returns a CachedEntry holding the result or error entry.
+        """
+        cache_key = f"weather_{coordinate_key(latitude, longitude)}_{travel_date}"
+
+        if cls.within_forecast_horizon(travel_date):
+            location_forecast = await forecast_store.aget(latitude, longitude)
+            if location_forecast is None or not location_forecast.covers(travel_date):
+                location_forecast = await coordinate_flights.do(
+                    location_key(latitude, longitude), cls.request_location_forecast, session, latitude, longitude
+                )
+            if isinstance(location_forecast, dict):
+                last_good = await cls.last_good_forecast(latitude, longitude, travel_date, travel_date)
+                if last_good is not None:
+                    return cls.temperature_result(last_good, travel_date, None)
+        else:
+            location_forecast = await coordinate_flights.do(
+                cache_key, cls.request_location_forecast, session, latitude, longitude, travel_date
+            )
+
+        if isinstance(location_forecast, dict):
+            return CachedEntry.fresh(location_forecast, CACHE_EXPIRATION)
+        return cls.temperature_result(location_forecast, travel_date, cache_key)
 
-        request_params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": "temperature_2m",
-            "timezone": "Asia/Dhaka",
-            "start_date": travel_date,
-            "end_date": travel_date
-        }
+    @staticmethod
+    async def last_good_forecast(latitude, longitude, start_date, end_date):
+        """The location's last good stored forecast if it covers both dates, for use while the provider fails."""
+        last_good = await forecast_store.aget_last_good(latitude, longitude)
+        if last_good is None or not (last_good.covers(start_date) and last_good.covers(end_date)):
+            return None
+        logger.warning("Serving the last good forecast for lat=%s, lon=%s.", latitude, longitude)
+        return last_good
 
-        try:
-            async with session.get(get_forecast_url(), params=request_params) as response:
-                if response.status != 200:
-                    logger.error("API Error: %s", response.status)
-                    return {"error": f"API Error {response.status}"}
+    @staticmethod
+    async def request_location_forecast(session, latitude, longitude, travel_date=None, end_date=None):
+        """Call the forecast API for one location; only one caller per flight key gets here.
+
+        Without ``travel_date`` the full ``FORECAST_DAYS`` forecast is fetched and kept in the
+        forecast store. With it, only that date (or the range up to ``end_date``, which is
+        cached on its own) is fetched, for dates outside the horizon.
+        Returns the LocationForecast, or a result/error entry.
+        """
+
+        if travel_date is None:
+            flight_key = location_key(latitude, longitude)
+        elif end_date is None:
+            flight_key = f"weather_{coordinate_key(latitude, longitude)}_{travel_date}"
+        else:
+            flight_key = forecast_window_key(latitude, longitude, travel_date, end_date)
+
+        async with peer_lock(flight_key) as holds_lock:
+            if not holds_lock:
+                peer_result = await wait_for_peer(flight_key, forecast_store.is_fresh if travel_date is None else None)
+                if peer_result:
+                    return entry_value(peer_result)
+
+            logger.info("Cache miss. Fetching weather data for lat=%s, lon=%s, date=%s", latitude, longitude, travel_date)
+
+            request_params = {
+                "latitude": latitude,
+                "longitude": longitude,
+                "hourly": "temperature_2m",
+                "timezone": "Asia/Dhaka",
+            }
+            if travel_date is None:
+                request_params["forecast_days"] = settings.FORECAST_DAYS
+            else:
+                request_params["start_date"] = travel_date
+                request_params["end_date"] = end_date or travel_date
 
-                weather_data = await response.json()
-                logger.info("Received weather data: %s", weather_data)
+            try:
+                status, weather_data = await get_upstream_policy().get_json(session, request_params, "location")
+                if status != 200:
+                    logger.error("API Error: %s", status)
+                    return {"error": f"API Error {status}"}
+
+                logger.debug("Received weather data: %s", payload(weather_data), extra={"event": "upstream_payload"})
 
                 if "hourly" not in weather_data or "time" not in weather_data["hourly"] or "temperature_2m" not in \
                         weather_data["hourly"]:
                     logger.error("No hourly weather data available.")
                     return {"error": "No hourly data available"}
 
-                time_entries = weather_data['hourly']['time']
-                temperature_entries = weather_data['hourly']['temperature_2m']
-
-                temperature_index = next(
-                    (i for i, time_value in enumerate(time_entries) if time_pattern.search(time_value)), None)
+                forecast_matrix = ForecastMatrix.from_hourly(
+                    [(weather_data['hourly']['time'], weather_data['hourly']['temperature_2m'])]
+                )
+                location_forecast = LocationForecast(latitude, longitude, forecast_matrix.start, forecast_matrix.values[0])
+                if travel_date is None:
+                    forecast_store.put_many([location_forecast])
+                elif end_date is not None:
+                    weather_cache.set(flight_key, location_forecast, CACHE_EXPIRATION)
+                return location_forecast
 
-                if temperature_index is not None:
-                    temperature_at_2pm = temperature_entries[temperature_index]
-                    logger.info("Fetched temperature: %s°C at 2 PM", temperature_at_2pm)
+            except Exception as error:
+                logger.exception("Error fetching weather data: %s", str(error))
+                return {"error": str(error)}
 
-                    result = {"temperature": temperature_at_2pm}
-                    cache.set(cache_key, result, CACHE_EXPIRATION)
-                    return result
+    @staticmethod
+    def travel_result(friend_temperature, destination_temperature):
+        """Apply the temperature-difference rule to a pair of 2 PM temperatures."""
+        temperature_difference =  abs(destination_temperature - friend_temperature)
+        travel_decision = "Yes, it's a good day to travel!" if temperature_difference <= TRAVEL_TEMPERATURE_THRESHOLD else f"No, the temperature difference is {round(temperature_difference, 2)} degree Celsius which is too high!"
 
-                logger.warning("No 2 PM temperature data found.")
-                return {"error": "No 2 PM temperature data found"}
+        logger.info("Travel decision: %s (Temp Difference: %s°C)", travel_decision, temperature_difference)
 
-        except Exception as error:
-            logger.exception("Error fetching weather data: %s", str(error))
-            return {"error": str(error)}
+        return {
+            "friend_temperature": friend_temperature,
+            "destination_temperature": destination_temperature,
+            "decision": travel_decision
+        }
 
     @classmethod
-    async def compare_travel_weather(cls, friend_latitude, friend_longitude, destination_latitude,
-                                     destination_longitude, travel_date):
-        """Compare temperatures between friend's location and destination at 2 PM on the travel date."""
-
-        cache_key = f"compare_weather_{friend_latitude}_{friend_longitude}_{destination_latitude}_{destination_longitude}_{travel_date}"
-        cached_result = cache.get(cache_key)
-
-        if cached_result:
-            logger.info("Cache hit for travel comparison: %s", cache_key)
-            return cached_result  # Return cached comparison result
-
-        logger.info("Cache miss. Comparing weather between friend=(%s, %s) and destination=(%s, %s) for date=%s",
-                    friend_latitude, friend_longitude, destination_latitude, destination_longitude, travel_date)
-
-        async with aiohttp.ClientSession() as session:
-            friend_weather_task = cls.fetch_weather_by_coordinates(session, friend_latitude, friend_longitude,
-                                                                   travel_date)
-            destination_weather_task = cls.fetch_weather_by_coordinates(session, destination_latitude,
-                                                                        destination_longitude, travel_date)
-            friend_weather_data, destination_weather_data = await asyncio.gather(friend_weather_task,
-                                                                                 destination_weather_task)
-
+    def comparison_result(cls, friend_weather_data, destination_weather_data):
+        """Decide on a pair of fetch_weather_by_coordinates results, reporting missing data."""
         friend_temperature = friend_weather_data.get("temperature")
         destination_temperature = destination_weather_data.get("temperature")
 
@@ -205,16 +591,248 @@ class WeatherService:
                 "destination_error": destination_weather_data.get("error")
             }
 
-        temperature_difference =  abs(destination_temperature - friend_temperature)
-        travel_decision = "Yes, it's a good day to travel!" if temperature_difference <= 2 else f"No, the temperature difference is {round(temperature_difference, 2)} degree Celsius which is too high!"
+        return cls.travel_result(friend_temperature, destination_temperature)
 
-        logger.info("Travel decision: %s (Temp Difference: %s°C)", travel_decision, temperature_difference)
+    @classmethod
+    @on_upstream_loop
+    async def compare_travel_weather(cls, friend_latitude, friend_longitude, destination_latitude,
+                                     destination_longitude, travel_date, freshness=None):
+        """Compare temperatures between friend's location and destination at 2 PM on the travel date.
+
+        A cached comparison past its soft TTL is answered right away and refreshed in the
+        background. The age of the data used is reported to ``freshness``.
+        """
+
+        friend_point = coordinate_key(friend_latitude, friend_longitude)
+        destination_point = coordinate_key(destination_latitude, destination_longitude)
+        cache_key = travel_comparison_key(friend_point, destination_point, travel_date)
+        entry = load_entry(cache_key)
+
+        if entry is not None:
+            if entry.is_stale:
+                revalidator.schedule(cache_key, cls.load_travel_comparison, friend_latitude, friend_longitude,
+                                     destination_latitude, destination_longitude, travel_date, True)
+            else:
+                logger.info("Cache hit for travel comparison: %s", cache_key, extra={"event": "cache_hit"})
+            if freshness is not None:
+                freshness.observe(entry)
+            return cls.travel_result(entry.value[friend_point], entry.value[destination_point])
+
+        logger.info("Cache miss. Comparing weather between friend=(%s, %s) and destination=(%s, %s) for date=%s",
+                    friend_latitude, friend_longitude, destination_latitude, destination_longitude, travel_date)
+        return await cls.load_travel_comparison(friend_latitude, friend_longitude, destination_latitude,
+                                                destination_longitude, travel_date, freshness=freshness)
+
+    @classmethod
+    async def load_travel_comparison(cls, friend_latitude, friend_longitude, destination_latitude,
+                                     destination_longitude, travel_date, refresh=False, freshness=None):
+        """Fetch both 2 PM temperatures, decide, and cache the pair when its data is complete and fresh.
+
+        ``refresh`` bypasses the cached per-location temperatures, for background refreshes.
+        """
+        session = await get_client_session()
+        pair_freshness = Freshness()
+        friend_weather_data, destination_weather_data = await asyncio.gather(
+            cls.fetch_weather_by_coordinates(session, friend_latitude, friend_longitude, travel_date,
+                                             pair_freshness, refresh),
+            cls.fetch_weather_by_coordinates(session, destination_latitude, destination_longitude, travel_date,
+                                             pair_freshness, refresh),
+        )
+        if freshness is not None:
+            freshness.observe(pair_freshness)
+
+        result = cls.comparison_result(friend_weather_data, destination_weather_data)
+        if "friend_error" in result or pair_freshness.is_stale:
+            return result
+
+        # The pair key is order independent, so A->B and B->A share one entry of both temperatures
+        friend_point = coordinate_key(friend_latitude, friend_longitude)
+        destination_point = coordinate_key(destination_latitude, destination_longitude)
+        store_entry(travel_comparison_key(friend_point, destination_point, travel_date), pair_freshness.entry({
+            friend_point: result["friend_temperature"],
+            destination_point: result["destination_temperature"]
+        }, CACHE_EXPIRATION))
+
+        return result
+
+    @classmethod
+    @on_upstream_loop
+    async def compare_travel_weather_bulk(cls, comparisons, freshness=None):
+        """Compare many routes at once, fetching each distinct location and date only once.
+
+        ``comparisons`` holds ``(friend_latitude, friend_longitude, destination_latitude,
+        destination_longitude, travel_date)`` tuples. Results come back in the same order and
+        in the shape compare_travel_weather returns.
+        """
+        locations = {}
+        for friend_latitude, friend_longitude, destination_latitude, destination_longitude, travel_date in comparisons:
+            locations.setdefault((coordinate_key(friend_latitude, friend_longitude), travel_date),
+                                 (friend_latitude, friend_longitude, travel_date))
+            locations.setdefault((coordinate_key(destination_latitude, destination_longitude), travel_date),
+                                 (destination_latitude, destination_longitude, travel_date))
+
+        logger.info("Bulk comparison of %s routes over %s distinct locations.", len(comparisons), len(locations))
+        session = await get_client_session()
+        location_weather = await asyncio.gather(*(
+            cls.fetch_weather_by_coordinates(session, latitude, longitude, travel_date, freshness)
+            for latitude, longitude, travel_date in locations.values()
+        ))
+        weather_by_location = dict(zip(locations, location_weather))
+
+        return [
+            cls.comparison_result(
+                weather_by_location[(coordinate_key(friend_latitude, friend_longitude), travel_date)],
+                weather_by_location[(coordinate_key(destination_latitude, destination_longitude), travel_date)],
+            )
+            for friend_latitude, friend_longitude, destination_latitude, destination_longitude, travel_date in comparisons
+        ]
+
+    @classmethod
+    async def district_temperatures_at_2pm(cls, travel_date):
+        """2 PM temperature of every district on ``travel_date``, ``None`` where unavailable.
+
+        Inside the forecast horizon the districts' stored forecasts are used, and the ones
+        that are missing or too old are fetched in batches. Other dates go through the
+        coordinate path, one coalesced lookup per district.
+        """
+        if not cls.within_forecast_horizon(travel_date):
+            session = await get_client_session()
+            weather_results = await asyncio.gather(*(
+                cls.fetch_weather_by_coordinates(session, float(district["lat"]), float(district["long"]), travel_date)
+                for district in get_district_registry()
+            ))
+            return [weather_data.get("temperature") for weather_data in weather_results]
+
+        districts = get_district_registry()
+        coordinates = [(district.lat, district.long) for district in districts]
+        stored_forecasts = await forecast_store.aget_many(coordinates)
+        missing_districts = [
+            district for district, coordinate in zip(districts, coordinates)
+            if coordinate not in stored_forecasts or not stored_forecasts[coordinate].covers(travel_date)
+        ]
+        if missing_districts:
+            logger.info("Fetching %s district forecasts for the travel matrix.", len(missing_districts))
+            await cls.fetch_coalesced_districts(missing_districts)
+            # Districts the provider failed on fall back to their last good forecast
+            stored_forecasts.update(await forecast_store.aget_last_good_many(
+                (district["lat"], district["long"]) for district in missing_districts
+            ))
+
+        return [
+            stored_forecasts[coordinate].temperature_at(travel_date, 14) if coordinate in stored_forecasts else None
+            for coordinate in coordinates
+        ]
+
+    @classmethod
+    @on_upstream_loop
+    async def district_travel_matrix(cls, travel_date):
+        """All-pairs travel decisions between districts on ``travel_date``, as a TravelMatrix.
+
+        Applies the same temperature-difference rule as compare_travel_weather to every pair
+        at once. Complete matrices are cached per date.
+        """
+        cache_key = travel_matrix_key(travel_date)
+        travel_matrix = weather_cache.get(cache_key)
+        if travel_matrix is not None:
+            logger.info("Cache hit for travel matrix: %s", cache_key, extra={"event": "cache_hit"})
+            return travel_matrix
+
+        temperatures = await cls.district_temperatures_at_2pm(travel_date)
+        travel_matrix = TravelMatrix.from_temperatures(
+            travel_date,
+            get_district_registry().names,
+            [np.nan if temperature is None else temperature for temperature in temperatures],
+            TRAVEL_TEMPERATURE_THRESHOLD,
+        )
+        if travel_matrix.complete:
+            weather_cache.set(cache_key, travel_matrix, TRAVEL_MATRIX_EXPIRATION)
+        else:
+            logger.warning("Travel matrix for %s is missing district temperatures; not caching it.", travel_date)
+        return travel_matrix
+
+    @classmethod
+    async def fetch_forecast_window(cls, session, latitude, longitude, start_date, end_date):
+        """LocationForecast covering ``start_date`` to ``end_date`` for one location, or an error entry.
+
+        A window inside the forecast horizon is served from the location's full stored
+        forecast, so every day in it shares one upstream call with the single-date path.
+        """
+        if cls.within_forecast_horizon(start_date) and cls.within_forecast_horizon(end_date):
+            location_forecast = await forecast_store.aget(latitude, longitude)
+            if location_forecast is None or not location_forecast.covers(end_date):
+                location_forecast = await coordinate_flights.do(
+                    location_key(latitude, longitude), cls.request_location_forecast, session, latitude, longitude
+                )
+            if isinstance(location_forecast, dict):
+                return await cls.last_good_forecast(latitude, longitude, start_date, end_date) or location_forecast
+            return location_forecast
+
+        cache_key = forecast_window_key(latitude, longitude, start_date, end_date)
+        location_forecast = weather_cache.get(cache_key)
+        if location_forecast is not None:
+            logger.info("Cache hit for forecast window: %s", cache_key, extra={"event": "cache_hit"})
+            return location_forecast
+        return await coordinate_flights.do(
+            cache_key, cls.request_location_forecast, session, latitude, longitude, start_date, end_date
+        )
+
+    @classmethod
+    @on_upstream_loop
+    async def compare_travel_window(cls, friend_latitude, friend_longitude, destination_latitude,
+                                    destination_longitude, start_date, end_date, freshness=None):
+        """Score every day from ``start_date`` to ``end_date`` by the 2 PM temperature difference.
+
+        Each location's hourly series is fetched once for the whole window. Days come back
+        ranked, smallest difference first, with days lacking data last. The age of the
+        forecasts used is reported to ``freshness``.
+        """
+        logger.info("Comparing weather between friend=(%s, %s) and destination=(%s, %s) from %s to %s",
+                    friend_latitude, friend_longitude, destination_latitude, destination_longitude,
+                    start_date, end_date)
+
+        session = await get_client_session()
+        friend_forecast, destination_forecast = await asyncio.gather(
+            cls.fetch_forecast_window(session, friend_latitude, friend_longitude, start_date, end_date),
+            cls.fetch_forecast_window(session, destination_latitude, destination_longitude, start_date, end_date),
+        )
+
+        if freshness is not None:
+            for forecast in (friend_forecast, destination_forecast):
+                if isinstance(forecast, LocationForecast):
+                    freshness.observe(CachedEntry.fresh(None, CACHE_EXPIRATION, forecast.fetched_at))
+
+        days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        friend_temperatures, destination_temperatures = (
+            forecast.temperatures_at(days, 14) if isinstance(forecast, LocationForecast) else np.full(len(days), np.nan)
+            for forecast in (friend_forecast, destination_forecast)
+        )
+        temperature_differences = np.round(np.abs(destination_temperatures - friend_temperatures), 2)
+
+        ranked_days = []
+        for index in rank_order(temperature_differences):
+            if np.isnan(temperature_differences[index]):
+                ranked_days.append({
+                    "date": str(days[index]),
+                    "friend_temperature": None if np.isnan(friend_temperatures[index]) else float(friend_temperatures[index]),
+                    "destination_temperature": None if np.isnan(destination_temperatures[index]) else float(destination_temperatures[index]),
+                    "temperature_difference": None,
+                    "decision": "Data unavailable, cannot decide"
+                })
+                continue
+            ranked_days.append({
+                "date": str(days[index]),
+                **cls.travel_result(float(friend_temperatures[index]), float(destination_temperatures[index])),
+                "temperature_difference": float(temperature_differences[index])
+            })
 
         result = {
-            "friend_temperature": friend_temperature,
-            "destination_temperature": destination_temperature,
-            "decision": travel_decision
+            "start_date": start_date,
+            "end_date": end_date,
+            "best_date": ranked_days[0]["date"] if ranked_days[0]["temperature_difference"] is not None else None,
+            "days": ranked_days
         }
-        cache.set(cache_key, result, CACHE_EXPIRATION)  # Store in cache
-
+        if isinstance(friend_forecast, dict):
+            result["friend_error"] = friend_forecast.get("error")
+        if isinstance(destination_forecast, dict):
+            result["destination_error"] = destination_forecast.get("error")
         return result
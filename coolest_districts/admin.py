@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from coolest_districts.models import StoredForecast
+
+
+@admin.register(StoredForecast)
+class StoredForecastAdmin(admin.ModelAdmin):
+    list_display = ("location_key", "latitude", "longitude", "fetched_at")
+    exclude = ("temperatures",)
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from common_services.district_snapshot import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuild and publish the coolest-districts snapshot, once or on a fixed cadence."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Publish a single snapshot and exit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.DISTRICT_SNAPSHOT_REFRESH_INTERVAL,
+            help="Seconds between refreshes when running continuously.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started_at = time.monotonic()
+            try:
+                snapshot = refresh_snapshot()
+            except Exception as error:
+                if options["once"]:
+                    raise
+                self.stderr.write(self.style.ERROR(f"Snapshot refresh failed: {error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Published snapshot with {len(snapshot['districts'])} districts."
+                ))
+            if options["once"]:
+                return
+            time.sleep(max(0.0, options["interval"] - (time.monotonic() - started_at)))
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredForecast',
+            fields=[
+                ('location_key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('start_hour', models.BigIntegerField()),
+                ('temperatures', models.BinaryField()),
+                ('fetched_at', models.FloatField(db_index=True, help_text='Unix time the forecast was fetched.')),
+            ],
+            options={
+                'db_table': 'stored_forecast',
+            },
+        ),
+    ]
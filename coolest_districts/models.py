@@ -1,3 +1,23 @@
 from django.db import models
 
-# Create your models here.
+
+class StoredForecast(models.Model):
+    """Last fetched hourly forecast of one location, kept in the database across restarts.
+
+    ``start_hour`` is the local hour of the first value in hours since 1970-01-01T00, and
+    ``temperatures`` the hourly series as little-endian float32 bytes, so a row converts
+    back into a ``LocationForecast`` without parsing.
+    """
+
+    location_key = models.CharField(max_length=64, primary_key=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    start_hour = models.BigIntegerField()
+    temperatures = models.BinaryField()
+    fetched_at = models.FloatField(db_index=True, help_text="Unix time the forecast was fetched.")
+
+    class Meta:
+        db_table = "stored_forecast"
+
+    def __str__(self):
+        return self.location_key
@@ -0,0 +1,137 @@
+from drf_spectacular.extensions import OpenApiViewExtension
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+
+class DistrictWeatherViewSetSchema(OpenApiViewExtension):
+    """OpenAPI documentation of DistrictWeatherViewSet, attached only while a schema is generated."""
+
+    target_class = "coolest_districts.views.views_v1.DistrictWeatherViewSet"
+
+    def view_replacement(self):
+        class DocumentedDistrictWeatherViewSet(self.target_class):
+            @extend_schema(
+                tags=['Coolest Districts'],
+                summary="Get Coolest Districts",
+                description="Fetches the districts with the lowest average temperatures at 2 PM, with optional sorting and pagination.",
+                parameters=[
+                    OpenApiParameter(
+                        name="limit",
+                        description="Number of districts to return; negative values return none",
+                        required=False,
+                        type=OpenApiTypes.INT
+                    ),
+                    OpenApiParameter(
+                        name="sort",
+                        description="Sort order (asc/desc)",
+                        required=False,
+                        type=OpenApiTypes.STR,
+                        enum=["asc", "desc"]
+                    ),
+                    OpenApiParameter(
+                        name="division_id",
+                        description="Only rank the districts of this division",
+                        required=False,
+                        type=OpenApiTypes.STR
+                    ),
+                    OpenApiParameter(
+                        name="hours",
+                        description="Local hour (14) or inclusive hour window (15-17) to rank by; defaults to 14",
+                        required=False,
+                        type=OpenApiTypes.STR
+                    ),
+                    OpenApiParameter(
+                        name="statistic",
+                        description="Statistic over the hours of every forecast day: mean, min, max, median or a whole percentile like p90; defaults to mean",
+                        required=False,
+                        type=OpenApiTypes.STR
+                    ),
+                ],
+                responses={
+                    200: {
+                        "description": "List of coolest districts sorted by temperature.",
+                        "content": {
+                            "application/json": {
+                                "example": [
+                                    {
+                                        "id": "40",
+                                        "division_id": "2",
+                                        "name": "Bandarban",
+                                        "bn_name": "বান্দরবান",
+                                        "average_temperature": 30.27,
+                                        "temperature_unit": "Celsius",
+                                        "latitude": "22.1953275",
+                                        "longitude": "92.2183773"
+                                    },
+                                    {
+                                        "id": "39",
+                                        "division_id": "1",
+                                        "name": "Pirojpur",
+                                        "bn_name": "পিরোজপুর",
+                                        "average_temperature": 29.83,
+                                        "temperature_unit": "Celsius",
+                                        "latitude": "22.5841",
+                                        "longitude": "89.9720"
+                                    }
+                                ]
+                            }
+                        }
+                    },
+                    304: {
+                        "description": "The ranking is unchanged since the version named in If-None-Match or If-Modified-Since."
+                    },
+                    400: {
+                        "description": "Invalid parameters provided.",
+                        "content": {
+                            "application/json": {
+                                "example": {
+                                    "error": "Invalid sort parameter. Use 'asc' or 'desc'."
+                                }
+                            }
+                        }
+                    }
+                }
+            )
+            async def get_coolest_districts(self, request):
+                return await super().get_coolest_districts(request)
+
+            @extend_schema(
+                tags=['Coolest Districts'],
+                summary="Get Division Rollup",
+                description="Minimum, mean and maximum of the districts' 2 PM average temperatures per division, coolest mean first.",
+                parameters=[
+                    OpenApiParameter(
+                        name="sort",
+                        description="Sort order of the division means (asc/desc)",
+                        required=False,
+                        type=OpenApiTypes.STR,
+                        enum=["asc", "desc"]
+                    ),
+                ],
+                responses={
+                    200: {
+                        "description": "Per-division temperature rollup.",
+                        "content": {
+                            "application/json": {
+                                "example": [
+                                    {
+                                        "division_id": "6",
+                                        "district_count": 8,
+                                        "min_temperature": 24.14,
+                                        "mean_temperature": 25.02,
+                                        "max_temperature": 26.31,
+                                        "temperature_unit": "Celsius"
+                                    }
+                                ]
+                            }
+                        }
+                    },
+                    304: {
+                        "description": "The rollup is unchanged since the version named in If-None-Match or If-Modified-Since."
+                    }
+                }
+            )
+            async def get_division_rollup(self, request):
+                return await super().get_division_rollup(request)
+
+        return DocumentedDistrictWeatherViewSet
@@ -1,17 +1,44 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import logging
+import tempfile
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from django.test import TestCase, override_settings
 from django.test.client import RequestFactory
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory
+from benchmarks.fake_open_meteo import FakeOpenMeteo
 from coolest_districts.views.views_v1 import DistrictWeatherViewSet
+from common_services.weather_helper import WeatherService
+from common_services.district_snapshot import SNAPSHOT_CACHE_KEY, publish_snapshot
+from common_services.forecast_archive import forecast_archive, warm_forecast_store
+from common_services.forecast_aggregation import DEFAULT_METRIC, ForecastMatrix, MetricSpec
+from common_services.forecast_store import LocationForecast, forecast_store
+from common_services.hash_key_generate import sanitize_cache_key
+from common_services.http_session import get_client_session, run_upstream_sync
+from common_services.metrics import cache_namespace, registry
+from common_services.openapi_schema import load_schema_artifact
+from common_services.stale_cache import revalidator
+from common_services.testing import FakeSession
+from common_services.structured_logging import EventSampler, NonBlockingHandler, StructuredFormatter, payload
+from common_services.tiered_cache import TieredCache, weather_cache
+from common_services.upstream_policy import (
+    AdaptiveConcurrencyLimiter, CircuitBreaker, get_upstream_policy, reset_upstream_policy,
+)
 
 class DistrictWeatherViewSetTest(TestCase):
     def setUp(self):
+        weather_cache.clear()
         self.factory = APIRequestFactory()
         self.view = DistrictWeatherViewSet.as_view({"get": "get_coolest_districts"})  # Directly call view method
         self.url = "/v1/coolest-districts/"
 
-    @patch("common_services.weather_helper.WeatherService.fetch_weather_data_sync", return_value=[
+    @patch("common_services.weather_helper.WeatherService.retrieve_district_weather_data", new_callable=AsyncMock, return_value=[
         {"id": "31", "division_id": "6", "name": "Panchagarh", "average_temperature": 24.14},
         {"id": "33", "division_id": "6", "name": "Thakurgaon", "average_temperature": 24.27},
         {"id": "26", "division_id": "6", "name": "Dinajpur", "average_temperature": 25.19},
@@ -23,17 +50,583 @@ class DistrictWeatherViewSetTest(TestCase):
         {"id": "5", "division_id": "8", "name": "Jamalpur", "average_temperature": 26.29},
         {"id": "16", "division_id": "8", "name": "Sherpur", "average_temperature": 26.29},
     ])
-    def test_get_coolest_districts(self, mock_fetch_weather_data):
+    async def test_get_coolest_districts(self, mock_fetch_weather_data):
         request = self.factory.get(self.url, {"limit": 10, "sort": "asc"})  # Mock GET request
-        response = self.view(request)  # Directly call the view
+        response = await self.view(request)  # Directly call the view
 
+        data = json.loads(response.content)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 10)
+        self.assertEqual(len(data), 10)
 
         expected_sorted_names = [
             "Panchagarh", "Thakurgaon", "Dinajpur", "Kurigram", "Nilphamari",
             "Lalmonirhat", "Rangpur", "Gaibandha", "Jamalpur", "Sherpur"
         ]
 
-        actual_sorted_names = [district["name"] for district in response.data]
+        actual_sorted_names = [district["name"] for district in data]
         self.assertEqual(actual_sorted_names, expected_sorted_names, "Sorting order is incorrect!")
+
+    @patch("common_services.weather_helper.WeatherService.retrieve_district_weather_data", new_callable=AsyncMock)
+    async def test_get_coolest_districts_reads_published_snapshot(self, mock_fetch_weather_data):
+        publish_snapshot({
+            "districts": [
+                {"id": "31", "division_id": "6", "name": "Panchagarh", "average_temperature": 24.14},
+                {"id": "33", "division_id": "6", "name": "Thakurgaon", "average_temperature": 24.27},
+            ],
+            "generated_at": 0,
+        })
+        request = self.factory.get(self.url, {"limit": 1, "sort": "desc"})
+        response = await self.view(request)
+
+        mock_fetch_weather_data.assert_not_called()
+        self.assertEqual([district["name"] for district in json.loads(response.content)], ["Thakurgaon"])
+
+
+class WeatherBatchFetchTest(TestCase):
+    districts = [
+        {"id": "1", "division_id": "3", "name": "Dhaka", "bn_name": "ঢাকা", "lat": "23.7115253", "long": "90.4111451"},
+        {"id": "2", "division_id": "3", "name": "Faridpur", "bn_name": "ফরিদপুর", "lat": "23.6070822", "long": "89.8429406"},
+    ]
+
+    def setUp(self):
+        reset_upstream_policy()
+        weather_cache.clear()
+        forecast_archive.clear()
+
+    async def test_batch_response_is_split_per_district(self):
+        session = FakeSession(200, [
+            {"hourly": {"time": ["2025-02-10T13:00", "2025-02-10T14:00"], "temperature_2m": [25.0, 26.5]}},
+            {"hourly": {}},
+        ])
+        weather_payloads = await WeatherService.fetch_weather_batch(session, self.districts)
+        results = WeatherService.build_district_results(self.districts, weather_payloads)
+
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual(session.calls[0]["latitude"], "23.7115253,23.6070822")
+        self.assertEqual(results[0]["name"], "Dhaka")
+        self.assertEqual(results[0]["average_temperature"], 26.5)
+        self.assertEqual(results[1], {"district": "Faridpur", "error": "No hourly data available"})
+
+    @override_settings(UPSTREAM_RETRY_BASE_DELAY=0)
+    async def test_throttled_batch_reports_error_per_district_after_retries(self):
+        session = FakeSession(429, None)
+        results = await WeatherService.fetch_weather_batch(session, self.districts)
+
+        self.assertEqual(len(session.calls), 3)
+        self.assertEqual([result["error"] for result in results], ["API Error 429", "API Error 429"])
+
+    @override_settings(UPSTREAM_RETRY_BASE_DELAY=0)
+    async def test_transient_failure_is_retried(self):
+        session = FakeSession((503, 200), [
+            {"hourly": {"time": ["2025-02-10T14:00"], "temperature_2m": [26.5]}},
+            {"hourly": {"time": ["2025-02-10T14:00"], "temperature_2m": [27.0]}},
+        ])
+        weather_payloads = await WeatherService.fetch_weather_batch(session, self.districts)
+
+        self.assertEqual(len(session.calls), 2)
+        self.assertEqual(weather_payloads[1]["hourly"]["temperature_2m"], [27.0])
+
+    @override_settings(UPSTREAM_RETRY_ATTEMPTS=1, UPSTREAM_BREAKER_FAILURE_THRESHOLD=2)
+    async def test_open_circuit_serves_last_good_forecast(self):
+        forecast_store.put_many([LocationForecast(
+            self.districts[0]["lat"], self.districts[0]["long"], "2025-02-10T00", [25.0] * 24, fetched_at=0
+        )])
+        session = FakeSession(503, None)
+        for _ in range(2):
+            await WeatherService.fetch_weather_batch(session, self.districts)
+        self.assertEqual(get_upstream_policy().breaker.state, CircuitBreaker.OPEN)
+
+        with patch("common_services.weather_helper.get_client_session", new=AsyncMock(return_value=session)):
+            results = await WeatherService.fetch_district_batches(self.districts)
+
+        self.assertEqual(len(session.calls), 2)
+        self.assertEqual(results[0]["average_temperature"], 25.0)
+        self.assertIn("circuit open", results[1]["error"])
+        self.assertIsNone(weather_cache.get(sanitize_cache_key("Dhaka")))
+
+
+class HedgedRequestTest(TestCase):
+    params = {"latitude": 23.7115253, "longitude": 90.4111451, "hourly": "temperature_2m", "forecast_days": 1}
+
+    def setUp(self):
+        reset_upstream_policy()
+        self.addCleanup(reset_upstream_policy)
+
+    @staticmethod
+    async def fetch(params):
+        return await get_upstream_policy().get_json(await get_client_session(), params, "district")
+
+    def test_slow_endpoint_is_hedged_on_the_next_one(self):
+        slow, fast = FakeOpenMeteo(latency_ms=3000), FakeOpenMeteo(latency_ms=10)
+        slow_url, fast_url = slow.start_in_thread(), fast.start_in_thread()
+
+        with override_settings(UPSTREAM_HEDGE_INITIAL_DELAY=0.1, UPSTREAM_HEDGE_BUDGET=1.0):
+            with override_settings(FORECAST_URLS=[slow_url, fast_url]):
+                started_at = time.monotonic()
+                status, payload = run_upstream_sync(self.fetch(self.params))
+                hedged_latency = time.monotonic() - started_at
+            with override_settings(FORECAST_URLS=[fast_url, slow_url]):
+                run_upstream_sync(self.fetch(self.params))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(payload["hourly"]["temperature_2m"]), 24)
+        self.assertLess(hedged_latency, 1.0)
+        # The fast primary answered before the hedging delay, so the slow endpoint saw one call only.
+        self.assertEqual((slow.stats()["calls"], fast.stats()["calls"]), (1, 2))
+
+    def test_single_endpoint_is_not_hedged(self):
+        slow = FakeOpenMeteo(latency_ms=300)
+        slow_url = slow.start_in_thread()
+
+        with override_settings(UPSTREAM_HEDGE_INITIAL_DELAY=0.05, UPSTREAM_HEDGE_BUDGET=1.0, FORECAST_URLS=[slow_url]):
+            status, _ = run_upstream_sync(self.fetch(self.params))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(slow.stats()["calls"], 1)
+
+
+class AdaptiveConcurrencyLimiterTest(TestCase):
+    async def test_limit_grows_on_fast_calls_and_halves_on_throttling(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=8, latency_target=1.0)
+        for _ in range(8):
+            await limiter.acquire()
+            limiter.release(0.01, overloaded=False)
+        self.assertEqual(limiter.max_in_flight, 5)
+
+        await limiter.acquire()
+        limiter.release(0.01, overloaded=True)
+        self.assertEqual(limiter.max_in_flight, 2)
+
+    async def test_waiters_get_slots_in_order(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=1, minimum=1, maximum=1, latency_target=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+
+        limiter.release(0.01, overloaded=False)
+        await waiter
+        self.assertEqual(limiter.in_flight, 1)
+
+
+class TieredCacheTest(TestCase):
+    def setUp(self):
+        self.tiered_cache = TieredCache(shared_alias="default", local_max_entries=2, local_ttl=60)
+        self.tiered_cache.clear()
+
+    def test_shared_hits_fill_the_local_tier(self):
+        self.tiered_cache.shared.set_many({"a": 1, "b": 2}, 60)
+
+        self.assertEqual(self.tiered_cache.get_many(["a", "b", "c"]), {"a": 1, "b": 2})
+        self.assertEqual(self.tiered_cache.get_many(["a", "b"]), {"a": 1, "b": 2})
+        self.assertEqual(self.tiered_cache.stats(), {
+            "local": {"hits": 2, "misses": 3},
+            "shared": {"hits": 2, "misses": 1},
+        })
+
+    def test_local_tier_evicts_least_recently_used(self):
+        self.tiered_cache.set_many({"a": 1, "b": 2}, 60)
+        self.tiered_cache.get("a")
+        self.tiered_cache.set("c", 3, 60)
+
+        self.assertIsNone(self.tiered_cache.local.get("b"))
+        self.assertEqual(self.tiered_cache.local.get("a"), 1)
+
+
+class DistrictAggregationTest(TestCase):
+    def test_two_pm_average_is_computed_for_all_districts_at_once(self):
+        districts = WeatherBatchFetchTest.districts
+        results = WeatherService.build_district_results(districts, [
+            {"hourly": {
+                "time": ["2025-02-10T14:00", "2025-02-10T15:00", "2025-02-11T14:00"],
+                "temperature_2m": [25.0, 40.0, 26.333],
+            }},
+            {"hourly": {"time": ["2025-02-10T13:00"], "temperature_2m": [21.0]}},
+        ])
+
+        self.assertEqual(results[0]["average_temperature"], 25.67)
+        self.assertEqual(results[1], {
+            "district": "Faridpur",
+            "message": "No temperature data available for the requested time"
+        })
+
+    def test_malformed_series_only_fail_their_own_district(self):
+        districts = WeatherBatchFetchTest.districts * 4
+        valid = {"hourly": {"time": ["2025-02-10T14:00", "2025-02-11T14:00"], "temperature_2m": [25.0, 27.0]}}
+        results = WeatherService.build_district_results(districts, [
+            {"hourly": {"time": ["not a time", "2025-02-11T14:00"], "temperature_2m": [25.0, 27.0]}},
+            {"hourly": {"time": ["2025-02-10T14:00", "2025-02-11T14:00"], "temperature_2m": [25.0]}},
+            {"hourly": {"time": [], "temperature_2m": []}},
+            valid,
+            {"hourly": {"time": valid["hourly"]["time"], "temperature_2m": [[25.0], [27.0]]}},
+            {"hourly": {"time": None, "temperature_2m": None}},
+            {"hourly": {"time": valid["hourly"]["time"], "temperature_2m": ["warm", 27.0]}},
+            valid,
+        ])
+
+        self.assertEqual([result.get("error") for result in results], ["Invalid hourly data"] * 3 + [None] + ["Invalid hourly data"] * 3 + [None])
+        self.assertEqual(results[3]["average_temperature"], 26.0)
+
+    def test_every_series_empty_reports_errors(self):
+        results = WeatherService.build_district_results(
+            WeatherBatchFetchTest.districts, [{"hourly": {"time": [], "temperature_2m": []}}] * 2
+        )
+
+        self.assertEqual([result["error"] for result in results], ["Invalid hourly data"] * 2)
+
+
+class MetricEngineTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+        forecast_archive.clear()
+
+    def test_hour_window_statistics_use_offsets_from_the_first_hour(self):
+        # Starts at 13:00, so the 15-17 window of each day sits at columns 2-4 and 26-28.
+        forecast_matrix = ForecastMatrix(np.datetime64("2025-02-10T13", "h"), np.arange(48, dtype=float).reshape(1, 48))
+
+        self.assertEqual(forecast_matrix.hour_columns(15, 17).tolist(), [2, 3, 4, 26, 27, 28])
+        self.assertEqual(forecast_matrix.metric(MetricSpec.parse("15-17", "max")).tolist(), [28.0])
+        self.assertEqual(forecast_matrix.metric(MetricSpec.parse("15-17", "p50")).tolist(), [15.0])
+        self.assertEqual(forecast_matrix.metric(DEFAULT_METRIC).tolist(), [13.0])
+        self.assertEqual(MetricSpec.parse(None, "p05").key, MetricSpec.parse(None, "p5").key)
+        for hours, statistic in (("17-15", None), ("noon", None), (None, "mode"), (None, "p50.0001"), (None, "p101")):
+            with self.assertRaises(ValueError):
+                MetricSpec.parse(hours, statistic)
+
+    async def test_metric_ranking_is_built_once_per_spec(self):
+        forecast_store.put_many([
+            LocationForecast(23.7115253, 90.4111451, "2025-02-10T00", [20.0] * 15 + [30.0] * 9),
+            LocationForecast(24.3745, 88.6042, "2025-02-10T00", [25.0] * 24),
+        ])
+        view = DistrictWeatherViewSet.as_view({"get": "get_coolest_districts"})
+        request = APIRequestFactory().get("/v1/coolest-districts/", {"hours": "15-17", "statistic": "max", "limit": 2})
+
+        with patch.object(WeatherService, "fetch_coalesced_districts", new_callable=AsyncMock) as mock_fetch:
+            first = await view(request)
+            second = await view(request)
+
+        mock_fetch.assert_awaited_once()
+        self.assertEqual([(district["name"], district["temperature"]) for district in first.data],
+                         [("Rajshahi", 25.0), ("Dhaka", 30.0)])
+        self.assertEqual(first.data[0]["statistic"], "max")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["X-Data-Freshness"], "fresh")
+
+    async def test_ranking_from_last_good_forecasts_is_stale_and_rebuilt(self):
+        forecast_store.put_many([LocationForecast(
+            23.7115253, 90.4111451, "2025-02-10T00", [20.0] * 15 + [30.0] * 9, fetched_at=time.time() - 3600,
+        )])
+        view = DistrictWeatherViewSet.as_view({"get": "get_coolest_districts"})
+        request = APIRequestFactory().get("/v1/coolest-districts/", {"hours": "15-17", "statistic": "max"})
+
+        # The provider fails for every district, so Dhaka falls back to its last good forecast.
+        with patch.object(WeatherService, "fetch_coalesced_districts", new_callable=AsyncMock, return_value=[]) as mock_fetch:
+            first = await view(request)
+            await view(request)
+            await revalidator.wait()
+
+        self.assertEqual(first.data[0]["name"], "Dhaka")
+        self.assertEqual(first["X-Data-Freshness"], "stale")
+        self.assertGreaterEqual(int(first["Age"]), 3600)
+        self.assertEqual(mock_fetch.await_count, 2)
+
+
+class ConditionalRankingTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+        self.factory = APIRequestFactory()
+        self.view = DistrictWeatherViewSet.as_view({"get": "get_coolest_districts"})
+        self.url = "/v1/coolest-districts/"
+        self.districts = [
+            {"id": "31", "division_id": "6", "name": "Panchagarh", "average_temperature": 24.14},
+            {"id": "33", "division_id": "6", "name": "Thakurgaon", "average_temperature": 24.27},
+        ]
+
+    async def test_matching_etag_returns_not_modified(self):
+        publish_snapshot({"districts": self.districts, "generated_at": 1700000000})
+        first = await self.view(self.factory.get(self.url))
+
+        with patch("coolest_districts.views.views_v1.Response") as mock_response:
+            second = await self.view(self.factory.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"]))
+
+        mock_response.assert_not_called()
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertRegex(first["Cache-Control"], r"max-age=\d+")
+        self.assertEqual(first["Last-Modified"], "Tue, 14 Nov 2023 22:13:20 GMT")
+
+    async def test_etag_names_the_content_coding(self):
+        publish_snapshot({"districts": self.districts, "generated_at": 1700000000})
+        gzipped = await self.view(self.factory.get(self.url, HTTP_ACCEPT_ENCODING="gzip"))
+        identity = await self.view(self.factory.get(self.url))
+
+        cross_encoding = await self.view(self.factory.get(
+            self.url, HTTP_ACCEPT_ENCODING="identity", HTTP_IF_NONE_MATCH=gzipped["ETag"]))
+        same_encoding = await self.view(self.factory.get(
+            self.url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=gzipped["ETag"]))
+
+        self.assertNotEqual(gzipped["ETag"], identity["ETag"])
+        self.assertEqual(cross_encoding.status_code, 200)
+        self.assertEqual(cross_encoding["ETag"], identity["ETag"])
+        self.assertEqual(same_encoding.status_code, 304)
+        self.assertIn("Accept-Encoding", same_encoding["Vary"])
+
+    async def test_unchanged_refresh_keeps_version_and_last_modified(self):
+        first = publish_snapshot({"districts": self.districts, "generated_at": 1700000000})
+        second = publish_snapshot({"districts": list(self.districts), "generated_at": 1700000300})
+        changed = publish_snapshot({"districts": self.districts[::-1], "generated_at": 1700000600})
+
+        self.assertEqual((second["version"], second["modified_at"]), (first["version"], 1700000000))
+        self.assertNotEqual(changed["version"], first["version"])
+        self.assertEqual(changed["modified_at"], 1700000600)
+
+    async def test_gzip_clients_get_the_pre_rendered_body(self):
+        publish_snapshot({"districts": self.districts, "generated_at": 1700000000})
+
+        with patch("common_services.district_snapshot.encode_body") as mock_encode:
+            response = await self.view(self.factory.get(self.url, {"sort": "desc"}, HTTP_ACCEPT_ENCODING="gzip, deflate"))
+
+        mock_encode.assert_not_called()
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual([district["name"] for district in json.loads(gzip.decompress(response.content))],
+                         ["Thakurgaon", "Panchagarh"])
+
+    async def test_invalid_sort_and_limit_are_rejected_and_limits_are_clamped(self):
+        publish_snapshot({"districts": self.districts, "generated_at": 1700000000})
+
+        for params in ({"sort": "foo"}, {"limit": "abc"}):
+            response = await self.view(self.factory.get(self.url, params))
+            self.assertEqual(response.status_code, 400)
+        negative = await self.view(self.factory.get(self.url, {"limit": -3}))
+        zero = await self.view(self.factory.get(self.url, {"limit": 0}))
+        beyond = await self.view(self.factory.get(self.url, {"limit": 500}))
+        everything = await self.view(self.factory.get(self.url, {"limit": 2}))
+
+        self.assertEqual(json.loads(negative.content), [])
+        self.assertEqual(negative["ETag"], zero["ETag"])
+        self.assertEqual(beyond["ETag"], everything["ETag"])
+
+    async def test_division_filter_and_rollup_come_from_the_published_snapshot(self):
+        publish_snapshot({"districts": [
+            *self.districts,
+            {"id": "1", "division_id": "3", "name": "Dhaka", "average_temperature": 26.5},
+            {"district": "Faridpur", "error": "API Error 503"},
+        ], "generated_at": 1700000000})
+        rollup_view = DistrictWeatherViewSet.as_view({"get": "get_division_rollup"})
+
+        with patch("common_services.district_snapshot.build_division_rollup") as mock_rollup:
+            filtered = await self.view(self.factory.get(self.url, {"division_id": "6", "sort": "desc"}))
+            rollup = await rollup_view(self.factory.get(self.url + "divisions/"))
+            unknown = await self.view(self.factory.get(self.url, {"division_id": "99"}))
+
+        mock_rollup.assert_not_called()
+        self.assertEqual([district["name"] for district in json.loads(filtered.content)], ["Thakurgaon", "Panchagarh"])
+        self.assertEqual(json.loads(rollup.content), [
+            {"division_id": "6", "district_count": 2, "min_temperature": 24.14, "mean_temperature": 24.2,
+             "max_temperature": 24.27, "temperature_unit": "Celsius"},
+            {"division_id": "3", "district_count": 1, "min_temperature": 26.5, "mean_temperature": 26.5,
+             "max_temperature": 26.5, "temperature_unit": "Celsius"},
+        ])
+        self.assertEqual(unknown.status_code, 400)
+
+    async def test_expired_snapshot_is_served_stale_while_rebuilt(self):
+        snapshot = publish_snapshot({"districts": self.districts, "generated_at": time.time() - 900})
+        weather_cache.set(SNAPSHOT_CACHE_KEY, {**snapshot, "expires_at": time.time() - 300}, 60)
+
+        async def slow_refresh():
+            await asyncio.sleep(0.05)
+
+        with patch("common_services.district_snapshot.arefresh_snapshot", new_callable=AsyncMock,
+                   side_effect=slow_refresh) as mock_refresh:
+            responses = [await self.view(self.factory.get(self.url)) for _ in range(2)]
+            await revalidator.wait()
+
+        mock_refresh.assert_awaited_once()
+        self.assertEqual(responses[0]["X-Data-Freshness"], "stale")
+        self.assertGreaterEqual(int(responses[0]["Age"]), 900)
+        self.assertIn("max-age=0", responses[0]["Cache-Control"])
+
+    async def test_snapshot_is_dated_by_its_oldest_forecast(self):
+        forecast_store.put_many([
+            LocationForecast(23.7115253, 90.4111451, "2025-02-10T00", [26.5] * 24, fetched_at=time.time() - 3600),
+            LocationForecast(26.3411, 88.5541606, "2025-02-10T00", [24.14] * 24),
+        ])
+        districts = [
+            {**self.districts[0], "latitude": "26.3411", "longitude": "88.5541606"},
+            {"id": "1", "division_id": "3", "name": "Dhaka", "average_temperature": 26.5,
+             "latitude": "23.7115253", "longitude": "90.4111451"},
+        ]
+
+        with patch.object(WeatherService, "retrieve_district_weather_data", new_callable=AsyncMock, return_value=districts):
+            response = await self.view(self.factory.get(self.url))
+
+        self.assertGreaterEqual(int(response["Age"]), 3600)
+        self.assertEqual(response["X-Data-Freshness"], "stale")
+
+
+class DistrictStreamTest(TestCase):
+    url = "/v1/coolest-districts/stream/"
+
+    @staticmethod
+    async def fake_stream():
+        yield "cache", {"id": "31", "division_id": "6", "name": "Panchagarh", "average_temperature": 24.14}
+        yield "upstream", {"district": "Dhaka", "error": "API Error 503"}
+        yield "upstream", {"id": "40", "division_id": "2", "name": "Bandarban", "average_temperature": 22.5}
+
+    def test_wsgi_clients_get_ndjson_ending_with_the_ranking(self):
+        with patch.object(WeatherService, "stream_district_weather_data", self.fake_stream):
+            response = self.client.get(self.url)
+            events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([(event["event"], event["data"].get("source")) for event in events],
+                         [("district", "cache"), ("district", "upstream"), ("district", "upstream"), ("ranking", None)])
+        self.assertEqual(events[-1]["data"]["order"], ["Bandarban", "Panchagarh", "Dhaka"])
+
+    async def test_asgi_clients_get_server_sent_events(self):
+        with patch.object(WeatherService, "stream_district_weather_data", self.fake_stream):
+            response = await self.async_client.get(self.url, headers={"Accept": "text/event-stream"})
+            body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertTrue(body.startswith('event: district\ndata: {"source": "cache"'))
+        self.assertIn('event: ranking\ndata: {"order": ["Bandarban", "Panchagarh", "Dhaka"]}\n\n', body)
+
+
+class SchemaArtifactTest(TestCase):
+    def setUp(self):
+        load_schema_artifact.cache_clear()
+        self.addCleanup(load_schema_artifact.cache_clear)
+
+    def test_prebuilt_schema_is_served_as_is(self):
+        with tempfile.TemporaryDirectory() as schema_dir:
+            Path(schema_dir, "schema.json").write_bytes(b'{"openapi": "3.0.3"}')
+            with override_settings(OPENAPI_SCHEMA_DIR=schema_dir):
+                response = self.client.get("/api/schema/", {"format": "json"})
+                not_modified = self.client.get("/api/schema/", {"format": "json"}, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(response.content, b'{"openapi": "3.0.3"}')
+        self.assertEqual(response["Content-Type"], "application/vnd.oai.openapi+json")
+        self.assertEqual(not_modified.status_code, 304)
+
+    @override_settings(OPENAPI_SCHEMA_DIR="/nonexistent")
+    def test_generated_schema_includes_deferred_view_documentation(self):
+        schema = self.client.get("/api/schema/", {"format": "json"}).json()
+
+        operation = schema["paths"]["/v1/travel-recommendation/"]["get"]
+        self.assertEqual(operation["tags"], ["Travel Advice"])
+        self.assertIn("Dhaka", next(p for p in operation["parameters"] if p["name"] == "friend_district")["schema"]["enum"])
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        registry.reset()
+        weather_cache.clear()
+
+    def test_metrics_endpoint_reports_requests_and_cache_namespaces(self):
+        weather_cache.get("travel_matrix_2026-10-18_a")
+        self.client.get("/api/schema/", {"format": "json"})
+        body = self.client.get("/metrics").content.decode()
+
+        self.assertIn('coolescape_http_request_duration_seconds_count{endpoint="schema",method="GET",status="200"} 1', body)
+        self.assertIn('coolescape_cache_requests_total{namespace="travel_matrix",tier="shared",result="miss"} 1', body)
+        self.assertIn("# TYPE coolescape_upstream_in_flight gauge", body)
+
+    def test_routes_of_one_viewset_get_their_own_endpoint_label(self):
+        self.client.get("/v1/coolest-districts/", {"sort": "sideways"})
+        self.client.get("/v1/coolest-districts/divisions/", {"sort": "sideways"})
+        self.client.get("/v1/travel-matrix/")
+        body = registry.render()
+
+        for endpoint in ("coolest-districts", "coolest-districts-divisions", "travel-matrix"):
+            self.assertIn(f'coolescape_http_request_duration_seconds_count{{endpoint="{endpoint}",method="GET",status="400"}} 1', body)
+        self.assertEqual(cache_namespace("forecast_window_23.7_90.4_2026-10-18_2026-10-20"), "forecast_window")
+        self.assertEqual(cache_namespace("0123456789abcdef0123456789abcdef"), "district_weather")
+        self.assertEqual(cache_namespace("coolest_districts_rollup_body_v_asc"), "coolest_districts_rollup_body")
+
+    def test_worker_files_are_summed_and_exited_workers_drop_gauges(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, override_settings(METRICS_DIR=metrics_dir):
+            Path(metrics_dir, "metrics_999999999.json").write_text(json.dumps({
+                "coolescape_cache_requests_total": [[["snapshot", "local", "hit"], 4]],
+                "coolescape_upstream_in_flight": [[[], 3]],
+            }))
+            weather_cache.local.set("coolest_districts_snapshot", {"version": "v"})
+            weather_cache.get("coolest_districts_snapshot")
+            body = registry.render()
+
+        self.assertIn('coolescape_cache_requests_total{namespace="coolest_districts_snapshot",tier="local",result="hit"} 1', body)
+        self.assertIn('coolescape_cache_requests_total{namespace="snapshot",tier="local",result="hit"} 4', body)
+        self.assertNotIn("coolescape_upstream_in_flight 3", body)
+
+
+class ForecastArchiveTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+        forecast_archive.clear()
+
+    def test_cache_miss_is_served_from_the_archive(self):
+        fetched_at = time.time() - 3600
+        forecast_store.put_many([LocationForecast(23.7115253, 90.4111451, "2025-02-10T00", [25.5] * 24, fetched_at=fetched_at)])
+        forecast_archive.flush()
+        weather_cache.clear()
+
+        forecast = forecast_store.get_last_good(23.7115253, 90.4111451)
+
+        self.assertEqual(forecast.fetched_at, fetched_at)
+        self.assertEqual(forecast.temperature_at("2025-02-10", 14), 25.5)
+        self.assertIsNotNone(weather_cache.get(forecast.key))
+
+    async def test_async_archive_read_does_not_block_the_loop(self):
+        forecast_store.put_many([LocationForecast(23.7115253, 90.4111451, "2025-02-10T00", [25.5] * 24)])
+        forecast_archive.flush()
+        weather_cache.clear()
+        archive_busy = threading.Event()
+        forecast_archive._executor.submit(archive_busy.wait)
+
+        lookup = asyncio.ensure_future(forecast_store.aget_last_good_many([(23.7115253, 90.4111451)]))
+        await asyncio.sleep(0.05)
+        self.assertFalse(lookup.done())
+        archive_busy.set()
+
+        forecasts = await lookup
+        self.assertEqual(forecasts[(23.7115253, 90.4111451)].temperature_at("2025-02-10", 14), 25.5)
+
+    def test_boot_warms_the_cache_with_recent_forecasts_only(self):
+        forecast_store.put_many([
+            LocationForecast(23.7115253, 90.4111451, "2025-02-10T00", [25.5] * 24),
+            LocationForecast(23.6070822, 89.8429406, "2025-02-10T00", [26.0] * 24, fetched_at=0),
+        ])
+        forecast_archive.flush()
+        weather_cache.clear()
+
+        self.assertEqual(warm_forecast_store(), 1)
+        self.assertIsNotNone(forecast_store.get(23.7115253, 90.4111451))
+        self.assertIsNone(weather_cache.get(LocationForecast(23.6070822, 89.8429406, "2025-02-10T00", []).key))
+
+
+class StructuredLoggingTest(TestCase):
+    @override_settings(LOG_PAYLOAD_MAX_CHARS=20)
+    def test_queued_records_are_sampled_truncated_and_written_as_json(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            log_file = Path(log_dir) / "app.log"
+            handler = NonBlockingHandler(filename=log_file)
+            handler.setFormatter(StructuredFormatter())
+            handler.addFilter(EventSampler({"district_cache_hit": 0.0}))
+            logger = logging.getLogger("coolescape.tests.structured")
+            logger.addHandler(handler)
+            logger.propagate = False
+            try:
+                logger.info("Using cached data for %s", "Dhaka", extra={"event": "district_cache_hit"})
+                logger.warning("Slow cache for %s", "Dhaka", extra={"event": "district_cache_hit"})
+                logger.info("Received weather data: %s", payload({"hourly": list(range(100))}),
+                            extra={"event": "upstream_payload", "district": "Dhaka"})
+            finally:
+                logger.removeHandler(handler)
+                handler.close()
+            records = [json.loads(line) for line in log_file.read_text().splitlines()]
+
+        self.assertEqual([record["level"] for record in records], ["WARNING", "INFO"])
+        self.assertEqual(records[1]["event"], "upstream_payload")
+        self.assertEqual(records[1]["district"], "Dhaka")
+        self.assertRegex(records[1]["message"], r"^Received weather data: \{'hourly': \[0, 1, 2,\.\.\. \[\d+ more chars\]$")
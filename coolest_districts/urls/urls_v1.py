@@ -1,7 +1,10 @@
 from django.urls import path, include
-from ..views.views_v1 import DistrictWeatherViewSet
+from ..views.views_v1 import DistrictWeatherViewSet, stream_coolest_districts
 
 
 urlpatterns = [
-    path('coolest-districts/', DistrictWeatherViewSet.as_view({'get': 'get_coolest_districts'})),
+    path('coolest-districts/', DistrictWeatherViewSet.as_view({'get': 'get_coolest_districts'}), name='coolest-districts'),
+    path('coolest-districts/stream/', stream_coolest_districts, name='coolest-districts-stream'),
+    path('coolest-districts/divisions/', DistrictWeatherViewSet.as_view({'get': 'get_division_rollup'}),
+         name='coolest-districts-divisions'),
 ]
\ No newline at end of file
@@ -1,86 +1,166 @@
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
-from rest_framework import permissions, viewsets
+from adrf import viewsets
+from rest_framework import permissions, status
 from rest_framework.response import Response
-from common_services.weather_helper import WeatherService
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_GET
+from django.utils.http import http_date
+from common_services.district_metrics import aget_metric_ranking, ranked_metric_districts
+from common_services.district_registry import get_district_registry
+from common_services.district_snapshot import (
+    aget_or_build_snapshot, get_ranking_bodies, get_rollup_bodies, normalized_limit, ranked_districts, ranked_divisions,
+)
+from common_services.district_stream import (
+    NDJSON_CONTENT_TYPE, SSE_CONTENT_TYPE, encode_ndjson, encode_sse, stream_district_events,
+)
+from common_services.forecast_aggregation import DEFAULT_METRIC, MetricSpec
+from common_services.response_bodies import ENCODINGS, choose_encoding, encoded_response
+from common_services.stale_cache import set_staleness_headers
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+SORT_ORDERS = ("asc", "desc")
+
+
+def parse_sort_order(query_params):
+    """The ``sort`` query parameter, or ``None`` when it is neither ``asc`` nor ``desc``."""
+    sort_order = query_params.get("sort", "asc").lower()
+    return sort_order if sort_order in SORT_ORDERS else None
+
+
+def parse_ranking_params(query_params):
+    """Return ``(sort_order, limit, error_message)`` for a ranking request.
+
+    Negative limits select nothing and are read as 0.
+    """
+    sort_order = parse_sort_order(query_params)
+    if sort_order is None:
+        return None, None, "Invalid sort parameter. Use 'asc' or 'desc'."
+    try:
+        limit = int(query_params.get("limit", 10))
+    except ValueError:
+        return None, None, "Invalid limit parameter. Use an integer."
+    return sort_order, max(0, limit), None
+
 
-@extend_schema(tags=['Coolest Districts'])
 class DistrictWeatherViewSet(viewsets.ViewSet):
     """API ViewSet for fetching district-wise average temperatures at 2 PM."""
     # permission_classes = [permissions.IsAuthenticated]
 
-    @extend_schema(
-        summary="Get Coolest Districts",
-        description="Fetches the districts with the lowest average temperatures at 2 PM, with optional sorting and pagination.",
-        parameters=[
-            OpenApiParameter(
-                name="limit",
-                description="Number of districts to return",
-                required=False,
-                type=OpenApiTypes.INT
-            ),
-            OpenApiParameter(
-                name="sort",
-                description="Sort order (asc/desc)",
-                required=False,
-                type=OpenApiTypes.STR,
-                enum=["asc", "desc"]
-            ),
-        ],
-        responses={
-            200: {
-                "description": "List of coolest districts sorted by temperature.",
-                "content": {
-                    "application/json": {
-                        "example": [
-                            {
-                                "id": "40",
-                                "division_id": "2",
-                                "name": "Bandarban",
-                                "bn_name": "বান্দরবান",
-                                "average_temperature": 30.27,
-                                "temperature_unit": "Celsius",
-                                "latitude": "22.1953275",
-                                "longitude": "92.2183773"
-                            },
-                            {
-                                "id": "39",
-                                "division_id": "1",
-                                "name": "Pirojpur",
-                                "bn_name": "পিরোজপুর",
-                                "average_temperature": 29.83,
-                                "temperature_unit": "Celsius",
-                                "latitude": "22.5841",
-                                "longitude": "89.9720"
-                            }
-                        ]
-                    }
-                }
-            },
-            400: {
-                "description": "Invalid parameters provided.",
-                "content": {
-                    "application/json": {
-                        "example": {
-                            "error": "Invalid sort parameter. Use 'asc' or 'desc'."
-                        }
-                    }
-                }
-            }
-        }
-    )
-    def get_coolest_districts(self, request):
-        """Returns sorted district-wise weather data."""
-        weather_data = WeatherService.fetch_weather_data_sync()
+    async def get_coolest_districts(self, request):
+        """Returns sorted district-wise weather data from the published snapshot.
+
+        Responses carry an ETag derived from the snapshot's content version, so a client
+        polling an unchanged ranking gets a 304 without the list being sorted or serialized.
+        JSON clients are sent bytes rendered and compressed once per snapshot version.
+        ``Age`` and ``X-Data-Freshness`` tell how old the ranking is. ``division_id``
+        restricts the ranking to one division through the snapshot's division index.
+        ``hours`` (``15`` or ``15-17``) and ``statistic`` (mean, min, max, median or a
+        percentile such as ``p90``) rank by another metric, cached per metric.
+        """
+        sort_order, limit, error_message = parse_ranking_params(request.query_params)
+        if error_message:
+            return Response({"error": error_message}, status=status.HTTP_400_BAD_REQUEST)
+        division_id = request.query_params.get("division_id")
+        if division_id is not None and not get_district_registry().in_division(division_id):
+            return Response({"error": f"Unknown division_id '{division_id}'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            metric = MetricSpec.parse(request.query_params.get("hours"), request.query_params.get("statistic"))
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        if metric != DEFAULT_METRIC:
+            return await self.metric_ranking_response(metric, sort_order, limit, division_id)
+
+        snapshot = await aget_or_build_snapshot()
+        limit = normalized_limit(snapshot, limit, division_id)
+        version_tag = f'{snapshot["version"]}-{sort_order}-{limit}'
+        if division_id is not None:
+            version_tag = f'{snapshot["version"]}-division-{division_id}-{sort_order}-{limit}'
+        logger.info("Returning coolest districts (%s, limit %s, division %s).", sort_order, limit, division_id)
+        return self.snapshot_response(
+            request, snapshot, version_tag,
+            lambda: get_ranking_bodies(snapshot, sort_order, limit, division_id),
+            lambda: ranked_districts(snapshot, sort_order, limit, division_id),
+        )
 
-        limit = int(request.query_params.get("limit", 10))
-        sort_order = request.query_params.get("sort", "asc").lower()
+    @staticmethod
+    async def metric_ranking_response(metric, sort_order, limit, division_id):
+        """Districts ranked by another hour window or statistic than the 2 PM mean."""
+        ranking = await aget_metric_ranking(metric)
+        weather_data = ranked_metric_districts(ranking, sort_order, limit, division_id)
+        logger.info("Returning %s districts ranked by %r.", len(weather_data), metric)
+        response = Response(weather_data)
+        patch_cache_control(response, max_age=max(0, int(ranking["expires_at"] - time.time())))
+        return set_staleness_headers(response, ranking["generated_at"], ranking["expires_at"])
 
-        if sort_order == "desc":
-            weather_data = sorted(weather_data, key=lambda x: x.get("average_temperature", float("inf")), reverse=True)
+    async def get_division_rollup(self, request):
+        """Returns the min, mean and max 2 PM average of every division, coolest mean first.
 
-        logger.info(f"Returning {len(weather_data)} coolest districts.")
-        return Response(weather_data[:limit])
+        The rollup is computed once per snapshot version when the snapshot is published,
+        and served with the same conditional and freshness headers as the ranking.
+        """
+        sort_order = parse_sort_order(request.query_params)
+        if sort_order is None:
+            return Response({"error": "Invalid sort parameter. Use 'asc' or 'desc'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshot = await aget_or_build_snapshot()
+        version_tag = f'{snapshot["version"]}-divisions-{sort_order}'
+        logger.info("Returning the division rollup (%s).", sort_order)
+        return self.snapshot_response(
+            request, snapshot, version_tag,
+            lambda: get_rollup_bodies(snapshot, sort_order),
+            lambda: ranked_divisions(snapshot, sort_order),
+        )
+
+    @staticmethod
+    def snapshot_response(request, snapshot, version_tag, render_bodies, render_data):
+        """Conditional response over ``snapshot``: a 304 for a matching client copy, else the
+        pre-rendered ``render_bodies()`` for JSON clients or ``render_data()`` for other renderers.
+
+        The ETag is ``version_tag`` plus the content coding of the JSON body (or the renderer
+        format), so every distinct byte sequence has its own strong validator.
+        """
+        if request.accepted_renderer.format == "json":
+            representation = choose_encoding(request.headers.get("Accept-Encoding"), ENCODINGS)
+        else:
+            representation = request.accepted_renderer.format
+        etag = f'"{version_tag}-{representation}"'
+        last_modified = int(snapshot["modified_at"])
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+        if response is None and request.accepted_renderer.format == "json":
+            response = encoded_response(render_bodies(), request.headers.get("Accept-Encoding"), representation)
+        elif response is None:
+            response = Response(render_data())
+        else:
+            logger.info("Snapshot data not modified since the client's copy (%s).", etag)
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Accept-Encoding",))
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, max_age=max(0, int(snapshot["expires_at"] - time.time())))
+        return set_staleness_headers(response, snapshot["generated_at"], snapshot["expires_at"])
+
+
+@require_GET
+async def stream_coolest_districts(request):
+    """Streams every district's 2 PM average as soon as it is known, then the sorted order.
+
+    Cached districts are sent first and the rest as their fetches complete, so clients can
+    render before the slowest upstream call returns. Clients accepting ``text/event-stream``
+    get server-sent events, everyone else newline-delimited JSON.
+    """
+    if SSE_CONTENT_TYPE in request.headers.get("Accept", ""):
+        encode, content_type = encode_sse, SSE_CONTENT_TYPE
+    else:
+        encode, content_type = encode_ndjson, NDJSON_CONTENT_TYPE
+    logger.info("Streaming coolest districts as %s.", content_type)
+    response = StreamingHttpResponse(
+        stream_district_events(encode, asynchronous=isinstance(request, ASGIRequest)), content_type=content_type
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,213 @@
+from drf_spectacular.extensions import OpenApiViewExtension
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+from common_services.district_registry import get_district_registry
+from common_services.spatial_index import SNAP_MODES
+
+
+class TravelRecommendationViewSetSchema(OpenApiViewExtension):
+    """OpenAPI documentation of TravelRecommendationViewSet, attached only while a schema is generated."""
+
+    target_class = "travel_advice.views.views_v1.TravelRecommendationViewSet"
+
+    def view_replacement(self):
+        district_names = list(get_district_registry().names)
+
+        class DocumentedTravelRecommendationViewSet(self.target_class):
+            @extend_schema(
+                tags=['Travel Advice'],
+                summary="Travel Weather Recommendation",
+                description="Compare the 2 PM temperatures of the friend's location and destination for the given travel date. "
+                            "Recommends if traveling is ideal based on temperature difference.",
+                parameters=[
+                    OpenApiParameter(
+                        name="friend_district",
+                        description="District name of friend's location (from bd-districts.json)",
+                        required=True,
+                        type=OpenApiTypes.STR,
+                        enum=district_names
+                    ),
+                    OpenApiParameter(
+                        name="destination_district",
+                        description="District name of destination (from bd-districts.json)",
+                        required=True,
+                        type=OpenApiTypes.STR,
+                        enum=district_names
+                    ),
+                    OpenApiParameter(
+                        name="date",
+                        description="Travel date in YYYY-MM-DD format; required unless start_date and end_date are given",
+                        required=False,
+                        type=OpenApiTypes.STR,
+                    ),
+                    OpenApiParameter(
+                        name="start_date",
+                        description="First day (YYYY-MM-DD) of a window whose days are ranked by temperature difference",
+                        required=False,
+                        type=OpenApiTypes.STR,
+                    ),
+                    OpenApiParameter(
+                        name="end_date",
+                        description="Last day (YYYY-MM-DD) of the window, inclusive",
+                        required=False,
+                        type=OpenApiTypes.STR,
+                    ),
+                    OpenApiParameter(
+                        name="snap",
+                        description="How friend_lat/friend_lon/dest_lat/dest_lon are snapped before lookup: "
+                                    "'district' (nearest district), 'grid' (grid cell centre) or 'off'",
+                        required=False,
+                        type=OpenApiTypes.STR,
+                        enum=list(SNAP_MODES)
+                    ),
+                ],
+                responses={
+                    200: {
+                        "description": "Returns the temperatures of both locations at 2 PM and travel recommendation. "
+                                       "With start_date/end_date, returns best_date and every day of the window ranked "
+                                       "by temperature difference, each with its own recommendation.",
+                        "content": {
+                            "application/json": {
+                                "example": {
+                                    "friend_temperature": 27.5,
+                                    "destination_temperature": 26.8,
+                                    "decision": "Yes, it's a good day to travel!"
+                                }
+                            }
+                        }
+                    },
+                    400: {
+                        "description": "Bad request due to missing parameters.",
+                        "content": {
+                            "application/json": {
+                                "example": {
+                                    "error": "All parameters (friend_district, destination_district, date) are required"
+                                }
+                            }
+                        }
+                    }
+                }
+            )
+            async def travel_recommendation(self, request):
+                return await super().travel_recommendation(request)
+
+            @extend_schema(
+                tags=['Travel Advice'],
+                summary="Bulk Travel Weather Recommendation",
+                description="Compare many friend/destination routes in one request. Each item takes the same fields as "
+                            "the single travel recommendation (district names or coordinates with optional snap, plus date). "
+                            "Locations shared between items are looked up only once. Results are returned in input order; "
+                            "an invalid item yields an error entry instead of failing the whole request.",
+                request={
+                    "application/json": {
+                        "type": "object",
+                        "properties": {
+                            "items": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "friend_district": {"type": "string", "enum": district_names},
+                                        "destination_district": {"type": "string", "enum": district_names},
+                                        "friend_lat": {"type": "number"},
+                                        "friend_lon": {"type": "number"},
+                                        "dest_lat": {"type": "number"},
+                                        "dest_lon": {"type": "number"},
+                                        "snap": {"type": "string", "enum": list(SNAP_MODES)},
+                                        "date": {"type": "string", "format": "date"},
+                                    },
+                                    "required": ["date"],
+                                },
+                            }
+                        },
+                        "required": ["items"],
+                    }
+                },
+                responses={
+                    200: {
+                        "description": "One result per item, in request order.",
+                        "content": {
+                            "application/json": {
+                                "example": {
+                                    "results": [
+                                        {
+                                            "friend_temperature": 27.5,
+                                            "destination_temperature": 26.8,
+                                            "decision": "Yes, it's a good day to travel!"
+                                        },
+                                        {"error": "Invalid district name(s) provided."}
+                                    ]
+                                }
+                            }
+                        }
+                    },
+                    400: {
+                        "description": "Bad request due to a missing or oversized item list.",
+                        "content": {
+                            "application/json": {
+                                "example": {"error": "items must be a non-empty list."}
+                            }
+                        }
+                    },
+                },
+            )
+            async def bulk_travel_recommendation(self, request):
+                return await super().bulk_travel_recommendation(request)
+
+            @extend_schema(
+                tags=['Travel Advice'],
+                summary="District Travel Matrix",
+                description="Temperature differences and travel decisions between every pair of districts at 2 PM on "
+                            "the given date, using the same rule as the travel recommendation. Pass origin (repeatable) "
+                            "to return only those districts' rows.",
+                parameters=[
+                    OpenApiParameter(
+                        name="date",
+                        description="Travel date in YYYY-MM-DD format",
+                        required=True,
+                        type=OpenApiTypes.STR,
+                    ),
+                    OpenApiParameter(
+                        name="origin",
+                        description="District name(s) whose rows are returned; all districts when omitted",
+                        required=False,
+                        type={"type": "array", "items": {"type": "string", "enum": district_names}},
+                        explode=True,
+                    ),
+                ],
+                responses={
+                    200: {
+                        "description": "Destination column order and one row per origin district.",
+                        "content": {
+                            "application/json": {
+                                "example": {
+                                    "date": "2024-02-10",
+                                    "temperature_threshold": 2,
+                                    "destinations": ["Dhaka", "Sylhet"],
+                                    "origins": [
+                                        {
+                                            "origin": "Dhaka",
+                                            "temperature": 27.5,
+                                            "temperature_differences": [0.0, 3.5],
+                                            "good_to_travel": [True, False]
+                                        }
+                                    ]
+                                }
+                            }
+                        }
+                    },
+                    400: {
+                        "description": "Bad request due to a missing or invalid date or origin.",
+                        "content": {
+                            "application/json": {
+                                "example": {"error": "Travel date is required in YYYY-MM-DD format."}
+                            }
+                        }
+                    },
+                },
+            )
+            async def travel_matrix(self, request):
+                return await super().travel_matrix(request)
+
+        return DocumentedTravelRecommendationViewSet
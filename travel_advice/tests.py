@@ -1,6 +1,19 @@
-from django.test import TestCase
+import asyncio
+import time
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from unittest.mock import AsyncMock, patch
-from common_services.weather_helper import WeatherService
+from common_services.weather_helper import WeatherService, travel_comparison_key
+from common_services.district_registry import get_district_registry
+from common_services.forecast_store import LocationForecast, forecast_store
+from common_services.hash_key_generate import coordinate_key
+from common_services.single_flight import peer_lock_key
+from common_services.spatial_index import snap_coordinates
+from common_services.stale_cache import CachedEntry, Freshness, load_entry, revalidator, store_entry
+from common_services.testing import FakeSession
+from common_services.tiered_cache import weather_cache
+from common_services.travel_matrix import travel_matrix_key
 
 
 class TravelRecommendationLogicTest(TestCase):
@@ -16,3 +29,265 @@ class TravelRecommendationLogicTest(TestCase):
         result = await WeatherService.compare_travel_weather("Dhaka", "Chattogram","2024-02-10")
 
         self.assertEqual(result["decision"], "Yes, it's a good day to travel!")
+
+
+class CoordinateCoalescingTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+
+    async def test_concurrent_misses_share_one_upstream_call(self):
+        session = FakeSession(200, {"hourly": {"time": ["2024-02-10T14:00"], "temperature_2m": [26.8]}}, delay=0.01)
+
+        results = await asyncio.gather(*(
+            WeatherService.fetch_weather_by_coordinates(session, 23.71, 90.41, "2024-02-10") for _ in range(5)
+        ))
+
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual(results, [{"temperature": 26.8}] * 5)
+
+    @override_settings(SINGLE_FLIGHT_CACHE_LOCK=True, SINGLE_FLIGHT_POLL_INTERVAL=0.005)
+    async def test_follower_worker_reads_the_lock_holders_result(self):
+        session = FakeSession(200, {"hourly": {"time": ["2024-02-10T14:00"], "temperature_2m": [26.8]}}, delay=0.01)
+        cache_key = f"weather_{coordinate_key(23.71, 90.41)}_2024-02-10"
+        weather_cache.shared.add(peer_lock_key(cache_key), "other-worker", 5)
+
+        async def other_worker_publishes():
+            await asyncio.sleep(0.02)
+            weather_cache.set(cache_key, {"temperature": 25.0}, 60)
+            weather_cache.shared.delete(peer_lock_key(cache_key))
+
+        result, _ = await asyncio.gather(
+            WeatherService.fetch_weather_by_coordinates(session, 23.71, 90.41, "2024-02-10"),
+            other_worker_publishes(),
+        )
+
+        self.assertEqual(len(session.calls), 0)
+        self.assertEqual(result, {"temperature": 25.0})
+
+
+class StaleWhileRevalidateTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+
+    async def test_stale_temperature_is_served_and_refreshed_once(self):
+        cache_key = f"weather_{coordinate_key(23.71, 90.41)}_2024-02-10"
+        store_entry(cache_key, CachedEntry({"temperature": 20.0}, time.time() - 700, time.time() - 100))
+        session = FakeSession(200, {"hourly": {"time": ["2024-02-10T14:00"], "temperature_2m": [26.8]}}, delay=0.01)
+        freshness = Freshness()
+
+        results = await asyncio.gather(*(
+            WeatherService.fetch_weather_by_coordinates(session, 23.71, 90.41, "2024-02-10", freshness) for _ in range(3)
+        ))
+        await revalidator.wait()
+
+        self.assertEqual(results, [{"temperature": 20.0}] * 3)
+        self.assertTrue(freshness.is_stale)
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual(load_entry(cache_key).value, {"temperature": 26.8})
+        self.assertFalse(load_entry(cache_key).is_stale)
+
+    async def test_travel_response_reports_data_age(self):
+        friend, destination = get_district_registry().get("Dhaka"), get_district_registry().get("Sylhet")
+        store_entry(
+            travel_comparison_key(coordinate_key(friend.latitude, friend.longitude),
+                                  coordinate_key(destination.latitude, destination.longitude), "2024-02-10"),
+            CachedEntry({coordinate_key(friend.latitude, friend.longitude): 25.0,
+                         coordinate_key(destination.latitude, destination.longitude): 26.0},
+                        time.time() - 120, time.time() + 480),
+        )
+
+        response = await self.async_client.get("/v1/travel-recommendation/", {
+            "friend_district": "Dhaka", "destination_district": "Sylhet", "date": "2024-02-10"
+        })
+
+        self.assertEqual(response.json()["friend_temperature"], 25.0)
+        self.assertEqual(response["X-Data-Freshness"], "fresh")
+        self.assertIn(int(response["Age"]), (120, 121))
+
+
+class ForecastStoreTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+
+    async def test_dates_inside_the_horizon_are_answered_from_the_store(self):
+        today = timezone.localdate()
+        forecast_store.put_many([
+            LocationForecast(23.71, 90.41, f"{today}T00", [20.0 + hour / 10 for hour in range(72)])
+        ])
+        session = FakeSession(200, None, delay=0.01)
+
+        first_day = await WeatherService.fetch_weather_by_coordinates(session, 23.71, 90.41, str(today))
+        third_day = await WeatherService.fetch_weather_by_coordinates(
+            session, 23.71, 90.41, str(today + timedelta(days=2))
+        )
+
+        self.assertEqual(len(session.calls), 0)
+        self.assertEqual(first_day, {"temperature": 21.4})
+        self.assertEqual(third_day, {"temperature": 26.2})
+
+
+class CoordinateSnappingTest(TestCase):
+    def test_nearby_points_snap_to_the_same_district(self):
+        first = snap_coordinates(23.7201, 90.4050, "district")
+        second = snap_coordinates(23.7049, 90.4198, "district")
+
+        self.assertEqual(first[2]["name"], "Dhaka")
+        self.assertEqual(first[:2], second[:2])
+
+    @override_settings(COORDINATE_SNAP_GRID_SIZE=0.1)
+    def test_grid_snapping_uses_the_cell_centre(self):
+        self.assertEqual(snap_coordinates(23.7234, 90.4011, "grid"), (23.75, 90.45, None))
+
+    async def test_non_finite_and_out_of_range_coordinates_are_rejected(self):
+        point = {"friend_lat": "23.71", "friend_lon": "90.41", "dest_lat": "24.89", "dest_lon": "91.87", "date": "2024-02-10"}
+        for snap in ("grid", "district"):
+            for field, value in (("friend_lat", "nan"), ("dest_lon", "inf"), ("friend_lat", "91"), ("dest_lon", "-180.5")):
+                response = await self.async_client.get("/v1/travel-recommendation/", {**point, field: value, "snap": snap})
+                self.assertEqual(response.status_code, 400)
+
+        response = await self.async_client.post("/v1/travel-recommendation/bulk/", {"items": [
+            {**point, "friend_lat": "nan", "snap": "grid"},
+            {**point, "dest_lat": "-95", "snap": "district"},
+        ]}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["error"] for result in response.json()["results"]], [
+            "Latitude/longitude values must be numbers.",
+            "Latitude must be between -90 and 90 and longitude between -180 and 180.",
+        ])
+
+    async def test_reversed_pair_reuses_the_cached_comparison(self):
+        weather_cache.clear()
+        with patch("common_services.weather_helper.WeatherService.fetch_weather_by_coordinates",
+                   new_callable=AsyncMock, side_effect=[{"temperature": 27.5}, {"temperature": 24.0}]) as mock_fetch:
+            outbound = await WeatherService.compare_travel_weather(23.7115, 90.4111, 24.8898, 91.8698, "2024-02-10")
+            inbound = await WeatherService.compare_travel_weather(24.8898, 91.8698, 23.7115, 90.4111, "2024-02-10")
+
+        self.assertEqual(mock_fetch.await_count, 2)
+        self.assertEqual((outbound["friend_temperature"], outbound["destination_temperature"]), (27.5, 24.0))
+        self.assertEqual((inbound["friend_temperature"], inbound["destination_temperature"]), (24.0, 27.5))
+
+
+class BulkTravelRecommendationTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+
+    async def test_shared_locations_are_fetched_once(self):
+        with patch("common_services.weather_helper.WeatherService.fetch_weather_by_coordinates",
+                   new_callable=AsyncMock, return_value={"temperature": 25.0}) as mock_fetch:
+            response = await self.async_client.post("/v1/travel-recommendation/bulk/", {"items": [
+                {"friend_district": "Dhaka", "destination_district": "Sylhet", "date": "2024-02-10"},
+                {"friend_district": "Sylhet", "destination_district": "Dhaka", "date": "2024-02-10"},
+                {"friend_district": "Dhaka", "destination_district": "Nowhere", "date": "2024-02-10"},
+                {"friend_district": ["Dhaka"], "destination_district": "Sylhet", "date": "2024-02-10"},
+                {"friend_district": "Dhaka", "destination_district": {"name": "Sylhet"}, "date": "2024-02-10"},
+            ]}, content_type="application/json")
+
+        results = response.json()["results"]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_fetch.await_count, 2)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[2], {"error": "Invalid district name(s) provided."})
+        self.assertEqual(results[3:], [{"error": "District names must be strings."}] * 2)
+
+    @override_settings(TRAVEL_BULK_MAX_ITEMS=1)
+    async def test_oversized_requests_are_rejected(self):
+        item = {"friend_district": "Dhaka", "destination_district": "Sylhet", "date": "2024-02-10"}
+        response = await self.async_client.post("/v1/travel-recommendation/bulk/", {"items": [item, item]},
+                                                content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TravelMatrixTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+        self.today = timezone.localdate()
+        self.districts = get_district_registry().districts
+        forecast_store.put_many([
+            LocationForecast(district.lat, district.long, f"{self.today}T00", [20.0 + index * 0.75] * 24)
+            for index, district in enumerate(self.districts)
+        ])
+
+    async def test_matrix_matches_the_pairwise_rule_without_fetching(self):
+        with patch("common_services.weather_helper.WeatherService.fetch_district_batches",
+                   new_callable=AsyncMock) as mock_fetch:
+            response = await self.async_client.get("/v1/travel-matrix/", {"date": str(self.today)})
+
+        data = response.json()
+        mock_fetch.assert_not_awaited()
+        self.assertEqual(len(data["origins"]), len(self.districts))
+        self.assertEqual(data["destinations"], [district.name for district in self.districts])
+        for origin_index, destination_index in [(0, 1), (0, 2), (0, 3), (5, 2)]:
+            expected = WeatherService.travel_result(20.0 + origin_index * 0.75, 20.0 + destination_index * 0.75)
+            row = data["origins"][origin_index]
+            self.assertEqual(row["good_to_travel"][destination_index], expected["decision"].startswith("Yes"))
+            self.assertEqual(row["temperature_differences"][destination_index],
+                             round(abs(destination_index - origin_index) * 0.75, 2))
+
+    async def test_origin_filter_returns_only_those_rows(self):
+        names = [self.districts[1].name, self.districts[3].name]
+        response = await self.async_client.get("/v1/travel-matrix/", {"date": str(self.today), "origin": names})
+
+        self.assertEqual([row["origin"] for row in response.json()["origins"]], names)
+        self.assertIsNotNone(weather_cache.get(travel_matrix_key(str(self.today))))
+
+
+class TravelWindowTest(TestCase):
+    def setUp(self):
+        weather_cache.clear()
+
+    async def test_window_ranks_days_from_one_forecast_per_location(self):
+        today = timezone.localdate()
+        friend_temperatures = [25.0] * 72
+        destination_temperatures = [30.0] * 24 + [26.0] * 24 + [25.5] * 24
+        session = FakeSession(200, None, delay=0.01)
+        forecast_store.put_many([
+            LocationForecast(23.71, 90.41, f"{today}T00", friend_temperatures),
+            LocationForecast(24.89, 91.87, f"{today}T00", destination_temperatures),
+        ])
+
+        with patch("common_services.weather_helper.get_client_session", new=AsyncMock(return_value=session)):
+            result = await WeatherService.compare_travel_window(
+                23.71, 90.41, 24.89, 91.87, str(today), str(today + timedelta(days=2))
+            )
+
+        self.assertEqual(len(session.calls), 0)
+        self.assertEqual(result["best_date"], str(today + timedelta(days=2)))
+        self.assertEqual([day["temperature_difference"] for day in result["days"]], [0.5, 1.0, 5.0])
+        self.assertTrue(result["days"][1]["decision"].startswith("Yes"))
+        self.assertTrue(result["days"][2]["decision"].startswith("No"))
+
+    async def test_window_outside_the_horizon_is_fetched_once_per_location(self):
+        session = FakeSession(200, {"hourly": {
+            "time": [f"2024-02-{day}T{hour:02d}:00" for day in (10, 11, 12) for hour in range(24)],
+            "temperature_2m": [24.0] * 72,
+        }}, delay=0.01)
+
+        with patch("common_services.weather_helper.get_client_session", new=AsyncMock(return_value=session)):
+            result = await WeatherService.compare_travel_window(23.71, 90.41, 24.89, 91.87, "2024-02-10", "2024-02-12")
+
+        self.assertEqual(len(session.calls), 2)
+        self.assertEqual([day["date"] for day in result["days"]], ["2024-02-10", "2024-02-11", "2024-02-12"])
+
+    @override_settings(TRAVEL_WINDOW_MAX_DAYS=3)
+    async def test_oversized_windows_are_rejected(self):
+        response = await self.async_client.get("/v1/travel-recommendation/", {
+            "friend_district": "Dhaka", "destination_district": "Sylhet",
+            "start_date": "2024-02-10", "end_date": "2024-02-13",
+        })
+
+        self.assertEqual(response.status_code, 400)
+
+
+class DistrictRegistryTest(TestCase):
+    def test_lookups_share_one_record(self):
+        registry = get_district_registry()
+        dhaka = registry.get("Dhaka")
+
+        self.assertIs(registry.by_bn_name["ঢাকা"], dhaka)
+        self.assertIs(registry.by_id["1"], dhaka)
+        self.assertIn(dhaka, registry.in_division(3))
+        self.assertEqual((dhaka["lat"], dhaka.latitude), ("23.7115253", 23.7115253))
+        self.assertIs(get_district_registry(), registry)
+        with self.assertRaises(AttributeError):
+            dhaka.name = "Dacca"
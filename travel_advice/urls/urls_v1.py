@@ -2,5 +2,9 @@ from django.urls import path
 from travel_advice.views.views_v1 import TravelRecommendationViewSet
 
 urlpatterns = [
-    path('travel-recommendation/', TravelRecommendationViewSet.as_view({'get': 'travel_recommendation'})),
+    path('travel-recommendation/', TravelRecommendationViewSet.as_view({'get': 'travel_recommendation'}),
+         name='travel-recommendation'),
+    path('travel-recommendation/bulk/', TravelRecommendationViewSet.as_view({'post': 'bulk_travel_recommendation'}),
+         name='travel-recommendation-bulk'),
+    path('travel-matrix/', TravelRecommendationViewSet.as_view({'get': 'travel_matrix'}), name='travel-matrix'),
 ]
@@ -1,78 +1,111 @@
-import asyncio
 import logging
-from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework.viewsets import ViewSet
+import math
+from datetime import date
+from django.conf import settings
+from adrf.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
-from common_services.districts_names import district_names_for_swagger as district_names
-from common_services.weather_helper import WeatherService
-from common_services.districts_names import processed_json_data
-
-districts = processed_json_data()
+from common_services.weather_helper import TRAVEL_TEMPERATURE_THRESHOLD, WeatherService
+from common_services.district_registry import get_district_registry
+from common_services.spatial_index import SNAP_MODES, snap_coordinates
+from common_services.stale_cache import Freshness
+from common_services.structured_logging import payload
 
 # Configure logger
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-@extend_schema(tags=['Travel Advice'])
+def resolve_travel_locations(params):
+    """Resolve the friend and destination points of one travel query.
+
+    ``params`` holds either ``friend_district``/``destination_district`` or
+    ``friend_lat``/``friend_lon``/``dest_lat``/``dest_lon`` (optionally with ``snap``).
+    Returns ``(coordinates, snapped_to, error_message)`` where ``coordinates`` is
+    ``(friend_lat, friend_lon, dest_lat, dest_lon)``; on invalid input only
+    ``error_message`` is set.
+    """
+    friend_district_name = params.get("friend_district")
+    destination_district_name = params.get("destination_district")
+    if not all(name is None or isinstance(name, str) for name in (friend_district_name, destination_district_name)):
+        logger.error("Non-string district name(s) provided.")
+        return None, None, "District names must be strings."
+
+    if friend_district_name and destination_district_name:
+        districts = get_district_registry()
+        friend_district_data = districts.get(friend_district_name)
+        destination_district_data = districts.get(destination_district_name)
+
+        if not friend_district_data or not destination_district_data:
+            logger.error("Invalid district name(s) provided.")
+            return None, None, "Invalid district name(s) provided."
+
+        coordinates = (friend_district_data.latitude, friend_district_data.longitude,
+                       destination_district_data.latitude, destination_district_data.longitude)
+        return coordinates, None, None
+
+    raw_coordinates = [params.get("friend_lat"), params.get("friend_lon"), params.get("dest_lat"), params.get("dest_lon")]
+    if not all(value not in (None, "") for value in raw_coordinates):
+        logger.error("Either district names or latitude/longitude values are required.")
+        return None, None, "Either district names or latitude/longitude values are required."
+
+    try:
+        friend_latitude, friend_longitude, destination_latitude, destination_longitude = map(float, raw_coordinates)
+    except (TypeError, ValueError):
+        logger.error("Invalid latitude/longitude values: %s", raw_coordinates)
+        return None, None, "Latitude/longitude values must be numbers."
+    # float() also accepts nan and inf, which snapping cannot place on a grid.
+    if not all(map(math.isfinite, (friend_latitude, friend_longitude, destination_latitude, destination_longitude))):
+        logger.error("Non-finite latitude/longitude values: %s", raw_coordinates)
+        return None, None, "Latitude/longitude values must be numbers."
+    if not (-90 <= friend_latitude <= 90 and -90 <= destination_latitude <= 90
+            and -180 <= friend_longitude <= 180 and -180 <= destination_longitude <= 180):
+        logger.error("Out of range latitude/longitude values: %s", raw_coordinates)
+        return None, None, "Latitude must be between -90 and 90 and longitude between -180 and 180."
+
+    snap_mode = str(params.get("snap") or settings.COORDINATE_SNAPPING).lower()
+    if snap_mode not in SNAP_MODES:
+        logger.error("Invalid snap parameter: %s", snap_mode)
+        return None, None, "Invalid snap parameter. Use 'off', 'district' or 'grid'."
+
+    friend_latitude, friend_longitude, friend_snapped_district = snap_coordinates(
+        friend_latitude, friend_longitude, snap_mode)
+    destination_latitude, destination_longitude, destination_snapped_district = snap_coordinates(
+        destination_latitude, destination_longitude, snap_mode)
+
+    snapped_to = None
+    if snap_mode != "off":
+        snapped_to = {
+            "friend": {"latitude": friend_latitude, "longitude": friend_longitude},
+            "destination": {"latitude": destination_latitude, "longitude": destination_longitude},
+        }
+        if snap_mode == "district":
+            snapped_to["friend"]["district"] = friend_snapped_district.name
+            snapped_to["destination"]["district"] = destination_snapped_district.name
+
+    return (friend_latitude, friend_longitude, destination_latitude, destination_longitude), snapped_to, None
+
+
+def validate_travel_window(start_date, end_date):
+    """Return the error message for an invalid ``start_date``/``end_date`` window, or ``None``."""
+    if not start_date or not end_date:
+        return "Both start_date and end_date are required for a date window."
+    try:
+        window_days = (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days + 1
+    except ValueError:
+        return "start_date and end_date must be in YYYY-MM-DD format."
+    if window_days < 1:
+        return "start_date must not be after end_date."
+    if window_days > settings.TRAVEL_WINDOW_MAX_DAYS:
+        return f"A date window may span at most {settings.TRAVEL_WINDOW_MAX_DAYS} days."
+    return None
+
+
 class TravelRecommendationViewSet(ViewSet):
     """API ViewSet for travel recommendation based on weather."""
 
-    @extend_schema(
-        summary="Travel Weather Recommendation",
-        description="Compare the 2 PM temperatures of the friend's location and destination for the given travel date. "
-                    "Recommends if traveling is ideal based on temperature difference.",
-        parameters=[
-            OpenApiParameter(
-                name="friend_district",
-                description="District name of friend's location (from bd-districts.json)",
-                required=True,
-                type=OpenApiTypes.STR,
-                enum=district_names()
-            ),
-            OpenApiParameter(
-                name="destination_district",
-                description="District name of destination (from bd-districts.json)",
-                required=True,
-                type=OpenApiTypes.STR,
-                enum=district_names()
-            ),
-            OpenApiParameter(
-                name="date",
-                description="Travel date in YYYY-MM-DD format",
-                required=True,
-                type=OpenApiTypes.STR,
-            ),
-        ],
-        responses={
-            200: {
-                "description": "Returns the temperatures of both locations at 2 PM and travel recommendation.",
-                "content": {
-                    "application/json": {
-                        "example": {
-                            "friend_temperature": 27.5,
-                            "destination_temperature": 26.8,
-                            "decision": "Yes, it's a good day to travel!"
-                        }
-                    }
-                }
-            },
-            400: {
-                "description": "Bad request due to missing parameters.",
-                "content": {
-                    "application/json": {
-                        "example": {
-                            "error": "All parameters (friend_district, destination_district, date) are required"
-                        }
-                    }
-                }
-            }
-        }
-    )
-    def travel_recommendation(self, request):
+    async def travel_recommendation(self, request):
         """Compare friend's location and destination weather at 2 PM on a given travel date."""
 
         friend_district_name = request.query_params.get("friend_district")
@@ -82,32 +115,27 @@ class TravelRecommendationViewSet(ViewSet):
         logger.info("Received request: friend_district=%s, destination_district=%s, date=%s",
                     friend_district_name, destination_district_name, travel_date)
 
-        if friend_district_name and destination_district_name:
-            friend_district_data = next(
-                (district for district in districts if district["name"] == friend_district_name), None)
-            destination_district_data = next(
-                (district for district in districts if district["name"] == destination_district_name), None)
-
-            if not friend_district_data or not destination_district_data:
-                logger.error("Invalid district name(s) provided.")
-                return Response({"error": "Invalid district name(s) provided."}, status=400)
-
-            friend_latitude, friend_longitude = float(friend_district_data["lat"]), float(friend_district_data["long"])
-            destination_latitude, destination_longitude = float(destination_district_data["lat"]), float(
-                destination_district_data["long"])
-        else:
-            friend_latitude = request.query_params.get("friend_lat")
-            friend_longitude = request.query_params.get("friend_lon")
-            destination_latitude = request.query_params.get("dest_lat")
-            destination_longitude = request.query_params.get("dest_lon")
-
-            if not all([friend_latitude, friend_longitude, destination_latitude, destination_longitude]):
-                logger.error("Either district names or latitude/longitude values are required.")
-                return Response({"error": "Either district names or latitude/longitude values are required."},
-                                status=400)
-
-            friend_latitude, friend_longitude = float(friend_latitude), float(friend_longitude)
-            destination_latitude, destination_longitude = float(destination_latitude), float(destination_longitude)
+        coordinates, snapped_to, error_message = resolve_travel_locations(request.query_params)
+        if error_message:
+            return Response({"error": error_message}, status=400)
+        friend_latitude, friend_longitude, destination_latitude, destination_longitude = coordinates
+
+        start_date = request.query_params.get("start_date")
+        end_date = request.query_params.get("end_date")
+        if start_date or end_date:
+            error_message = validate_travel_window(start_date, end_date)
+            if error_message:
+                logger.error("Invalid travel window: %s", error_message)
+                return Response({"error": error_message}, status=400)
+
+            freshness = Freshness()
+            weather_data = await WeatherService.compare_travel_window(
+                friend_latitude, friend_longitude, destination_latitude, destination_longitude, start_date, end_date,
+                freshness=freshness
+            )
+            if snapped_to:
+                weather_data = {**weather_data, "snapped_to": snapped_to}
+            return freshness.apply(Response(weather_data))
 
         if not travel_date:
             logger.error("Travel date is required.")
@@ -116,9 +144,77 @@ class TravelRecommendationViewSet(ViewSet):
         logger.info("Fetching weather data for coordinates: friend=(%s, %s), destination=(%s, %s) on %s",
                     friend_latitude, friend_longitude, destination_latitude, destination_longitude, travel_date)
 
-        weather_data = asyncio.run(WeatherService.compare_travel_weather(
-            float(friend_latitude), float(friend_longitude), float(destination_latitude), float(destination_longitude), travel_date
-        ))
+        freshness = Freshness()
+        weather_data = await WeatherService.compare_travel_weather(
+            float(friend_latitude), float(friend_longitude), float(destination_latitude), float(destination_longitude), travel_date,
+            freshness=freshness
+        )
+
+        if snapped_to:
+            weather_data = {**weather_data, "snapped_to": snapped_to}
+
+        logger.info("Weather data response: %s", payload(weather_data))
+        return freshness.apply(Response(weather_data))
+
+    @action(detail=False, methods=["post"])
+    async def bulk_travel_recommendation(self, request):
+        """Compare the 2 PM temperatures of many routes, sharing location lookups between them."""
+
+        items = request.data.get("items") if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            logger.error("Bulk travel request without items.")
+            return Response({"error": "items must be a non-empty list."}, status=400)
+        if len(items) > settings.TRAVEL_BULK_MAX_ITEMS:
+            logger.error("Bulk travel request with %s items exceeds the limit.", len(items))
+            return Response({"error": f"At most {settings.TRAVEL_BULK_MAX_ITEMS} items are allowed."}, status=400)
+
+        results = [None] * len(items)
+        comparisons = []
+        snapped_locations = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {"error": "Each item must be an object."}
+                continue
+            coordinates, snapped_to, error_message = resolve_travel_locations(item)
+            if error_message:
+                results[index] = {"error": error_message}
+                continue
+            if not item.get("date"):
+                results[index] = {"error": "Travel date is required."}
+                continue
+            comparisons.append((*coordinates, str(item["date"])))
+            snapped_locations.append((index, snapped_to))
+
+        logger.info("Bulk travel request: %s items, %s valid.", len(items), len(comparisons))
+
+        freshness = Freshness()
+        if comparisons:
+            weather_data = await WeatherService.compare_travel_weather_bulk(comparisons, freshness=freshness)
+            for (index, snapped_to), result in zip(snapped_locations, weather_data):
+                results[index] = {**result, "snapped_to": snapped_to} if snapped_to else result
+
+        return freshness.apply(Response({"results": results}))
+
+    @action(detail=False, methods=["get"])
+    async def travel_matrix(self, request):
+        """Return the all-pairs district travel matrix for a date, optionally filtered by origin."""
 
-        logger.info("Weather data response: %s", weather_data)
-        return Response(weather_data)
+        travel_date = request.query_params.get("date")
+        try:
+            date.fromisoformat(travel_date or "")
+        except ValueError:
+            logger.error("Invalid travel date: %s", travel_date)
+            return Response({"error": "Travel date is required in YYYY-MM-DD format."}, status=400)
+
+        origins = set(request.query_params.getlist("origin")) or None
+        if origins and not all(origin in get_district_registry() for origin in origins):
+            logger.error("Invalid origin district(s): %s", origins)
+            return Response({"error": "Invalid district name(s) provided."}, status=400)
+
+        travel_matrix = await WeatherService.district_travel_matrix(travel_date)
+        return Response({
+            "date": travel_date,
+            "temperature_threshold": TRAVEL_TEMPERATURE_THRESHOLD,
+            "destinations": list(travel_matrix.names),
+            "origins": travel_matrix.rows(origins),
+        })
@@ -1,2 +1,10 @@
+from django.conf import settings
+
+
 def get_forecast_url():
-    return "https://api.open-meteo.com/v1/forecast"
+    return settings.FORECAST_URL
+
+
+def get_forecast_urls():
+    """Every configured forecast endpoint, the primary first; hedged requests go to the next one."""
+    return list(settings.FORECAST_URLS) or [settings.FORECAST_URL]